@@ -0,0 +1,99 @@
+# bench_chunked.py
+# Compares one large htmlContent message with the same page streamed as
+# chunk messages: time until the JSON-LD is available and peak memory.
+
+import argparse
+import io
+import json
+import os
+import struct
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import extract_netflix_json
+from bench_extract_json import make_page
+
+
+def frame(obj):
+    body = json.dumps(obj).encode('utf-8')
+    return struct.pack('=I', len(body)) + body
+
+
+class _Stdin:
+    def __init__(self, data):
+        self.buffer = io.BytesIO(data)
+
+
+def single_frames(page):
+    return frame({"htmlContent": page, "saveFiles": False})
+
+
+def chunk_frames(page, chunk_size):
+    chunks = [page[i:i + chunk_size] for i in range(0, len(page), chunk_size)]
+    return b"".join(frame({"type": "chunk", "transferId": "bench", "index": i, "total": len(chunks),
+                           "data": chunk, "saveFiles": False})
+                    for i, chunk in enumerate(chunks))
+
+
+def receive(frames):
+    """Read frames like the host does and return (seconds until JSON-LD found, result)."""
+    sys.stdin = _Stdin(frames)
+    start = time.perf_counter()
+    found_at = None
+    transfers = {}
+    result = None
+    try:
+        while True:
+            message = extract_netflix_json.read_message()
+            if message is None:
+                break
+            if message.get("type") == "chunk":
+                assembler = extract_netflix_json.add_chunk(transfers, message)
+                if found_at is None and transfers.get("bench") and transfers["bench"].result:
+                    found_at = time.perf_counter() - start
+                if assembler:
+                    result = assembler.finish()
+            else:
+                result = extract_netflix_json.extract_netflix_json_from_content(message["htmlContent"])
+            if found_at is None and result:
+                found_at = time.perf_counter() - start
+    finally:
+        sys.stdin = sys.__stdin__
+    return found_at, time.perf_counter() - start, result
+
+
+def measure(frames):
+    tracemalloc.start()
+    found_at, total, result = receive(frames)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"found_ms": (found_at or 0) * 1000, "total_ms": total * 1000,
+            "peak_mb": peak / (1024 * 1024), "ok": bool(result)}
+
+
+def run(sizes, chunk_kb=512, position=0.1):
+    """Return {size_mb: {"single": {...}, "chunked": {...}}}."""
+    results = {}
+    for size in sizes:
+        page = make_page(size, position)
+        results[size] = {
+            "single": measure(single_frames(page)),
+            "chunked": measure(chunk_frames(page, chunk_kb * 1024)),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chunked native messaging")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[2, 8, 32])
+    parser.add_argument("--chunk-kb", type=int, default=512)
+    parser.add_argument("--position", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"{'MB':>5} {'mode':>8} {'found ms':>9} {'total ms':>9} {'peak MB':>8}")
+    for size, modes in run(args.sizes, args.chunk_kb, args.position).items():
+        for mode, r in modes.items():
+            print(f"{size:>5} {mode:>8} {r['found_ms']:>9.1f} {r['total_ms']:>9.1f} {r['peak_mb']:>8.1f}")
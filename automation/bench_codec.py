@@ -0,0 +1,97 @@
+# bench_codec.py
+# Native messaging framing throughput over a local pipe pair: the previous
+# struct + json implementation against native_codec (json and orjson).
+
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import native_codec
+
+SIZES = {"1KB": 1024, "1MB": 1024 * 1024, "32MB": 32 * 1024 * 1024}
+
+
+def legacy_read(stream):
+    raw_length = stream.read(4)
+    if len(raw_length) < 4:
+        return None
+    message_length = struct.unpack('=I', raw_length)[0]
+    return json.loads(stream.read(message_length).decode('utf-8'))
+
+
+def legacy_write(obj, stream):
+    data = json.dumps(obj).encode('utf-8')
+    stream.write(struct.pack('=I', len(data)))
+    stream.write(data)
+    stream.flush()
+
+
+def codec_write(obj, stream):
+    native_codec.write_message(obj, stream, max_size=native_codec.MAX_INCOMING)
+
+
+def transfer(write, read, payload, count):
+    """Send count frames through a pipe; returns seconds for the whole round."""
+    read_fd, write_fd = os.pipe()
+    reader = os.fdopen(read_fd, 'rb')
+    writer = os.fdopen(write_fd, 'wb')
+    message = {"htmlContent": payload}
+
+    def produce():
+        for _ in range(count):
+            write(message, writer)
+        writer.close()
+
+    thread = threading.Thread(target=produce)
+    start = time.perf_counter()
+    thread.start()
+    received = 0
+    while read(reader) is not None:
+        received += 1
+    thread.join()
+    elapsed = time.perf_counter() - start
+    reader.close()
+    assert received == count
+    return elapsed
+
+
+def backends():
+    """(name, decode, encode) for each JSON backend available."""
+    result = [("codec/json", native_codec.json_decode, native_codec.json_encode)]
+    if native_codec.orjson is not None:
+        result.append(("codec/orjson", native_codec.orjson.loads, native_codec.orjson.dumps))
+    return result
+
+
+def run(sizes=("1KB", "1MB", "32MB"), megabytes=64):
+    """Return {size: {implementation: MB/s}}."""
+    results = {}
+    original = native_codec.decode, native_codec.encode
+    try:
+        for name in sizes:
+            size = SIZES[name]
+            payload = "x" * size
+            count = max(2, min(2000, megabytes * 1024 * 1024 // size))
+            volume = size * count / (1024 * 1024)
+            row = {"legacy": volume / transfer(legacy_write, legacy_read, payload, count)}
+            for backend, decode, encode in backends():
+                native_codec.decode, native_codec.encode = decode, encode
+                row[backend] = volume / transfer(codec_write, native_codec.read_message, payload, count)
+            results[name] = row
+    finally:
+        native_codec.decode, native_codec.encode = original
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark native messaging framing")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--megabytes", type=int, default=64, help="Data volume per measurement")
+    args = parser.parse_args()
+    for size, row in run(args.sizes, args.megabytes).items():
+        print(f"{size:>5}: " + "  ".join(f"{name} {mbs:8.1f} MB/s" for name, mbs in row.items()))
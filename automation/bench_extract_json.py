@@ -0,0 +1,163 @@
+# bench_extract_json.py
+# Compares the JSON-LD extractor with the previous regex on synthetic
+# Netflix-like pages of 2-5 MB. --entities measures pages with hundreds of
+# JSON-LD blocks: streaming formatted entities versus building the list first.
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from extract_netflix_json import (extract_netflix_json_from_content, format_netflix_data,
+                                  iter_netflix_entities, iter_netflix_json_from_file, stream_entities)
+
+
+def make_page(size_mb, position=0.1, entities=1):
+    """
+    Build an HTML page of about size_mb megabytes with `entities` JSON-LD
+    blocks placed at `position` (0..1) of the page.
+    """
+    ld = {
+        "@context": "http://schema.org",
+        "@type": "TVSeries",
+        "url": "https://www.netflix.com/title/80100172",
+        "name": "Dark",
+        "genre": "TV-Dramen",
+        "actors": [{"@type": "Person", "name": f"Actor {i}"} for i in range(20)],
+        "director": [{"@type": "Person", "name": "Baran bo Odar"}],
+        "description": "A family saga with a supernatural twist " * 5,
+    }
+    block = "".join(f'<script type="application/ld+json">{json.dumps(ld, separators=(",", ":"))}</script>'
+                    for _ in range(entities))
+    filler_line = '<div class="title-card"><a href="/title/1">x</a><span data-x="{}">filler</span></div>\n'
+    total = int(size_mb * 1024 * 1024)
+    filler = filler_line * (total // len(filler_line))
+    cut = int(len(filler) * position)
+    return "<html><head>" + filler[:cut] + block + filler[cut:] + "</head></html>"
+
+
+def legacy_extract(html_content):
+    """The previous implementation (first regex match, stops at first '}')."""
+    matches = re.findall(r'\{"@context":"http://schema\.org".*?\}', html_content, re.DOTALL)
+    if not matches:
+        return None
+    try:
+        return json.loads(matches[0])
+    except json.JSONDecodeError:
+        return None
+
+
+def timed(func, *args, repeat=5):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def run(sizes, position=0.1, repeat=5):
+    """Return {size_mb: {"legacy_ms", "legacy_ok", "stream_ms", "stream_ok"}}."""
+    results = {}
+    for size in sizes:
+        page = make_page(size, position)
+        legacy_ms, legacy = timed(legacy_extract, page, repeat=repeat)
+        stream_ms, data = timed(extract_netflix_json_from_content, page, repeat=repeat)
+        results[size] = {
+            "legacy_ms": legacy_ms,
+            "legacy_ok": bool(legacy and legacy.get("actors")),
+            "stream_ms": stream_ms,
+            "stream_ok": bool(data and len(data.get("actors", [])) == 20),
+        }
+    return results
+
+
+def read_and_extract(path):
+    """Previous file path: decode the whole page into a str first."""
+    with open(path, 'r', encoding='utf-8') as file:
+        return extract_netflix_json_from_content(file.read())
+
+
+def peak_memory(func, *args):
+    """Return (peak traced Python allocation in MB, seconds) of one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024), elapsed
+
+
+def run_files(sizes, position=0.5):
+    """Return {size_mb: {"read_mb", "read_ms", "mmap_mb", "mmap_ms"}} for files on disk."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, f"page_{size}.html")
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(make_page(size, position))
+            read_mb, read_s = peak_memory(read_and_extract, path)
+            mmap_mb, mmap_s = peak_memory(lambda p: next(iter_netflix_json_from_file(p), None), path)
+            results[size] = {"read_mb": read_mb, "read_ms": read_s * 1000,
+                             "mmap_mb": mmap_mb, "mmap_ms": mmap_s * 1000}
+    return results
+
+
+def materialize_entities(html_content):
+    """Decode and format every entity before answering."""
+    objects = extract_netflix_json_from_content(html_content, all_objects=True)
+    return [format_netflix_data(entity) for entity in objects]
+
+
+def run_entities(counts, size_mb=2):
+    """Return {entities: {"list_ms", "list_mb", "first_ms", "stream_ms", "stream_mb"}}."""
+    results = {}
+    for count in counts:
+        page = make_page(size_mb, position=0.5, entities=count)
+        list_mb, list_s = peak_memory(materialize_entities, page)
+        first = {}
+
+        def send(frame):
+            first.setdefault("at", time.perf_counter())
+
+        start = time.perf_counter()
+        stream_mb, stream_s = peak_memory(lambda p: stream_entities(iter_netflix_entities(p), {}, send), page)
+        results[count] = {"list_ms": list_s * 1000, "list_mb": list_mb,
+                          "first_ms": (first["at"] - start) * 1000,
+                          "stream_ms": stream_s * 1000, "stream_mb": stream_mb}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JSON-LD extraction")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[2, 3.5, 5])
+    parser.add_argument("--position", type=float, default=0.1, help="Where the JSON-LD sits in the page (0..1)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--files", action="store_true", help="Compare peak memory of file reading paths instead")
+    parser.add_argument("--entities", type=int, nargs="+", help="Entity counts for the multi-entity comparison")
+    args = parser.parse_args()
+
+    if args.entities:
+        print(f"{'entities':>8} {'list ms':>8} {'list MB':>8} {'first ms':>9} {'stream ms':>10} {'stream MB':>10}")
+        for count, r in run_entities(args.entities).items():
+            print(f"{count:>8} {r['list_ms']:>8.1f} {r['list_mb']:>8.2f} {r['first_ms']:>9.2f} "
+                  f"{r['stream_ms']:>10.1f} {r['stream_mb']:>10.3f}")
+        sys.exit(0)
+
+    if args.files:
+        print(f"{'MB':>5} {'read peak MB':>13} {'read ms':>8} {'mmap peak MB':>13} {'mmap ms':>8}")
+        for size, r in run_files(args.sizes, args.position).items():
+            print(f"{size:>5} {r['read_mb']:>13.2f} {r['read_ms']:>8.1f} {r['mmap_mb']:>13.3f} {r['mmap_ms']:>8.1f}")
+        sys.exit(0)
+
+    print(f"{'MB':>5} {'legacy ms':>10} {'ok':>4} {'stream ms':>10} {'ok':>4}")
+    for size, r in run(args.sizes, args.position, args.repeat).items():
+        print(f"{size:>5} {r['legacy_ms']:>10.2f} {str(r['legacy_ok'])[0]:>4} {r['stream_ms']:>10.2f} {str(r['stream_ok'])[0]:>4}")
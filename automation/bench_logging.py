@@ -0,0 +1,59 @@
+# bench_logging.py
+# Per-capture logging overhead: the old open/append/close log_debug with
+# f-strings against the queue-backed logger with DEBUG on and off.
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import host_logging
+
+CALLS_PER_CAPTURE = 10
+MESSAGE = {"text": "Dark - Staffel 1", "url": "https://www.netflix.com/title/80100172",
+           "imageSrc": "https://occ-0-1.nflxso.net/dnm/api/v6/" + "x" * 200}
+
+
+def legacy_capture(path):
+    """Ten calls of the previous log_debug implementation."""
+    for _ in range(CALLS_PER_CAPTURE):
+        message = f"Received message: {MESSAGE}"
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"DEBUG: {message}\n")
+
+
+def logger_capture(logger):
+    for _ in range(CALLS_PER_CAPTURE):
+        logger.debug("Received message: %s", MESSAGE)
+
+
+def per_capture_us(func, arg, captures):
+    start = time.perf_counter()
+    for _ in range(captures):
+        func(arg)
+    return (time.perf_counter() - start) * 1e6 / captures
+
+
+def run(captures=2000):
+    """Return microseconds per capture for legacy, DEBUG off and DEBUG on."""
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {"legacy_us": per_capture_us(legacy_capture, os.path.join(tmp, "legacy.log"), captures)}
+        logger = host_logging.setup_logging(level="INFO", path=os.path.join(tmp, "debug.log"))
+        results["off_us"] = per_capture_us(logger_capture, logger, captures)
+        logger.setLevel(logging.DEBUG)
+        results["on_us"] = per_capture_us(logger_capture, logger, captures)
+        host_logging.shutdown_logging()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark host logging overhead")
+    parser.add_argument("--captures", type=int, default=2000)
+    args = parser.parse_args()
+    r = run(args.captures)
+    print(f"legacy log_debug:   {r['legacy_us']:8.1f} us/capture")
+    print(f"logger, DEBUG off:  {r['off_us']:8.1f} us/capture")
+    print(f"logger, DEBUG on:   {r['on_us']:8.1f} us/capture (file writes on background thread)")
@@ -0,0 +1,79 @@
+# bench_ods_append.py
+# Measures append latency of append_row_to_ods against synthetic workbooks.
+# Compares the old full load/save per row with the journal based writer.
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import Functions
+from pyexcel_ods3 import get_data, save_data
+
+
+def watchlist_row(i):
+    return [f"Title {i}", str(i % 12), "01.01.2024", f"https://www.netflix.com/title/{i}", str(i % 2), ""]
+
+
+def make_workbook(path, rows):
+    """Write a workbook with `rows` synthetic watchlist rows."""
+    sheet = [watchlist_row(i) for i in range(rows)]
+    data = OrderedDict()
+    data[Functions.SHEET_NAME] = sheet
+    save_data(path, data)
+
+
+def legacy_append(row):
+    """The previous implementation: load the whole workbook and save it again."""
+    data = get_data(Functions.ODS_PATH)
+    sheet = data.get(Functions.SHEET_NAME, [])
+    sheet.append(row)
+    data = OrderedDict()
+    data[Functions.SHEET_NAME] = sheet
+    save_data(Functions.ODS_PATH, data)
+
+
+def run(sizes, appends=20, legacy=True):
+    """Return {rows: {"legacy_ms": ..., "journal_ms": ..., "compact_ms": ...}}."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            Functions.ODS_PATH = os.path.join(tmp, f"bench_{rows}.ods")
+            make_workbook(Functions.ODS_PATH, rows)
+            row = ["Bench", "3", "01.01.2024", "https://example.org", "0", ""]
+            result = {}
+
+            if legacy:
+                start = time.perf_counter()
+                legacy_append(row)
+                result["legacy_ms"] = (time.perf_counter() - start) * 1000
+
+            # Keep compaction out of the per-append numbers
+            Functions.JOURNAL_COMPACT_ROWS = appends + 1
+            start = time.perf_counter()
+            for _ in range(appends):
+                Functions.append_row_to_ods(*row[:4], False, "")
+            result["journal_ms"] = (time.perf_counter() - start) * 1000 / appends
+
+            start = time.perf_counter()
+            Functions.compact_ods_journal()
+            result["compact_ms"] = (time.perf_counter() - start) * 1000
+            results[rows] = result
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ODS append latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--appends", type=int, default=20)
+    parser.add_argument("--no-legacy", action="store_true", help="Skip the full rewrite baseline")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.appends, legacy=not args.no_legacy)
+    print(f"{'rows':>8} {'legacy ms':>12} {'journal ms':>12} {'compact ms':>12}")
+    for rows, result in results.items():
+        legacy_ms = f"{result['legacy_ms']:.1f}" if "legacy_ms" in result else "-"
+        print(f"{rows:>8} {legacy_ms:>12} {result['journal_ms']:>12.3f} {result['compact_ms']:>12.1f}")
@@ -0,0 +1,146 @@
+# bench_ods_reader.py
+# Compares reading the watchlist sheet with pyexcel_ods3.get_data against the
+# streaming ods_reader: time for all rows, time for the first 100 rows, and
+# peak memory. Every measurement runs in its own process so the peaks do not
+# mix. Memory is the Python heap peak (tracemalloc) and, where the resource
+# module exists, the growth of the peak RSS, which also counts the lxml trees
+# get_data builds outside the Python heap.
+#
+# The workbooks are written directly as a minimal ODS with the same cells
+# save_data produces (save_data takes minutes for 100k rows).
+#
+# Usage:
+#     python bench_ods_reader.py                      1k, 10k and 100k rows
+#     python bench_ods_reader.py --rows 100000 --keep /tmp/workbooks
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from xml.sax.saxutils import escape
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+import Functions
+
+MODES = ["get_data", "stream", "stream_columns", "get_data_first", "stream_first"]
+
+CONTENT_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+    'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0" '
+    'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">'
+    '<office:body><office:spreadsheet><table:table table:name="%s">')
+CONTENT_TAIL = '</table:table></office:spreadsheet></office:body></office:document-content>'
+CELL = '<table:table-cell office:value-type="string"><text:p>%s</text:p></table:table-cell>'
+MANIFEST = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">'
+    '<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.spreadsheet"/>'
+    '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+    '</manifest:manifest>')
+
+
+def write_workbook(path, rows):
+    """Write a workbook with `rows` synthetic watchlist rows (same cells as make_workbook)."""
+    from bench_ods_append import watchlist_row
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        # The mimetype entry comes first and uncompressed
+        archive.writestr(zipfile.ZipInfo("mimetype"), "application/vnd.oasis.opendocument.spreadsheet",
+                         compress_type=zipfile.ZIP_STORED)
+        archive.writestr("META-INF/manifest.xml", MANIFEST)
+        with archive.open("content.xml", "w") as content:
+            content.write((CONTENT_HEAD % Functions.SHEET_NAME).encode("utf-8"))
+            for i in range(rows):
+                cells = "".join(CELL % escape(value) for value in watchlist_row(i))
+                content.write(("<table:table-row>%s</table:table-row>" % cells).encode("utf-8"))
+            content.write(CONTENT_TAIL.encode("utf-8"))
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, KB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def read(mode, path, first=100):
+    """Read the sheet the way `mode` says and return the number of rows seen."""
+    if mode.startswith("get_data"):
+        from pyexcel_ods3 import get_data
+        rows = get_data(path).get(Functions.SHEET_NAME, [])
+        return len(rows[:first]) if mode == "get_data_first" else len(rows)
+    import ods_reader
+    columns = range(4) if mode == "stream_columns" else None
+    count = 0
+    for _ in ods_reader.iter_rows(path, Functions.SHEET_NAME, columns):
+        count += 1
+        if mode == "stream_first" and count >= first:
+            break
+    return count
+
+
+def child(mode, path):
+    """One measurement: time without tracing, then the traced heap peak."""
+    if mode.startswith("get_data"):
+        import pyexcel_ods3  # noqa: F401  (import cost is not reading cost)
+    import ods_reader  # noqa: F401
+    rss_before = peak_rss_kb()
+    start = time.perf_counter()
+    rows = read(mode, path)
+    ms = (time.perf_counter() - start) * 1000
+    rss_after = peak_rss_kb()
+    tracemalloc.start()
+    read(mode, path)
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"rows": rows, "ms": ms, "heap_mb": heap_peak / 2 ** 20,
+            "rss_mb": (rss_after - rss_before) / 1024 if rss_before is not None else None}
+
+
+def measure(mode, path):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, path],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def run(sizes, modes=MODES, keep=None):
+    """Return {rows: {mode: {"rows", "ms", "heap_mb", "rss_mb"}}}."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = keep or tmp
+        os.makedirs(folder, exist_ok=True)
+        for size in sizes:
+            path = os.path.join(folder, f"bench_{size}.ods")
+            if not os.path.exists(path):
+                write_workbook(path, size)
+            results[size] = {mode: measure(mode, path) for mode in modes}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark get_data against the streaming ODS reader")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--keep", help="Keep the workbooks in this folder and reuse them on the next run")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        sys.exit(0)
+
+    results = run(args.rows, args.modes, args.keep)
+    print(f"{'rows':>8} {'mode':<16} {'read':>8} {'time ms':>10} {'heap MB':>9} {'RSS MB':>8}")
+    for size, modes in results.items():
+        for mode, r in modes.items():
+            rss = f"{r['rss_mb']:.1f}" if r["rss_mb"] is not None else "-"
+            print(f"{size:>8} {mode:<16} {r['rows']:>8} {r['ms']:>10.1f} {r['heap_mb']:>9.1f} {rss:>8}")
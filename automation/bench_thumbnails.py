@@ -0,0 +1,137 @@
+# bench_thumbnails.py
+# Fetches thumbnails from a local HTTP stand-in server with a configurable
+# latency. Compares one urllib request after another (a new connection per
+# image, as hot-linking viewers do) with ThumbnailCache's pooled keep-alive
+# downloads, then checks cache hits and size based eviction.
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from thumbnail_cache import ThumbnailCache
+
+
+def make_image(index, width=1280, height=720):
+    """A distinct JPEG per index (so every URL is its own thumbnail)."""
+    from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+    from PyQt6.QtGui import QColor, QImage
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(QColor((index * 37) % 256, (index * 91) % 256, (index * 13) % 256))
+    buffer = QByteArray()
+    device = QBuffer(buffer)
+    device.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(device, "JPG", 90)
+    return bytes(buffer.data())
+
+
+class ImageServer(ThreadingHTTPServer):
+    """Serves /img/<n>.jpg after `latency` seconds, counting connections."""
+
+    daemon_threads = True
+
+    def __init__(self, images, latency):
+        self.images = images
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.counter_lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), ImageHandler)
+
+    @property
+    def base_url(self):
+        return "http://127.0.0.1:%d" % self.server_address[1]
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.counter_lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.counter_lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        try:
+            body = self.server.images[int(self.path.rsplit("/", 1)[-1].split(".")[0])]
+        except (ValueError, IndexError):
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(count=40, latency=0.05, workers=4):
+    """Return timings and connection counts for sequential urllib and the pooled cache."""
+    from PyQt6.QtGui import QGuiApplication
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+    images = [make_image(i) for i in range(count)]
+    server = ImageServer(images, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"{server.base_url}/img/{i}.jpg" for i in range(count)]
+    results = {"images": count, "image_kb": sum(map(len, images)) / count / 1024}
+    try:
+        start = time.perf_counter()
+        for url in urls:
+            with urllib.request.urlopen(url) as response:
+                response.read()
+        results["urllib_s"] = time.perf_counter() - start
+        results["urllib_connections"] = server.connections
+
+        with tempfile.TemporaryDirectory() as tmp:
+            server.connections = 0
+            cache = ThumbnailCache(os.path.join(tmp, "thumbs"), workers=workers)
+            start = time.perf_counter()
+            futures = [cache.prefetch(url) for url in urls]
+            paths = [future.result() for future in futures]
+            results["pool_s"] = time.perf_counter() - start
+            results["pool_connections"] = server.connections
+            results["thumb_kb"] = sum(os.path.getsize(p) for p in paths) / count / 1024
+            results["failed"] = paths.count(None)
+
+            server.requests = 0
+            start = time.perf_counter()
+            for url in urls:
+                cache.get(url)
+            results["hit_ms"] = (time.perf_counter() - start) * 1000 / count
+            results["hit_requests"] = server.requests
+
+            # Shrink the budget to half the stored bytes: the oldest half goes
+            cache.max_bytes = cache.stats()["bytes"] // 2
+            cache.get(f"{server.base_url}/img/0.jpg?again")
+            results["after_eviction"] = cache.stats()
+            cache.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark thumbnail prefetching against a local server")
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05, help="Server delay per request in seconds")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    r = run(args.count, args.latency, args.workers)
+    print(f"{r['images']} images of {r['image_kb']:.0f} KB, thumbnails {r['thumb_kb']:.0f} KB, {r['failed']} failed")
+    print(f"sequential urllib: {r['urllib_s']:.2f}s over {r['urllib_connections']} connections")
+    print(f"pooled cache:      {r['pool_s']:.2f}s over {r['pool_connections']} connections")
+    print(f"cache hit:         {r['hit_ms']:.3f} ms, {r['hit_requests']} requests to the server")
+    print(f"after eviction:    {r['after_eviction']}")
@@ -0,0 +1,70 @@
+# bench_toggle_widget.py
+# Micro-benchmark of ToggleImageWidget creation and toggling (offscreen Qt).
+# "legacy" reproduces the old per-instance PNG loading and per-update scaling.
+
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtWidgets import QApplication
+
+import pixmap_cache
+from toggle_image_widget import ToggleImageWidget
+
+
+class LegacyToggleImageWidget(ToggleImageWidget):
+    """Loads and checks the four PNGs per instance and scales on every update."""
+
+    def __init__(self, parent=None):
+        self.icons = {}
+        for key, name in pixmap_cache.TOGGLE_IMAGES.items():
+            path = os.path.join(pixmap_cache.ASSETS_DIR, name)
+            os.path.exists(path)
+            self.icons[key] = QPixmap(path)
+        super().__init__(parent)
+
+    def update_pixmap(self):
+        pixmap = self.icons[(self.checked, self.focused)]
+        if not pixmap.isNull():
+            self.setPixmap(pixmap.scaled(42, 42, Qt.AspectRatioMode.KeepAspectRatio,
+                                         Qt.TransformationMode.SmoothTransformation))
+
+
+def measure(widget_class, count, toggles):
+    start = time.perf_counter()
+    widgets = [widget_class() for _ in range(count)]
+    created = time.perf_counter() - start
+    start = time.perf_counter()
+    for widget in widgets:
+        for _ in range(toggles):
+            widget.toggle()
+            widget.focused = not widget.focused
+            widget.update_pixmap()
+    toggled = time.perf_counter() - start
+    for widget in widgets:
+        widget.deleteLater()
+    return {"create_us": created * 1e6 / count, "toggle_us": toggled * 1e6 / (count * toggles * 2)}
+
+
+def run(count=200, toggles=10):
+    """Return {"legacy": {...}, "cached": {...}} in microseconds per operation."""
+    app = QApplication.instance() or QApplication([])
+    pixmap_cache.clear()
+    results = {"legacy": measure(LegacyToggleImageWidget, count, toggles)}
+    results["cached"] = measure(ToggleImageWidget, count, toggles)
+    app.processEvents()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ToggleImageWidget")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--toggles", type=int, default=10)
+    args = parser.parse_args()
+    for name, r in run(args.count, args.toggles).items():
+        print(f"{name:>7}: create {r['create_us']:8.1f} us/widget, update {r['toggle_us']:6.1f} us/state change")
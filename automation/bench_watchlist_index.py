@@ -0,0 +1,76 @@
+# bench_watchlist_index.py
+# Measures duplicate detection against synthetic watchlists: a linear scan
+# over the whole sheet versus the WatchlistIndex (rebuild, sidecar load, lookup, add).
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import Functions
+from watchlist_index import WatchlistIndex, normalize_url
+from bench_ods_append import make_workbook
+
+
+def linear_scan(url):
+    """What a lookup costs without an index: read the sheet and compare every row."""
+    key = normalize_url(url)
+    for number, row in enumerate(Functions.read_ods_rows(), 1):
+        if len(row) > 3 and normalize_url(row[3]) == key:
+            return number
+    return None
+
+
+def run(sizes, lookups=1000, scan=True):
+    """Return {rows: {"scan_ms", "rebuild_ms", "load_ms", "lookup_us", "add_us"}}."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            Functions.ODS_PATH = os.path.join(tmp, f"bench_{rows}.ods")
+            make_workbook(Functions.ODS_PATH, rows)
+            probe = f"https://netflix.com/title/{rows - 1}?trackId=1"
+            result = {}
+
+            if scan:
+                start = time.perf_counter()
+                linear_scan(probe)
+                result["scan_ms"] = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            WatchlistIndex().ensure_loaded()
+            result["rebuild_ms"] = (time.perf_counter() - start) * 1000
+
+            index = WatchlistIndex()
+            start = time.perf_counter()
+            index.ensure_loaded()
+            result["load_ms"] = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for i in range(lookups):
+                index.lookup(f"https://www.netflix.com/title/{i * 7 % rows}/", f"Title {i}")
+            result["lookup_us"] = (time.perf_counter() - start) * 1e6 / lookups
+
+            start = time.perf_counter()
+            for i in range(lookups):
+                index.add(f"https://example.org/{i}", f"New {i}")
+            result["add_us"] = (time.perf_counter() - start) * 1e6 / lookups
+            Functions.COMPACT_HOOKS.clear()
+            results[rows] = result
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark watchlist duplicate detection")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--no-scan", action="store_true", help="Skip the linear scan baseline")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.lookups, scan=not args.no_scan)
+    print(f"{'rows':>8} {'scan ms':>10} {'rebuild ms':>11} {'load ms':>9} {'lookup us':>10} {'add us':>8}")
+    for rows, result in results.items():
+        scan_ms = f"{result['scan_ms']:.1f}" if "scan_ms" in result else "-"
+        print(f"{rows:>8} {scan_ms:>10} {result['rebuild_ms']:>11.1f} {result['load_ms']:>9.1f} "
+              f"{result['lookup_us']:>10.2f} {result['add_us']:>8.2f}")
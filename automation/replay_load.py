@@ -0,0 +1,285 @@
+# replay_load.py
+# Load generator for the native messaging hosts without Chrome.
+#
+# Plays back frames recorded with `main.py --record FILE` (or
+# BROWSERTOCALC_RECORD=FILE for either host), or synthetic captures and
+# Netflix pages, into host processes over pipes. Frames go out at --rate
+# messages per second over --connections host processes, with at most
+# --inflight unanswered requests per process. Dialogs are auto-answered
+# offscreen, and workbook, metrics, log, thumbnails, extracted titles and the
+# extraction cache go to a temporary folder.
+# Reports throughput and latency percentiles; latency runs from writing a
+# frame to reading its response.
+#
+# Usage:
+#     python replay_load.py --synthetic 200 --rate 50 --inflight 4
+#     python replay_load.py recording.bin --host extract --connections 4
+#     python replay_load.py --synthetic 100 --write-recording burst.bin
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+import native_codec
+
+HOSTS = {
+    "main": [sys.executable, os.path.join(ROOT, "src", "main.py")],
+    "extract": [sys.executable, os.path.join(ROOT, "extract_netflix_json.py")],
+}
+
+
+def read_recording(path):
+    """Decode every frame of a recording."""
+    messages = []
+    with open(path, "rb") as f:
+        while True:
+            message = native_codec.read_message(f)
+            if message is None:
+                return messages
+            messages.append(message)
+
+
+def write_recording(path, messages):
+    with open(path, "wb") as f:
+        for message in messages:
+            native_codec.write_message(message, f, max_size=native_codec.MAX_INCOMING)
+
+
+def synthetic_messages(count, page_mb=0.2, host="main", headless=False):
+    """
+    Alternate captures and Netflix pages (pages only for the extract host).
+    headless captures carry "episodes", so the host writes them without a dialog.
+    """
+    from bench_extract_json import make_page
+    page = make_page(page_mb, position=0.5)
+    messages = []
+    for i in range(count):
+        if host == "main" and i % 2 == 0:
+            message = {"type": "save-row", "text": f"Title {i}",
+                       "url": f"https://www.netflix.com/title/{80000000 + i}", "localImage": False}
+            if headless:
+                message["episodes"] = "1"
+            messages.append(message)
+        else:
+            messages.append({"type": "extract-netflix", "htmlContent": page,
+                             "saveFiles": False, "useCache": False})
+    return messages
+
+
+def expects_response(message):
+    """Partial chunks are answered only by the transfer's last chunk."""
+    if message.get("type") != "chunk":
+        return True
+    return int(message.get("index", 0)) >= int(message.get("total", 1)) - 1
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Pacer:
+    """Hands out send times spaced 1/rate apart across all connections."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_time = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.perf_counter()
+            at = max(now, self.next_time)
+            self.next_time = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+class Connection:
+    """One host process with a sender and a reader thread."""
+
+    def __init__(self, number, command, env, pacer, inflight, stderr, cwd):
+        self.number = number
+        self.pacer = pacer
+        self.outbox = queue.Queue()
+        self.slots = threading.Semaphore(inflight)
+        self.pending = {}
+        self.order = []
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.entity_frames = 0
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=stderr, env=env, cwd=cwd)
+        self.sender = threading.Thread(target=self._send_loop, daemon=True)
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+
+    def start(self):
+        self.sender.start()
+        self.reader.start()
+
+    def _send_loop(self):
+        while True:
+            item = self.outbox.get()
+            if item is None:
+                break
+            request_id, message = item
+            answered = expects_response(message)
+            if answered:
+                self.slots.acquire()
+            self.pacer.wait()
+            with self.lock:
+                if answered:
+                    self.pending[request_id] = time.perf_counter()
+                    self.order.append(request_id)
+            native_codec.write_message(dict(message, requestId=request_id), self.process.stdin,
+                                       max_size=native_codec.MAX_INCOMING)
+        # Closing stdin ends the host once it has answered everything
+        self.process.stdin.close()
+
+    def _read_loop(self):
+        while True:
+            try:
+                response = native_codec.read_message(self.process.stdout)
+            except ValueError:
+                self.errors += 1
+                break
+            if response is None:
+                break
+            if response.get("type") == "entity":
+                self.entity_frames += 1
+                continue
+            now = time.perf_counter()
+            with self.lock:
+                request_id = response.get("requestId")
+                if request_id not in self.pending:
+                    # Host without requestId echo: answers come in order
+                    request_id = self.order[0] if self.order else None
+                sent = self.pending.pop(request_id, None)
+                if request_id in self.order:
+                    self.order.remove(request_id)
+            if sent is None:
+                continue
+            self.latencies.append((now - sent) * 1000)
+            if "error" in response:
+                self.errors += 1
+            self.slots.release()
+
+    def finish(self, timeout):
+        self.outbox.put(None)
+        self.sender.join(timeout)
+        self.reader.join(timeout)
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        return self.process.returncode
+
+
+def run(messages, host="main", connections=1, inflight=1, rate=0.0, timeout=120.0,
+        auto_answer="1", stderr_path=None):
+    """
+    Replay messages and return a report dict.
+    Returns: {"messages", "answered", "errors", "seconds", "throughput", "p50_ms", ...}
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env.update({
+            "BROWSERTOCALC_AUTO_ANSWER": auto_answer,
+            "QT_QPA_PLATFORM": "offscreen",
+            "BROWSERTOCALC_ODS_PATH": os.path.join(tmp, "load.ods"),
+            "BROWSERTOCALC_METRICS_PATH": os.path.join(tmp, "metrics.json"),
+            "BROWSERTOCALC_LOG_PATH": os.path.join(tmp, "debug.log"),
+            "BROWSERTOCALC_OUTPUT_DIR": os.path.join(tmp, "netflix"),
+            "BROWSERTOCALC_LOG_LEVEL": os.environ.get("BROWSERTOCALC_LOG_LEVEL", "WARNING"),
+        })
+        env.pop(native_codec.RECORD_ENV, None)
+        stderr = open(stderr_path or os.devnull, "wb")
+        pacer = Pacer(rate)
+        # Relative output paths of the hosts (e.g. the extraction cache) land in tmp
+        pool = [Connection(i, HOSTS[host], env, pacer, inflight, stderr, tmp) for i in range(connections)]
+        for connection in pool:
+            connection.start()
+
+        start = time.perf_counter()
+        round_robin = itertools.cycle(pool)
+        for i, message in enumerate(messages):
+            transfer = message.get("transferId") if message.get("type") == "chunk" else None
+            # Chunks of one transfer must reach the same process in order
+            connection = pool[hash(transfer) % connections] if transfer else next(round_robin)
+            connection.outbox.put((f"replay-{i}", message))
+        codes = [connection.finish(timeout) for connection in pool]
+        seconds = time.perf_counter() - start
+        stderr.close()
+
+    latencies = sorted(ms for connection in pool for ms in connection.latencies)
+    expected = sum(1 for message in messages if expects_response(message))
+    return {
+        "messages": len(messages),
+        "expected": expected,
+        "answered": len(latencies),
+        "errors": sum(connection.errors for connection in pool),
+        "entity_frames": sum(connection.entity_frames for connection in pool),
+        "exit_codes": codes,
+        "seconds": seconds,
+        "throughput": len(latencies) / seconds if seconds else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay native messages against a host")
+    parser.add_argument("recording", nargs="?", help="File written with --record / BROWSERTOCALC_RECORD")
+    parser.add_argument("--synthetic", type=int, help="Generate this many messages instead")
+    parser.add_argument("--page-mb", type=float, default=0.2, help="Size of synthetic Netflix pages")
+    parser.add_argument("--headless", action="store_true", help="Synthetic captures skip the dialog")
+    parser.add_argument("--write-recording", help="Store the (synthetic) messages as a recording and exit")
+    parser.add_argument("--host", choices=list(HOSTS), default="main")
+    parser.add_argument("--connections", type=int, default=1, help="Host processes")
+    parser.add_argument("--inflight", type=int, default=1, help="Unanswered requests per process")
+    parser.add_argument("--rate", type=float, default=0.0, help="Messages per second in total (0 = no limit)")
+    parser.add_argument("--answer", default="1", help="Auto-answer for the 5-char dialog field")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--stderr", help="Write the hosts' stderr to this file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        messages = synthetic_messages(args.synthetic, args.page_mb, args.host, args.headless)
+    elif args.recording:
+        messages = read_recording(args.recording)
+    else:
+        parser.error("Give a recording or --synthetic N")
+    if args.write_recording:
+        write_recording(args.write_recording, messages)
+        print(f"{len(messages)} Nachrichten gespeichert: {args.write_recording}")
+        sys.exit(0)
+
+    report = run(messages, args.host, args.connections, args.inflight, args.rate,
+                 args.timeout, args.answer, args.stderr)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['answered']}/{report['expected']} answered, {report['errors']} errors, "
+              f"{report['entity_frames']} entity frames, exit codes {report['exit_codes']}")
+        print(f"{report['seconds']:.2f}s, {report['throughput']:.1f} msg/s")
+        print(f"latency p50 {report['p50_ms']:.1f} ms  p95 {report['p95_ms']:.1f} ms  "
+              f"p99 {report['p99_ms']:.1f} ms  max {report['max_ms']:.1f} ms")
+    sys.exit(1 if report["answered"] < report["expected"] else 0)
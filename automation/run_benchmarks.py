@@ -0,0 +1,208 @@
+# run_benchmarks.py
+# Benchmark suite for the host hot paths with a stored baseline.
+#
+# Every case returns {metric: milliseconds} (lower is better) measured on
+# synthetic workbooks, HTML pages and frames of increasing size. The median
+# of --repeat runs is compared with automation/benchmark_baseline.json and
+# the run fails when a metric got slower than --threshold percent.
+#
+# Usage:
+#     python run_benchmarks.py --save-baseline      measure and store a baseline
+#     python run_benchmarks.py                      compare against it (exit 1 on regression)
+#     python run_benchmarks.py --only extract format --profile full
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+sys.path.insert(0, os.path.join(HERE, '..'))
+
+BASELINE_PATH = os.path.join(HERE, "benchmark_baseline.json")
+
+# Fixture sizes per profile: workbook rows, page MB, frame sizes
+PROFILES = {
+    "quick": {"rows": [1000, 5000], "pages": [0.5, 2], "frames": ["1KB", "1MB"], "titles": 2000},
+    "full": {"rows": [1000, 10000, 50000], "pages": [0.5, 2, 5], "frames": ["1KB", "1MB", "32MB"], "titles": 10000},
+}
+
+
+def bench_ods_append(sizes):
+    """Journaled append and compaction on workbooks of increasing size."""
+    import Functions
+    from bench_ods_append import run
+    original = Functions.ODS_PATH, Functions.JOURNAL_COMPACT_ROWS
+    try:
+        results = run(sizes["rows"], appends=20, legacy=False)
+    finally:
+        Functions.ODS_PATH, Functions.JOURNAL_COMPACT_ROWS = original
+    metrics = {}
+    for rows, r in results.items():
+        metrics[f"append_{rows}"] = r["journal_ms"]
+        metrics[f"compact_{rows}"] = r["compact_ms"]
+    return metrics
+
+
+def bench_framing(sizes):
+    """Write + read of one native messaging frame over a pipe."""
+    import native_codec
+    from bench_codec import SIZES, codec_write, transfer
+    metrics = {}
+    for name in sizes["frames"]:
+        count = max(2, min(500, 16 * 1024 * 1024 // SIZES[name]))
+        seconds = transfer(codec_write, native_codec.read_message, "x" * SIZES[name], count)
+        metrics[f"frame_{name}"] = seconds * 1000 / count
+    return metrics
+
+
+def bench_extract(sizes):
+    """extract_netflix_json_from_content with the JSON-LD early and late in the page."""
+    from bench_extract_json import make_page, timed
+    from extract_netflix_json import extract_netflix_json_from_content
+    metrics = {}
+    for size in sizes["pages"]:
+        for position in (0.1, 0.9):
+            page = make_page(size, position)
+            ms, data = timed(extract_netflix_json_from_content, page, repeat=3)
+            assert data and data.get("name") == "Dark"
+            metrics[f"extract_{size}MB_at_{int(position * 100)}"] = ms
+    return metrics
+
+
+def bench_format(sizes):
+    """format_netflix_data over a batch of titles."""
+    from extract_netflix_json import format_netflix_data
+    titles = [{
+        "@context": "http://schema.org", "@type": "TVSeries", "name": f"Title {i}",
+        "url": f"https://www.netflix.com/title/{80000000 + i}", "genre": "TV-Dramen",
+        "actors": [{"@type": "Person", "name": f"Actor {j}"} for j in range(20)],
+        "director": [{"@type": "Person", "name": "Director"}],
+        "creator": [{"@type": "Person", "name": "Creator"}],
+    } for i in range(sizes["titles"])]
+    start = time.perf_counter()
+    for title in titles:
+        format_netflix_data(title)
+    return {f"format_{sizes['titles']}": (time.perf_counter() - start) * 1000}
+
+
+def bench_inputbox(sizes):
+    """Offscreen dialog construction and a full inputbox round trip."""
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    import form_widget
+
+    start = time.perf_counter()
+    dialog = form_widget.InputDialog()
+    build_ms = (time.perf_counter() - start) * 1000
+    dialog.deleteLater()
+
+    # First call builds the shared dialog, the second reuses it
+    rounds = []
+    for _ in range(2):
+        QTimer.singleShot(0, lambda: form_widget.get_input_dialog().accept())
+        start = time.perf_counter()
+        form_widget.inputbox("Folgen", "", default_long_text="Dark")
+        rounds.append((time.perf_counter() - start) * 1000)
+    app.processEvents()
+    return {"dialog_build": build_ms, "inputbox_first": rounds[0], "inputbox_reused": rounds[1]}
+
+
+CASES = {
+    "ods_append": bench_ods_append,
+    "framing": bench_framing,
+    "extract": bench_extract,
+    "format": bench_format,
+    "inputbox": bench_inputbox,
+}
+
+
+def measure(names, profile, repeat):
+    """Run the cases `repeat` times and keep the median of every metric."""
+    sizes = PROFILES[profile]
+    samples = {}
+    for name in names:
+        for _ in range(repeat):
+            for metric, value in CASES[name](sizes).items():
+                samples.setdefault(f"{name}.{metric}", []).append(value)
+    return {metric: statistics.median(values) for metric, values in samples.items()}
+
+
+def compare(results, baseline, threshold, min_ms):
+    """
+    Compare with the baseline metrics.
+    Returns: list of (metric, baseline ms, current ms, change %, status)
+    """
+    rows = []
+    for metric, current in results.items():
+        base = baseline.get(metric)
+        if base is None:
+            rows.append((metric, None, current, None, "new"))
+            continue
+        change = (current - base) / base * 100 if base else 0.0
+        regressed = change > threshold and current - base > min_ms
+        rows.append((metric, base, current, change, "SLOWER" if regressed else "ok"))
+    return rows
+
+
+def environment():
+    return {"python": platform.python_version(), "machine": platform.machine(),
+            "system": platform.system(), "processor": platform.processor()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the host benchmark suite")
+    parser.add_argument("--only", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--profile", choices=list(PROFILES), default="quick")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is used")
+    parser.add_argument("--threshold", type=float, default=25.0, help="Allowed slowdown in percent")
+    parser.add_argument("--min-ms", type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    results = measure(args.only, args.profile, args.repeat)
+
+    if args.save_baseline:
+        stored = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                stored = json.load(f)
+        profiles = stored.setdefault("profiles", {})
+        profiles.setdefault(args.profile, {}).update(results)
+        stored["environment"] = environment()
+        stored["saved"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+        for metric, value in results.items():
+            print(f"{metric:<40} {value:>10.3f} ms")
+        print(f"Baseline gespeichert: {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        for metric, value in results.items():
+            print(f"{metric:<40} {value:>10.3f} ms")
+        print("Keine Baseline vorhanden, mit --save-baseline anlegen")
+        sys.exit(0)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        stored = json.load(f)
+    if stored.get("environment") != environment():
+        print(f"Warnung: Baseline stammt von einer anderen Umgebung {stored.get('environment')}")
+    rows = compare(results, stored.get("profiles", {}).get(args.profile, {}), args.threshold, args.min_ms)
+    print(f"{'metric':<40} {'baseline ms':>12} {'current ms':>12} {'change':>8}  status")
+    for metric, base, current, change, status in rows:
+        base_text = f"{base:.3f}" if base is not None else "-"
+        change_text = f"{change:+.1f}%" if change is not None else "-"
+        print(f"{metric:<40} {base_text:>12} {current:>12.3f} {change_text:>8}  {status}")
+    slower = [row for row in rows if row[4] == "SLOWER"]
+    if slower:
+        print(f"{len(slower)} Messwert(e) mehr als {args.threshold:.0f}% langsamer als die Baseline")
+        sys.exit(1)
+    print("Keine Regression")
@@ -3,14 +3,35 @@
 Netflix JSON Data Extractor
 Processes Netflix data internally via native messaging from browser extension
 Works as a native messaging host to receive data from the browser extension
+The unified host src/main.py serves the same messages ("extract-netflix" and
+"chunk") next to spreadsheet captures, sharing one process and its caches
+Set BROWSERTOCALC_RECORD=<file> to record the incoming frames for
+automation/replay_load.py
 """
 
 import json
+import os
 import re
 import sys
-import struct
+import time
 from pathlib import Path
 
+# The framing codec is shared with the host in src/
+sys.path.insert(1, str(Path(__file__).resolve().parent / "src"))
+import metrics
+import native_codec
+from netflix_cache import ExtractionCache, payload_hash
+from netflix_store import TitleStore
+
+# Where extracted titles go: "files" writes a JSON file pair per title,
+# "store" appends to the consolidated SQLite store (see netflix_store.py).
+# Messages can override this with a "storage" field. BROWSERTOCALC_OUTPUT_DIR
+# points the files, the store and the extraction cache at another folder.
+OUTPUT_DIR = Path(os.environ.get("BROWSERTOCALC_OUTPUT_DIR", "d:/Browsertocalc"))
+STORAGE_BACKEND = "files"
+
+_title_store = None
+
 # NOTE: This script works internally with the browser extension via native messaging
 # The extension captures the fully rendered page data and sends it to this script
 # This script processes the data and can send it to LibreOffice Calc or save as files
@@ -23,19 +44,14 @@ def read_message():
         dict: Message from browser extension or None if error
     """
     try:
-        # Read message length (4 bytes)
-        raw_length = sys.stdin.buffer.read(4)
-        if len(raw_length) == 0:
-            return None
-        
-        message_length = struct.unpack('=I', raw_length)[0]
-        
-        # Read message content
-        message = sys.stdin.buffer.read(message_length).decode('utf-8')
-        return json.loads(message)
+        return native_codec.read_message()
     except Exception as e:
         return {"error": f"Failed to read message: {str(e)}"}
 
+# The real stdout while the native loop runs; sys.stdout then points at
+# stderr so that prints cannot corrupt the framing
+_native_stdout = None
+
 def send_message(message):
     """
     Send a message back to the browser extension via native messaging
@@ -44,50 +60,291 @@ def send_message(message):
         message (dict): Message to send to browser extension
     """
     try:
-        encoded_content = json.dumps(message).encode('utf-8')
-        encoded_length = struct.pack('=I', len(encoded_content))
-        
-        sys.stdout.buffer.write(encoded_length)
-        sys.stdout.buffer.write(encoded_content)
-        sys.stdout.buffer.flush()
+        native_codec.write_message(message, _native_stdout)
     except Exception as e:
-        # Send error back to extension
-        error_msg = {"error": f"Failed to send message: {str(e)}"}
-        encoded_content = json.dumps(error_msg).encode('utf-8')
-        encoded_length = struct.pack('=I', len(encoded_content))
-        sys.stdout.buffer.write(encoded_length)
-        sys.stdout.buffer.write(encoded_content)
-        sys.stdout.buffer.flush()
+        # Send error back to extension (e.g. response over Chrome's 1 MiB limit)
+        native_codec.write_message({"error": f"Failed to send message: {str(e)}"}, _native_stdout)
+
+# JSON-LD lives in <script type="application/ld+json"> blocks; older saved
+# pages are matched on the schema.org context anchor instead. Both are found
+# with plain substring searches, which are much faster than a regex scan.
+# The scan below works on the page as str and as bytes (a memory-mapped
+# file), so in-memory pages, saved files and streamed chunks all find the
+# same blocks.
+LD_JSON_TYPE = 'application/ld+json'
+SCHEMA_ORG_ANCHOR = '{"@context":"http://schema.org"'
+SCRIPT_END = '</script'
+# Longest opening tag kept back when a page arrives in pieces
+MAX_TAG_LENGTH = 4096
+# Initial slice decoded around a context anchor in bytes, where there is no
+# closing </script> to bound the object; doubled until the object is complete
+ANCHOR_WINDOW = 64 * 1024
+
+_json_decoder = json.JSONDecoder()
+
+def _decode_json_at(html_content, start):
+    """
+    Decode the JSON value starting at (or after whitespace from) start.
+    The decoder stops at the balanced end of the value, so nothing after it
+    is scanned.
+
+    Returns:
+        tuple: (value, end index) or (None, start) if it is not valid JSON
+    """
+    while start < len(html_content) and html_content[start] in ' \t\r\n':
+        start += 1
+    try:
+        return _json_decoder.raw_decode(html_content, start)
+    except json.JSONDecodeError:
+        return None, start
+
+def _marker(buffer, text):
+    """text in the type of buffer (str, or ASCII bytes for bytes and mmap)."""
+    return text if isinstance(buffer, str) else text.encode('ascii')
+
+def _find_script_tag(buffer, pos=0):
+    """
+    Find the next <script> tag whose attributes hold application/ld+json
+    
+    Mentions of the type outside an opening <script> tag (e.g. in the code
+    of another script) are skipped.
+    
+    Args:
+        buffer (str | bytes | mmap): Page or part of a page
+        pos (int): Where to start searching
+        
+    Returns:
+        tuple: (start of the script body, None), or (-1, resume) if there is
+        no complete tag; a tag cut off at the end of buffer starts at resume
+    """
+    ld_type = _marker(buffer, LD_JSON_TYPE)
+    lt, gt = _marker(buffer, '<'), _marker(buffer, '>')
+    while True:
+        pos = buffer.find(ld_type, pos)
+        if pos == -1:
+            last_tag = buffer.rfind(lt, max(0, len(buffer) - MAX_TAG_LENGTH))
+            if last_tag != -1 and buffer.find(gt, last_tag) == -1:
+                return -1, last_tag
+            return -1, len(buffer)
+        tag_start = buffer.rfind(lt, 0, pos)
+        if (tag_start == -1 or buffer.rfind(gt, tag_start, pos) != -1
+                or buffer[tag_start:tag_start + 7].lower() != _marker(buffer, '<script')):
+            pos += len(ld_type)
+            continue
+        tag_end = buffer.find(gt, pos)
+        if tag_end == -1:
+            return -1, tag_start
+        return tag_end + 1, None
+
+def _find_script_end(buffer, start=0):
+    """Index of the next </script (or </SCRIPT) from start, -1 if there is none."""
+    found = -1
+    for end_tag in (SCRIPT_END, SCRIPT_END.upper()):
+        pos = buffer.find(_marker(buffer, end_tag), start)
+        if pos != -1 and (found == -1 or pos < found):
+            found = pos
+    return found
+
+def _decode_json_body(body):
+    """Parse the JSON value at the start of a script body (str or bytes)."""
+    if not isinstance(body, str):
+        body = body.decode('utf-8', errors='replace')
+    value, _ = _decode_json_at(body, 0)
+    return value
 
-def extract_netflix_json_from_content(html_content):
+def _decode_json_from(buffer, pos):
+    """
+    Decode the JSON value at pos of a str or bytes buffer.
+    Bytes are decoded in a growing window instead of all at once.
+    
+    Returns:
+        tuple: (value, end index) or (None, pos) if it is not valid JSON
+    """
+    if isinstance(buffer, str):
+        return _decode_json_at(buffer, pos)
+    window = ANCHOR_WINDOW
+    while True:
+        end = min(pos + window, len(buffer))
+        text = buffer[pos:end].decode('utf-8', errors='ignore')
+        value, value_end = _decode_json_at(text, 0)
+        if value is not None or end == len(buffer):
+            break
+        window *= 2
+    if value is None:
+        return None, pos
+    return value, pos + len(text[:value_end].encode('utf-8'))
+
+def _iter_json_ld_blocks(buffer):
+    """
+    Yield the decoded value (object or array) of every JSON-LD block.
+    buffer is the page as str, or as bytes/mmap; only the bytes of each
+    block are decoded then.
+    """
+    if not buffer:
+        return
+    
+    found_script = False
+    start, _ = _find_script_tag(buffer)
+    while start != -1:
+        found_script = True
+        end = _find_script_end(buffer, start)
+        if end == -1:
+            end = len(buffer)
+        value = _decode_json_body(buffer[start:end])
+        if isinstance(value, (dict, list)):
+            yield value
+        start, _ = _find_script_tag(buffer, end)
+    
+    if found_script:
+        return
+    
+    # No script tags (e.g. serialized page data): fall back to the anchor
+    anchor = _marker(buffer, SCHEMA_ORG_ANCHOR)
+    pos = buffer.find(anchor)
+    while pos != -1:
+        value, end = _decode_json_from(buffer, pos)
+        if isinstance(value, dict):
+            yield value
+        pos = buffer.find(anchor, max(end, pos + 1))
+
+def iter_netflix_json_from_content(html_content):
+    """
+    Lazily yield the JSON-LD objects of an HTML page in document order
+    
+    Args:
+        html_content (str): HTML content string
+        
+    Yields:
+        dict: One JSON-LD object per script block (or context anchor)
+    """
+    for value in _iter_json_ld_blocks(html_content):
+        if isinstance(value, dict):
+            yield value
+
+def extract_netflix_json_from_content(html_content, all_objects=False):
     """
     Extract Netflix JSON-LD structured data from HTML content
     
     Args:
         html_content (str): HTML content string
+        all_objects (bool): Return every JSON-LD object instead of the first
         
     Returns:
         dict: Extracted Netflix data or None if not found
+        (list of dicts if all_objects is set)
     """
-    if not html_content:
-        return None
+    objects = iter_netflix_json_from_content(html_content)
+    if all_objects:
+        return list(objects)
+    
+    # Only the first object is needed; the rest of the page is never scanned
+    json_data = next(objects, None)
+    if json_data is None:
+        print("No JSON-LD structured data found in the HTML content")
+    return json_data
+
+# Properties whose values are further entities of the same page: @graph
+# containers, the seasons and episodes of a series and list items
+ENTITY_LIST_KEYS = ("@graph", "containsSeason", "episode", "hasPart", "itemListElement")
+
+def iter_entities(value):
+    """
+    Expand one JSON-LD value into its entities, depth first
     
-    # Look for JSON-LD structured data with schema.org context
-    json_pattern = r'\{"@context":"http://schema\.org".*?\}'
+    Arrays, @graph containers and nested seasons, episodes and list items
+    are walked without copying; ListItem wrappers yield their item.
     
-    matches = re.findall(json_pattern, html_content, re.DOTALL)
+    Args:
+        value (dict | list): Decoded JSON-LD block
+        
+    Yields:
+        dict: Every object that has an @type, parents before their children
+    """
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, list):
+            stack.extend(reversed(value))
+            continue
+        if not isinstance(value, dict):
+            continue
+        if value.get("@type") == "ListItem" and isinstance(value.get("item"), dict):
+            stack.append(value["item"])
+            continue
+        if "@type" in value:
+            yield value
+        stack.extend(value[key] for key in reversed(ENTITY_LIST_KEYS) if key in value)
+
+def iter_netflix_entities(html_content):
+    """
+    Lazily yield every JSON-LD entity of an HTML page
     
-    if not matches:
-        print("No JSON-LD structured data found in the HTML content")
-        return None
+    Unlike iter_netflix_json_from_content this also looks inside arrays,
+    @graph containers and series/season objects, so episode and related
+    title entities are included. Scanning only proceeds as far as the
+    consumer reads.
     
-    try:
-        # Parse the first match (should be the main content)
-        json_data = json.loads(matches[0])
-        return json_data
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON data: {e}")
-        return None
+    Args:
+        html_content (str): HTML content string
+        
+    Yields:
+        dict: Raw JSON-LD entity
+    """
+    for block in _iter_json_ld_blocks(html_content):
+        yield from iter_entities(block)
+
+def stream_entities(entities, message, send):
+    """
+    Format entities one at a time and send each as its own frame
+    
+    Frames look like {"type": "entity", "index": 0, "data": {...}}; only
+    one formatted entity is held at a time. Entities are not saved to files.
+    
+    Args:
+        entities (iterable): Raw JSON-LD entities (e.g. iter_netflix_entities)
+        message (dict): Message options (maxEntities, includeRaw)
+        send (callable): Writes one frame to the extension
+        
+    Returns:
+        dict: Final response with the number of entities sent
+    """
+    limit = message.get("maxEntities")
+    count = 0
+    for entity in entities:
+        frame = {"type": "entity", "index": count, "data": format_netflix_data(entity)}
+        if message.get("includeRaw"):
+            frame["raw"] = entity
+        send(frame)
+        count += 1
+        if limit and count >= limit:
+            break
+    if not count:
+        return {"error": "Failed to extract JSON data from HTML"}
+    return {"success": True, "entities": count}
+
+def iter_netflix_json_from_file(html_file_path):
+    """
+    Lazily yield the JSON-LD objects of a saved HTML page
+    
+    The file is memory-mapped and searched as raw bytes; only the bytes of
+    each JSON-LD object are copied and decoded, so memory use follows the
+    size of the structured data rather than the size of the page.
+    
+    Args:
+        html_file_path (str): Path to the HTML file
+        
+    Yields:
+        dict: One JSON-LD object per script block (or context anchor)
+    """
+    import mmap
+    
+    with open(html_file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for value in _iter_json_ld_blocks(buffer):
+                if isinstance(value, dict):
+                    yield value
 
 def extract_netflix_json(html_file_path):
     """
@@ -100,13 +357,209 @@ def extract_netflix_json(html_file_path):
         dict: Extracted Netflix data or None if not found
     """
     try:
-        with open(html_file_path, 'r', encoding='utf-8') as file:
-            html_content = file.read()
+        json_data = next(iter_netflix_json_from_file(html_file_path), None)
     except Exception as e:
         print(f"Error reading file: {e}")
         return None
     
-    return extract_netflix_json_from_content(html_content)
+    if json_data is None:
+        print("No JSON-LD structured data found in the HTML content")
+    return json_data
+
+# Open chunk transfers are dropped once no chunk arrived for TRANSFER_TTL
+# seconds (e.g. the tab was closed mid-upload); beyond MAX_OPEN_TRANSFERS the
+# least recently active one goes
+TRANSFER_TTL = 120.0
+MAX_OPEN_TRANSFERS = 8
+
+class ChunkAssembler:
+    """
+    Reassemble a page that the extension streams as numbered chunk messages
+    
+    Chunk messages look like
+        {"type": "chunk", "transferId": "...", "index": 0, "total": 12,
+         "data": "<html fragment>", "saveFiles": true}
+    and must arrive in order over one connectNative port. Each chunk is
+    scanned for the JSON-LD script block as it arrives; once the object is
+    complete the buffered chunks are dropped and later chunks are ignored.
+    Pages without a script block are scanned in full when the last chunk
+    arrives. Transfers that ask for allEntities keep the whole page for
+    iter_netflix_entities instead.
+    """
+    
+    def __init__(self, total, message=None):
+        self.total = total
+        self.received = 0
+        self.message = message or {}
+        self.result = None
+        self.keep_page = bool(self.message.get("allEntities"))
+        self._parts = []
+        self._carry = ''
+        self._body = None
+        self.last_active = time.monotonic()
+    
+    def add(self, index, data):
+        """
+        Add the next chunk
+        
+        Returns:
+            bool: True once the last chunk has been received
+        """
+        if index != self.received:
+            raise ValueError(f"Expected chunk {self.received}, got {index}")
+        if not isinstance(data, str):
+            raise ValueError(f"Chunk data must be a string, got {type(data).__name__}")
+        self.last_active = time.monotonic()
+        self.received += 1
+        if self.keep_page:
+            self._parts.append(data)
+        elif self.result is None:
+            self._parts.append(data)
+            self._scan(data)
+            if self.result is not None:
+                # JSON-LD found, the rest of the page is not needed
+                self._parts = []
+        return self.received >= self.total
+    
+    def _scan(self, data):
+        """Advance the script block search over the newly received chunk."""
+        if self._body is not None:
+            self._collect(data)
+            return
+        window = self._carry + data
+        start, resume = _find_script_tag(window)
+        if start == -1:
+            # Keep a tag that is cut off at the end for the next chunk
+            self._carry = window[resume:]
+            return
+        self._body = []
+        self._carry = ''
+        self._collect(window[start:])
+    
+    def _collect(self, data):
+        """Buffer the script body until its closing tag shows up."""
+        overlap = len(SCRIPT_END)
+        # The closing tag may span several (small) chunks already buffered
+        previous = ''
+        for part in reversed(self._body):
+            previous = part + previous
+            if len(previous) >= overlap:
+                break
+        previous = previous[-overlap:]
+        self._body.append(data)
+        end = _find_script_end(previous + data)
+        if end == -1:
+            return
+        body = ''.join(self._body)
+        body_end = len(body) - len(data) - len(previous) + end
+        value = _decode_json_body(body[:body_end])
+        rest = body[body_end + overlap:]
+        self._body = None
+        if isinstance(value, dict):
+            self.result = value
+        else:
+            # Not a usable block, keep looking in what follows it
+            self._scan(rest)
+    
+    def finish(self):
+        """
+        Return the first JSON-LD object of the page
+        
+        Returns:
+            dict: Extracted Netflix data or None if not found
+        """
+        if self.result is None and self._parts:
+            self.result = extract_netflix_json_from_content(''.join(self._parts))
+        self._parts = []
+        return self.result
+    
+    def page(self):
+        """Return the reassembled page (allEntities transfers only)."""
+        html_content = ''.join(self._parts)
+        self._parts = []
+        return html_content
+
+def add_chunk(transfers, message):
+    """
+    Feed one chunk message into its transfer
+    
+    Args:
+        transfers (dict): Open transfers by transferId
+        message (dict): Chunk message
+        
+    Returns:
+        ChunkAssembler: The completed transfer, or None while chunks are missing
+    """
+    expire_transfers(transfers)
+    transfer_id = message.get("transferId")
+    try:
+        total = int(message.get("total", 0))
+        index = int(message.get("index", -1))
+    except (TypeError, ValueError):
+        transfers.pop(transfer_id, None)
+        raise ValueError("Chunk index and total must be numbers") from None
+    if transfer_id is None or total < 1:
+        raise ValueError("Chunk message needs transferId and total")
+    assembler = transfers.get(transfer_id)
+    if assembler is None:
+        expire_transfers(transfers, MAX_OPEN_TRANSFERS - 1)
+        options = {k: v for k, v in message.items() if k not in ("type", "data", "index")}
+        assembler = transfers[transfer_id] = ChunkAssembler(total, options)
+    try:
+        done = assembler.add(index, message.get("data", ""))
+    except Exception:
+        # A transfer that went wrong once cannot be completed any more
+        transfers.pop(transfer_id, None)
+        raise
+    if not done:
+        return None
+    transfers.pop(transfer_id, None)
+    return assembler
+
+def expire_transfers(transfers, limit=None, now=None):
+    """
+    Drop transfers that had no chunk for TRANSFER_TTL seconds, so abandoned
+    streams do not keep their chunks for the life of a persistent host
+    
+    Args:
+        transfers (dict): Open transfers by transferId
+        limit (int): Also drop the least recently active transfers until
+            at most this many are left
+        
+    Returns:
+        int: Number of transfers dropped
+    """
+    now = time.monotonic() if now is None else now
+    # A snapshot: the other CPU worker may add or finish a transfer meanwhile
+    open_transfers = sorted(transfers.items(), key=lambda item: item[1].last_active)
+    excess = len(open_transfers) - limit if limit is not None else 0
+    dropped = 0
+    for i, (transfer_id, assembler) in enumerate(open_transfers):
+        if i < excess or now - assembler.last_active > TRANSFER_TTL:
+            if transfers.pop(transfer_id, None) is not None:
+                dropped += 1
+    return dropped
+
+def netflix_id_from_url(url):
+    """
+    Return the numeric title id of a Netflix URL
+    
+    Args:
+        url (str): Netflix title URL
+        
+    Returns:
+        str: Netflix ID or "" if the URL has none
+    """
+    id_match = re.search(r'/title/(\d+)', url or "")
+    return id_match.group(1) if id_match else ""
+
+def _saved_files_exist(formatted_data, storage=STORAGE_BACKEND):
+    """Check that a cached title was saved with this storage backend and the output is still there."""
+    if storage == "store":
+        saved = formatted_data.get("savedStore")
+        return bool(saved) and Path(saved).exists()
+    saved = formatted_data.get("savedFiles")
+    return bool(saved) and all(Path(path).exists() for path in saved.values())
 
 def format_netflix_data(json_data):
     """
@@ -137,10 +590,7 @@ def format_netflix_data(json_data):
     }
     
     # Extract Netflix ID from URL
-    if formatted_data["url"]:
-        id_match = re.search(r'/title/(\d+)', formatted_data["url"])
-        if id_match:
-            formatted_data["netflix_id"] = id_match.group(1)
+    formatted_data["netflix_id"] = netflix_id_from_url(formatted_data["url"])
     
     # Process cast
     actors = json_data.get("actors", [])
@@ -177,6 +627,41 @@ def save_json_data(data, output_file):
     except Exception as e:
         print(f"Error saving JSON file: {e}")
 
+def save_extracted_title(formatted_data, raw_json, storage=STORAGE_BACKEND):
+    """
+    Save a title with the selected storage backend
+    
+    Args:
+        formatted_data (dict): Formatted Netflix data
+        raw_json (dict): Raw JSON-LD object
+        storage (str): "files" or "store"
+        
+    Returns:
+        dict: {"savedFiles": {...}} or {"savedStore": path} to merge into the response
+    """
+    global _title_store
+    if storage == "store":
+        if _title_store is None:
+            _title_store = TitleStore(OUTPUT_DIR / "netflix_titles.sqlite")
+        _title_store.add(formatted_data, raw_json)
+        return {"savedStore": str(_title_store.path)}
+    
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    netflix_id = formatted_data.get('netflix_id', 'unknown')
+    
+    # Save formatted data
+    output_file = OUTPUT_DIR / f"netflix_extracted_data_{netflix_id}.json"
+    save_json_data(formatted_data, output_file)
+    
+    # Save raw JSON
+    raw_output_file = OUTPUT_DIR / f"netflix_raw_json_{netflix_id}.json"
+    save_json_data(raw_json, raw_output_file)
+    
+    return {"savedFiles": {
+        "formatted": str(output_file),
+        "raw": str(raw_output_file)
+    }}
+
 def print_summary(data):
     """
     Print a summary of the extracted Netflix data
@@ -219,72 +704,306 @@ def print_summary(data):
     print(f"Netflix URL: {data['url']}")
     print("="*60)
 
+BATCH_EXTENSIONS = ('.html', '.htm')
+
+def iter_batch_inputs(patterns):
+    """
+    Expand directories and glob patterns into HTML file paths
+    
+    Args:
+        patterns (list): Files, directories (searched recursively) or globs
+        
+    Yields:
+        str: Path of each HTML file, without duplicates
+    """
+    import glob
+    
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = (os.path.join(root, name)
+                          for root, _, names in os.walk(pattern)
+                          for name in sorted(names)
+                          if name.lower().endswith(BATCH_EXTENSIONS))
+        elif glob.has_magic(pattern):
+            candidates = sorted(glob.glob(pattern, recursive=True))
+        else:
+            candidates = [pattern]
+        for path in candidates:
+            if path not in seen and os.path.isfile(path):
+                seen.add(path)
+                yield path
+
+def process_html_file(html_file_path):
+    """
+    Extract and format one saved page; runs inside the batch worker processes
+    
+    Args:
+        html_file_path (str): Path to the HTML file
+        
+    Returns:
+        dict: {"source", "bytes", "data", "raw"} or {"source", "bytes", "error"}
+    """
+    result = {"source": str(html_file_path), "bytes": 0}
+    try:
+        result["bytes"] = os.path.getsize(html_file_path)
+        raw_json = next(iter_netflix_json_from_file(html_file_path), None)
+        if not raw_json:
+            result["error"] = "No JSON-LD structured data found"
+            return result
+        result["data"] = format_netflix_data(raw_json)
+        result["raw"] = raw_json
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def _cell_text(value):
+    """
+    Spreadsheet cell for a formatted field; JSON-LD values can be lists
+    (several genres or images) or objects, which a cell cannot hold
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_cell_text(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def _write_batch_ods(results, output_file):
+    """Write one spreadsheet row per successfully extracted page."""
+    from collections import OrderedDict
+    from pyexcel_ods3 import save_data
+    
+    header = ["title", "type", "netflix_id", "content_rating", "genre", "release_date",
+              "url", "image_url", "cast", "directors", "creators", "source"]
+    sheet = [header]
+    for result in results:
+        data = result.get("data")
+        if not data:
+            continue
+        row = dict(data, source=result["source"])
+        sheet.append([_cell_text(row.get(column)) for column in header])
+    book = OrderedDict()
+    book["Netflix"] = sheet
+    save_data(str(output_file), book)
+
+def run_batch(patterns, output_file, jobs=None):
+    """
+    Extract every page matched by patterns in a process pool
+    
+    Results are written as one JSONL line per page (or one ODS row per page
+    if output_file ends in .ods, or into the title store for .sqlite). A
+    failing page is recorded with its error and does not stop the run.
+    
+    Args:
+        patterns (list): Files, directories or glob patterns
+        output_file (str): .jsonl, .ods or .sqlite output path
+        jobs (int): Worker processes (default: CPU count)
+        
+    Returns:
+        dict: Run statistics (pages, failed, seconds, pages_per_sec, mb_per_sec)
+    """
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+    
+    paths = list(iter_batch_inputs(patterns))
+    as_ods = str(output_file).lower().endswith('.ods')
+    store = TitleStore(output_file) if str(output_file).lower().endswith('.sqlite') else None
+    start = time.perf_counter()
+    total_bytes = 0
+    failed = 0
+    ods_results = []
+    
+    with ProcessPoolExecutor(max_workers=jobs) as pool, \
+            open(os.devnull if as_ods or store else output_file, 'w', encoding='utf-8') as out:
+        chunksize = max(1, len(paths) // ((jobs or os.cpu_count() or 1) * 4))
+        for result in pool.map(process_html_file, paths, chunksize=chunksize):
+            total_bytes += result["bytes"]
+            if store and "data" in result:
+                try:
+                    store.add(result["data"], result["raw"], commit=False)
+                except Exception as e:
+                    # One title the store cannot take does not stop the run
+                    result["error"] = f"Could not store title: {str(e)}"
+            if "error" in result:
+                failed += 1
+                print(f"Failed: {result['source']}: {result['error']}")
+            if as_ods:
+                ods_results.append(result)
+            elif not store:
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    
+    if as_ods:
+        _write_batch_ods(ods_results, output_file)
+    if store:
+        store.db.commit()
+        store.close()
+    
+    seconds = time.perf_counter() - start
+    stats = {
+        "pages": len(paths),
+        "failed": failed,
+        "seconds": seconds,
+        "pages_per_sec": len(paths) / seconds if seconds else 0.0,
+        "mb_per_sec": total_bytes / (1024 * 1024) / seconds if seconds else 0.0,
+    }
+    print(f"Processed {stats['pages']} pages ({failed} failed) in {seconds:.2f}s: "
+          f"{stats['pages_per_sec']:.1f} pages/sec, {stats['mb_per_sec']:.1f} MB/sec")
+    return stats
+
+def open_cache():
+    """
+    Open the extraction cache
+    
+    Returns:
+        ExtractionCache: The cache, or None if its location is unavailable
+    """
+    try:
+        return ExtractionCache()
+    except Exception:
+        # No cache location (e.g. drive missing): work uncached
+        return None
+
+def extract_from_message(message, transfers):
+    """
+    Get the raw JSON-LD object for one extension message
+    
+    Args:
+        message (dict): htmlContent or chunk message
+        transfers (dict): Open chunk transfers by transferId
+        
+    Returns:
+        tuple: (raw_json, message, response) - raw_json is None and response
+        holds the error to send if extraction failed; all three are None
+        while a chunked transfer is still incomplete. message is the original
+        message, or the options of the first chunk for a finished transfer.
+        For allEntities messages raw_json is a lazy iterator of entities
+        for stream_entities
+    """
+    if "error" in message:
+        return None, message, {"error": message["error"]}
+    
+    if message.get("type") == "chunk":
+        # Large page streamed in several messages
+        try:
+            assembler = add_chunk(transfers, message)
+        except ValueError as e:
+            return None, message, {"error": f"Invalid chunk: {str(e)}"}
+        if assembler is None:
+            return None, None, None
+        message = assembler.message
+        if message.get("allEntities"):
+            return iter_netflix_entities(assembler.page()), message, None
+        raw_json = assembler.finish()
+    else:
+        # Process the HTML content from the extension
+        html_content = message.get("htmlContent", "")
+        if not html_content:
+            return None, message, {"error": "No HTML content received"}
+        if message.get("allEntities"):
+            return iter_netflix_entities(html_content), message, None
+        
+        # Extract Netflix JSON data
+        raw_json = extract_netflix_json_from_content(html_content)
+    
+    if not raw_json:
+        return None, message, {"error": "Failed to extract JSON data from HTML"}
+    return raw_json, message, None
+
+def finish_extraction(message, raw_json, cache=None, image_path=None):
+    """
+    Format, cache and save an extracted title and build the response
+    
+    Args:
+        message (dict): Message options (saveFiles, storage, useCache)
+        raw_json (dict): Raw JSON-LD object
+        cache (ExtractionCache): Optional cache; must be used from one thread
+        image_path (str): Local thumbnail of the title's image, stored with
+            the title as "image_path"
+        
+    Returns:
+        dict: Response for the extension
+    """
+    # Answer from the cache if this payload was processed before (and, when
+    # saving, was saved with the storage backend asked for this time)
+    save_to_files = message.get("saveFiles", True)
+    storage = message.get("storage", STORAGE_BACKEND)
+    use_cache = cache is not None and message.get("useCache", True)
+    if use_cache:
+        netflix_id = netflix_id_from_url(raw_json.get("url", ""))
+        digest = payload_hash(raw_json)
+        cached = cache.get(netflix_id, digest)
+        if (cached and (not save_to_files or _saved_files_exist(cached, storage))
+                and (image_path is None or cached.get("image_path") == image_path)):
+            return {
+                "success": True,
+                "data": cached,
+                "raw": raw_json,
+                "cache": dict(cache.stats(), hit=True)
+            }
+    
+    # Format the data
+    formatted_data = format_netflix_data(raw_json)
+    if not formatted_data:
+        return {"error": "Failed to format data"}
+    if image_path:
+        formatted_data["image_path"] = image_path
+    
+    # Save files if requested
+    if save_to_files:
+        try:
+            with metrics.timed("JSON save"):
+                formatted_data.update(save_extracted_title(formatted_data, raw_json, storage))
+        except Exception as e:
+            formatted_data["fileError"] = f"Could not save files: {str(e)}"
+    
+    response = {
+        "success": True,
+        "data": formatted_data,
+        "raw": raw_json
+    }
+    if use_cache:
+        if "fileError" not in formatted_data:
+            cache.put(netflix_id, digest, formatted_data)
+        response["cache"] = dict(cache.stats(), hit=False)
+    return response
+
 def main():
     """
     Main function - works as native messaging host for browser extension
     Processes Netflix data received from the extension
     """
+    global _native_stdout
     try:
         # Check if running as native messaging host (no arguments)
         if len(sys.argv) == 1:
             # Native messaging mode - read from browser extension
+            _native_stdout = sys.stdout.buffer
+            sys.stdout = sys.stderr
+            native_codec.start_recording()
+            transfers = {}
+            cache = open_cache()
             while True:
                 message = read_message()
                 if message is None:
                     break
                 
-                if "error" in message:
-                    send_message({"error": message["error"]})
-                    continue
-                
-                # Process the HTML content from the extension
-                html_content = message.get("htmlContent", "")
-                if not html_content:
-                    send_message({"error": "No HTML content received"})
-                    continue
-                
-                # Extract Netflix JSON data
-                raw_json = extract_netflix_json_from_content(html_content)
-                if not raw_json:
-                    send_message({"error": "Failed to extract JSON data from HTML"})
-                    continue
-                
-                # Format the data
-                formatted_data = format_netflix_data(raw_json)
-                if not formatted_data:
-                    send_message({"error": "Failed to format data"})
-                    continue
-                
-                # Save files if requested
-                save_to_files = message.get("saveFiles", True)
-                if save_to_files:
-                    try:
-                        output_dir = Path("d:/Browsertocalc")
-                        output_dir.mkdir(parents=True, exist_ok=True)
-                        
-                        netflix_id = formatted_data.get('netflix_id', 'unknown')
-                        
-                        # Save formatted data
-                        output_file = output_dir / f"netflix_extracted_data_{netflix_id}.json"
-                        save_json_data(formatted_data, output_file)
-                        
-                        # Save raw JSON
-                        raw_output_file = output_dir / f"netflix_raw_json_{netflix_id}.json"
-                        save_json_data(raw_json, raw_output_file)
-                        
-                        formatted_data["savedFiles"] = {
-                            "formatted": str(output_file),
-                            "raw": str(raw_output_file)
-                        }
-                    except Exception as e:
-                        formatted_data["fileError"] = f"Could not save files: {str(e)}"
-                
-                # Send response back to extension
-                send_message({
-                    "success": True,
-                    "data": formatted_data,
-                    "raw": raw_json
-                })
+                request_id = message.get("requestId")
+                def send(frame):
+                    if request_id is not None:
+                        frame["requestId"] = request_id
+                    send_message(frame)
+                raw_json, message, response = extract_from_message(message, transfers)
+                if raw_json is not None and message.get("allEntities"):
+                    response = stream_entities(raw_json, message, send)
+                elif raw_json is not None:
+                    response = finish_extraction(message, raw_json, cache)
+                if response is not None:
+                    # Send response back to extension
+                    send(response)
+            native_codec.stop_recording()
+            metrics.get_metrics().save()
         
         else:
             # Command line mode for testing - process HTML files
@@ -294,9 +1013,19 @@ def main():
             parser.add_argument('input', nargs='?', help='Path to HTML file')
             parser.add_argument('--file', '-f', help='Path to HTML file to process')
             parser.add_argument('--output', '-o', help='Output directory for JSON files')
+            parser.add_argument('--batch', '-b', nargs='+', metavar='PATH',
+                                help='Directories or glob patterns of saved pages to process in bulk')
+            parser.add_argument('--batch-output', default='netflix_batch.jsonl',
+                                help='Batch result file (.jsonl, .ods or .sqlite title store)')
+            parser.add_argument('--jobs', '-j', type=int, help='Worker processes for batch mode')
             
             args = parser.parse_args()
             
+            if args.batch:
+                stats = run_batch(args.batch, args.batch_output, args.jobs)
+                print(f"Output file: {args.batch_output}")
+                sys.exit(1 if stats["pages"] and stats["failed"] == stats["pages"] else 0)
+            
             # Determine input source
             input_source = None
             raw_json = None
@@ -333,6 +1062,7 @@ def main():
                     print("Usage examples:")
                     print("  python extract_netflix_json.py --file netflix_page.html")
                     print("  python extract_netflix_json.py netflix_page.html")
+                    print("  python extract_netflix_json.py --batch saved_pages/ --batch-output titles.jsonl")
                     print("\nNote: This script primarily works as a native messaging host.")
                     print("Command line mode is for testing only.")
                     sys.exit(1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Netflix Extraction Cache
+Persistent SQLite cache of formatted titles for extract_netflix_json.py
+Entries are keyed by netflix_id and a hash of the JSON-LD payload, so a page
+whose structured data did not change is answered without formatting or
+rewriting the JSON files again
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+# BROWSERTOCALC_OUTPUT_DIR moves it (with the extracted titles) elsewhere, e.g. for load tests
+DEFAULT_CACHE_PATH = Path(os.environ.get("BROWSERTOCALC_OUTPUT_DIR", "d:/Browsertocalc")) / "netflix_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_AGE_DAYS = 90
+
+def payload_hash(raw_json):
+    """
+    Hash a JSON-LD object independently of key order
+    
+    Args:
+        raw_json (dict): Raw JSON-LD object
+        
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    canonical = json.dumps(raw_json, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ExtractionCache:
+    """
+    SQLite cache of format_netflix_data results
+    
+    Entries older than max_age_days are dropped and the least recently used
+    entries are evicted beyond max_entries. Hit and miss counters are kept
+    in the database so they survive one-shot host processes.
+    """
+    
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS titles (
+                netflix_id TEXT NOT NULL,
+                payload_hash TEXT NOT NULL,
+                formatted TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (netflix_id, payload_hash)
+            );
+            CREATE INDEX IF NOT EXISTS titles_last_used ON titles (last_used);
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+    
+    def _count(self, name):
+        self.db.execute("INSERT INTO counters (name, value) VALUES (?, 1) "
+                        "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,))
+    
+    def get(self, netflix_id, digest):
+        """
+        Look up a cached title
+        
+        Returns:
+            dict: Stored formatted data or None on a miss
+        """
+        now = time.time()
+        row = self.db.execute(
+            "SELECT formatted, created FROM titles WHERE netflix_id = ? AND payload_hash = ?",
+            (netflix_id, digest)).fetchone()
+        if row and now - row[1] <= self.max_age:
+            self.db.execute("UPDATE titles SET last_used = ? WHERE netflix_id = ? AND payload_hash = ?",
+                            (now, netflix_id, digest))
+            self._count("hits")
+            self.db.commit()
+            return json.loads(row[0])
+        self._count("misses")
+        self.db.commit()
+        return None
+    
+    def put(self, netflix_id, digest, formatted_data):
+        """Store a formatted title and evict old or surplus entries."""
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO titles (netflix_id, payload_hash, formatted, created, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (netflix_id, digest, json.dumps(formatted_data, ensure_ascii=False), now, now))
+        self.evict(now)
+        self.db.commit()
+    
+    def evict(self, now=None):
+        """Drop expired entries and keep at most max_entries."""
+        now = now or time.time()
+        self.db.execute("DELETE FROM titles WHERE created < ?", (now - self.max_age,))
+        self.db.execute(
+            "DELETE FROM titles WHERE rowid IN (SELECT rowid FROM titles "
+            "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+    
+    def stats(self):
+        """
+        Return cache counters
+        
+        Returns:
+            dict: {"hits", "misses", "entries"}
+        """
+        counters = dict(self.db.execute("SELECT name, value FROM counters"))
+        entries = self.db.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+        return {"hits": counters.get("hits", 0), "misses": counters.get("misses", 0), "entries": entries}
+    
+    def close(self):
+        self.db.close()
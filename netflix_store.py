@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Netflix Title Store
+One SQLite database holding every extracted title (formatted and raw JSON)
+Replaces the netflix_extracted_data_{id}.json / netflix_raw_json_{id}.json
+file pairs and allows lookups by netflix_id, genre and cast member
+
+Usage:
+    python netflix_store.py --migrate d:/Browsertocalc
+    python netflix_store.py --genre Krimiserien
+    python netflix_store.py --cast "Louis Hofmann"
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# BROWSERTOCALC_OUTPUT_DIR moves it (with the extracted titles) elsewhere, e.g. for load tests
+DEFAULT_STORE_PATH = Path(os.environ.get("BROWSERTOCALC_OUTPUT_DIR", "d:/Browsertocalc")) / "netflix_titles.sqlite"
+
+def _text(value):
+    """
+    Column value for an indexed field; schema.org allows lists (e.g. several
+    genres), which are joined like cast and directors
+    """
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+class TitleStore:
+    """SQLite store of extracted Netflix titles with genre and cast indexes"""
+    
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS titles (
+                netflix_id TEXT PRIMARY KEY,
+                title TEXT,
+                type TEXT,
+                genre TEXT,
+                formatted TEXT NOT NULL,
+                raw TEXT,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS titles_genre ON titles (genre COLLATE NOCASE);
+            CREATE TABLE IF NOT EXISTS title_cast (
+                netflix_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                PRIMARY KEY (netflix_id, name)
+            );
+            CREATE INDEX IF NOT EXISTS title_cast_name ON title_cast (name COLLATE NOCASE);
+        """)
+    
+    def add(self, formatted_data, raw_json=None, commit=True):
+        """
+        Insert or replace one title
+        
+        Args:
+            formatted_data (dict): Result of format_netflix_data
+            raw_json (dict): Raw JSON-LD object
+            commit (bool): Commit right away (disable for bulk imports)
+            
+        Returns:
+            str: The key the title was stored under
+        """
+        netflix_id = _text(formatted_data.get("netflix_id") or formatted_data.get("url") or formatted_data.get("title", ""))
+        record = {k: v for k, v in formatted_data.items() if k not in ("savedFiles", "savedStore", "fileError")}
+        self.db.execute(
+            "INSERT OR REPLACE INTO titles (netflix_id, title, type, genre, formatted, raw, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (netflix_id, _text(record.get("title")), _text(record.get("type")), _text(record.get("genre")),
+             json.dumps(record, ensure_ascii=False),
+             json.dumps(raw_json, ensure_ascii=False) if raw_json is not None else None,
+             time.time()))
+        self.db.execute("DELETE FROM title_cast WHERE netflix_id = ?", (netflix_id,))
+        self.db.executemany("INSERT OR IGNORE INTO title_cast (netflix_id, name) VALUES (?, ?)",
+                            [(netflix_id, name) for name in record.get("cast", [])])
+        if commit:
+            self.db.commit()
+        return netflix_id
+    
+    def get(self, netflix_id, raw=False):
+        """
+        Look up one title
+        
+        Returns:
+            dict: Formatted data (or raw JSON-LD if raw is set), None if unknown
+        """
+        row = self.db.execute("SELECT formatted, raw FROM titles WHERE netflix_id = ?",
+                              (netflix_id,)).fetchone()
+        if not row:
+            return None
+        value = row[1] if raw else row[0]
+        return json.loads(value) if value else None
+    
+    def by_genre(self, genre):
+        """Return formatted data of all titles with the given genre (also one of several)."""
+        rows = self.db.execute(
+            "SELECT formatted FROM titles WHERE genre = ? COLLATE NOCASE "
+            "OR ', ' || genre || ', ' LIKE '%, ' || ? || ', %' ORDER BY title", (genre, genre))
+        return [json.loads(row[0]) for row in rows]
+    
+    def by_cast(self, name):
+        """Return formatted data of all titles the given person appears in."""
+        rows = self.db.execute(
+            "SELECT t.formatted FROM title_cast c JOIN titles t ON t.netflix_id = c.netflix_id "
+            "WHERE c.name = ? COLLATE NOCASE ORDER BY t.title", (name,))
+        return [json.loads(row[0]) for row in rows]
+    
+    def migrate_directory(self, directory):
+        """
+        Import existing netflix_extracted_data_{id}.json / netflix_raw_json_{id}.json pairs
+        
+        Args:
+            directory (str): Folder holding the JSON files
+            
+        Returns:
+            tuple: (imported titles, failed files)
+        """
+        imported = 0
+        failed = []
+        for formatted_file in sorted(Path(directory).glob("netflix_extracted_data_*.json")):
+            netflix_id = formatted_file.stem[len("netflix_extracted_data_"):]
+            raw_file = formatted_file.with_name(f"netflix_raw_json_{netflix_id}.json")
+            try:
+                with open(formatted_file, 'r', encoding='utf-8') as file:
+                    formatted_data = json.load(file)
+                raw_json = None
+                if raw_file.exists():
+                    with open(raw_file, 'r', encoding='utf-8') as file:
+                        raw_json = json.load(file)
+                self.add(formatted_data, raw_json, commit=False)
+                imported += 1
+            except Exception as e:
+                failed.append(f"{formatted_file}: {e}")
+        self.db.commit()
+        return imported, failed
+    
+    def close(self):
+        self.db.close()
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Query or fill the consolidated Netflix title store')
+    parser.add_argument('--store', default=str(DEFAULT_STORE_PATH), help='Path of the SQLite store')
+    parser.add_argument('--migrate', metavar='DIR', help='Import existing JSON file pairs from DIR')
+    parser.add_argument('--id', help='Show the title with this netflix_id')
+    parser.add_argument('--genre', help='List titles of this genre')
+    parser.add_argument('--cast', help='List titles with this cast member')
+    args = parser.parse_args()
+    
+    store = TitleStore(args.store)
+    try:
+        if args.migrate:
+            imported, failed = store.migrate_directory(args.migrate)
+            print(f"Imported {imported} titles into {store.path}")
+            for error in failed:
+                print(f"Failed: {error}")
+        if args.id:
+            print(json.dumps(store.get(args.id), indent=2, ensure_ascii=False))
+        for titles in (store.by_genre(args.genre) if args.genre else None,
+                       store.by_cast(args.cast) if args.cast else None):
+            if titles is not None:
+                for data in titles:
+                    print(f"{data.get('netflix_id', ''):>10}  {data.get('title', '')}")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
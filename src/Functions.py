@@ -1,46 +1,372 @@
 import os
-import datetime
-import sys
 import json
-import struct
-from pyexcel_ods3 import get_data, save_data
+import threading
+import time
 from collections import OrderedDict
+from host_logging import get_logger
+import metrics
+import native_codec
+import ods_reader
 
 # --- Config ---
-ODS_PATH = "C:\\Users\\olivi\\Documents\\MeineAblage.ods"
+# BROWSERTOCALC_ODS_PATH points a test or load run at another workbook
+ODS_PATH = os.environ.get("BROWSERTOCALC_ODS_PATH", "C:\\Users\\olivi\\Documents\\MeineAblage.ods")
 SHEET_NAME = "Sheet1"
 
-def append_row_to_ods(text, second_value, date_str, url, checkbox_state=False, image_src=""):
+# Rows are appended to a sidecar journal next to the workbook and folded into
+# the ODS in batches, so a capture does not have to rewrite the whole file.
+# A compaction first renames the journal to *.flushing so new captures can
+# keep appending while the workbook is rewritten.
+JOURNAL_SUFFIX = ".journal"
+FLUSHING_SUFFIX = ".flushing"
+LOCK_SUFFIX = ".lock"
+# Written next to *.flushing right before the new workbook is swapped in;
+# holds what the workbook looks like once the swap has happened
+COMMIT_SUFFIX = ".commit"
+# Journal rows the workbook cannot take (e.g. nested values) are moved here
+REJECT_SUFFIX = ".rejected"
+JOURNAL_COMPACT_ROWS = 50
+# First line of every journal: {"journal_created": <time.time()>}, written
+# with its first row, so hosts can tell how long the rows have been waiting
+JOURNAL_HEADER = "journal_created"
+# The compacting host touches its lock file every LOCK_REFRESH_SECONDS, however
+# long the rewrite takes; a lock left untouched for STALE_LOCK_SECONDS belongs
+# to a host that crashed
+LOCK_REFRESH_SECONDS = 15
+STALE_LOCK_SECONDS = 120
+
+_journal_lock = threading.Lock()
+
+# count_journal_rows: per journal path, (file identity, bytes counted, rows)
+_journal_counts = {}
+_count_lock = threading.Lock()
+
+# Called with the workbook's new mtime after a compaction replaced it, so
+# sidecar indexes can tell their own writes from outside edits
+COMPACT_HOOKS = []
+
+def journal_path():
+    """Return the path of the sidecar journal belonging to ODS_PATH."""
+    return ODS_PATH + JOURNAL_SUFFIX
+
+def read_journal_rows(path=None):
+    """Return the rows waiting in the journal (skips a torn last line)."""
+    path = path or journal_path()
+    rows = []
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        # No journal, or a compaction just renamed it
+        return []
+    with f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A crash during the last write can leave half a line behind
+                continue
+            if not _is_header(entry):
+                rows.append(entry)
+    return rows
+
+def _is_header(entry):
+    return isinstance(entry, dict) and list(entry) == [JOURNAL_HEADER]
+
+def count_journal_rows(path=None):
     """
-    Append a row to the ODS spreadsheet with the given values.
-    Columns: text, second_value, date_str, url, checkbox_state, image_src
+    Count the rows waiting in the journal, like len(read_journal_rows()).
+    Only the lines appended since the last count are parsed, so the cost
+    does not grow with the journal (e.g. while compaction keeps failing).
+    Returns: number of rows
+    """
+    path = path or journal_path()
+    with _count_lock:
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            _journal_counts.pop(path, None)
+            return 0
+        with f:
+            stat = os.fstat(f.fileno())
+            identity = (stat.st_dev, stat.st_ino)
+            known = _journal_counts.get(path)
+            if known is None or known[0] != identity or stat.st_size < known[1]:
+                # A new journal (the old one was compacted) or a first look
+                known = (identity, 0, 0)
+            _, offset, rows = known
+            f.seek(offset)
+            data = f.read()
+        # A torn last line is counted once it is complete
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not _is_header(entry):
+                rows += 1
+        _journal_counts[path] = (identity, offset + complete, rows)
+        return rows
+
+def journal_age(path=None):
+    """
+    Seconds since the oldest row in the journal was captured.
+    Returns: float, or None if there is no journal
+    """
+    path = path or journal_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            first = f.readline()
+        created = os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+    try:
+        entry = json.loads(first)
+    except ValueError:
+        entry = None
+    if _is_header(entry):
+        created = entry[JOURNAL_HEADER]
+    # else: a journal from before the header, at least as old as its last write
+    return max(0.0, time.time() - created)
+
+def pending_rows():
+    """Return all captured rows that have not reached the workbook yet."""
+    return read_journal_rows(journal_path() + FLUSHING_SUFFIX) + read_journal_rows()
+
+def iter_ods_rows(columns=None):
+    """
+    Stream the rows of SHEET_NAME in the workbook (journaled rows not included).
+    columns limits each row to those 0-based columns, see ods_reader.iter_rows.
+    Yields: tuple per row
+    """
+    if not os.path.exists(ODS_PATH):
+        return iter(())
+    return ods_reader.iter_rows(ODS_PATH, SHEET_NAME, columns)
+
+def read_ods_rows():
+    """Return the rows of SHEET_NAME in the workbook (journaled rows not included)."""
+    return list(iter_ods_rows())
+
+def _cell(value):
+    return "" if value is None else str(value)
+
+def format_row(text, second_value, date_str, url, checkbox_state=False, image_src=""):
+    """Build the spreadsheet row for one capture (every cell a string)."""
+    return [_cell(text), _cell(second_value), _cell(date_str), _cell(url),
+            "1" if checkbox_state else "0", _cell(image_src)]
+
+def append_row_to_journal(row):
+    """
+    Durably append one row to the journal.
+    Returns: number of rows now waiting in the journal
+    """
+    return append_rows_to_journal([row])
+
+def append_rows_to_journal(rows):
+    """
+    Durably append several rows to the journal with a single fsync.
+    Returns: number of rows now waiting in the journal
     """
+    with metrics.timed("ODS write"), _journal_lock:
+        with open(journal_path(), "a", encoding="utf-8") as f:
+            lines = [json.dumps(row, ensure_ascii=False) + "\n" for row in rows]
+            if f.tell() == 0:
+                lines.insert(0, json.dumps({JOURNAL_HEADER: time.time()}) + "\n")
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+    return count_journal_rows()
+
+def _acquire_compact_lock():
+    """Create the lock file; returns False if another process is compacting."""
+    lock_path = ODS_PATH + LOCK_SUFFIX
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < STALE_LOCK_SECONDS:
+                    return False
+                # Left behind by a crashed host
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    return False
+
+def _refresh_lock(lock_path, done):
+    """Keep the lock's mtime current until done is set."""
+    while not done.wait(LOCK_REFRESH_SECONDS):
+        try:
+            os.utime(lock_path)
+        except OSError:
+            return
+
+def _write_commit_marker(flushing, tmp_path, rows):
+    """Durably record the workbook that is about to replace ODS_PATH."""
+    stat = os.stat(tmp_path)
+    with open(flushing + COMMIT_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rows": rows}, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _remove_commit_marker(flushing):
+    try:
+        os.remove(flushing + COMMIT_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+def _already_folded(flushing):
+    """
+    Whether a crashed compaction swapped in its workbook before it could
+    delete *.flushing: the workbook is the one its commit marker describes
+    (same file, or the same number of rows if it was saved again since).
+    """
+    try:
+        with open(flushing + COMMIT_SUFFIX, "r", encoding="utf-8") as f:
+            marker = json.load(f)
+        stat = os.stat(ODS_PATH)
+    except (OSError, ValueError):
+        # No marker: the crash came before the swap
+        return False
+    if (stat.st_size, stat.st_mtime_ns) == (marker.get("size"), marker.get("mtime_ns")):
+        return True
+    return sum(1 for _ in iter_ods_rows(columns=(0,))) == marker.get("rows")
+
+def _writable_row(row):
+    """The row as workbook cells, or None if it holds something a cell cannot."""
+    if not isinstance(row, list):
+        return None
+    cells = []
+    for value in row:
+        if value is None:
+            value = ""
+        elif not isinstance(value, (str, int, float, bool)):
+            return None
+        cells.append(value)
+    return cells
+
+def _reject_rows(rows):
+    """Append unwritable journal rows to the reject file next to the workbook."""
+    with open(ODS_PATH + REJECT_SUFFIX, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+        f.flush()
+        os.fsync(f.fileno())
+    get_logger().warning("Moved %d unwritable journal rows to %s", len(rows), ODS_PATH + REJECT_SUFFIX)
+
+def _fold_into_ods(flushing):
+    """Append the rows of a renamed journal to the workbook, then delete it."""
+    rows = []
+    rejected = []
+    for row in read_journal_rows(flushing):
+        cells = _writable_row(row)
+        if cells is None:
+            rejected.append(row)
+        else:
+            rows.append(cells)
+    if rejected:
+        # Written before the journal goes away, so they are kept either way
+        _reject_rows(rejected)
+    if not rows:
+        os.remove(flushing)
+        _remove_commit_marker(flushing)
+        return 0
+    start = time.perf_counter()
+    # pyexcel is only needed here; keep it out of the host's startup path
+    from pyexcel_ods3 import get_data, save_data
     if os.path.exists(ODS_PATH):
         data = get_data(ODS_PATH)
         sheet = data.get(SHEET_NAME, [])
     else:
         sheet = []
-    sheet.append([text, second_value, date_str, url, "1" if checkbox_state else "0", image_src])
+    sheet.extend(rows)
     data = OrderedDict()
     data[SHEET_NAME] = sheet
-    save_data(ODS_PATH, data)
+    tmp_path = os.path.splitext(ODS_PATH)[0] + ".tmp.ods"
+    try:
+        save_data(tmp_path, data)
+    except Exception:
+        # The rows stay in *.flushing for the next round
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _write_commit_marker(flushing, tmp_path, len(sheet))
+    os.replace(tmp_path, ODS_PATH)
+    os.remove(flushing)
+    _remove_commit_marker(flushing)
+    metrics.record("ODS compact", (time.perf_counter() - start) * 1000)
+    mtime = os.path.getmtime(ODS_PATH)
+    for hook in COMPACT_HOOKS:
+        hook(mtime)
+    return len(rows)
 
-def read_native_message():
+def _recover_flushing(flushing):
+    """Finish the compaction a crashed host left behind in *.flushing."""
+    if _already_folded(flushing):
+        get_logger().info("Journal of %d rows was already in the workbook, removing it",
+                          len(read_journal_rows(flushing)))
+        os.remove(flushing)
+        _remove_commit_marker(flushing)
+        return 0
+    _remove_commit_marker(flushing)
+    return _fold_into_ods(flushing)
+
+def compact_ods_journal():
+    """
+    Fold the journal rows into the ODS workbook with a single load/save.
+    The workbook is written to a temporary file and swapped in before the
+    journal is removed, so a crash never loses journaled rows. A leftover
+    *.flushing file from a crash is finished first; its commit marker tells
+    whether its rows already made it into the workbook.
+    Returns: number of rows written
+    """
+    if not _acquire_compact_lock():
+        return 0
+    lock_path = ODS_PATH + LOCK_SUFFIX
+    done = threading.Event()
+    threading.Thread(target=_refresh_lock, args=(lock_path, done), name="ods-lock", daemon=True).start()
+    try:
+        flushing = journal_path() + FLUSHING_SUFFIX
+        written = 0
+        if os.path.exists(flushing):
+            written += _recover_flushing(flushing)
+        else:
+            _remove_commit_marker(flushing)
+        try:
+            with _journal_lock:
+                os.replace(journal_path(), flushing)
+        except FileNotFoundError:
+            return written
+        except PermissionError:
+            # Journal is held open by another host (Windows); next round
+            return written
+        return written + _fold_into_ods(flushing)
+    finally:
+        done.set()
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+
+def append_row_to_ods(text, second_value, date_str, url, checkbox_state=False, image_src=""):
+    """
+    Append a row to the ODS spreadsheet with the given values.
+    Columns: text, second_value, date_str, url, checkbox_state, image_src
+    The row goes to the journal first; the workbook itself is only rewritten
+    once JOURNAL_COMPACT_ROWS rows have been collected.
+    """
+    row = format_row(text, second_value, date_str, url, checkbox_state, image_src)
+    if append_row_to_journal(row) >= JOURNAL_COMPACT_ROWS:
+        compact_ods_journal()
+
+def read_native_message(stream=None):
     """Read a message from Chrome native messaging (raw binary)."""
-    raw_length = sys.stdin.buffer.read(4)
-    if len(raw_length) < 4:
-        return None
-    message_length = struct.unpack('=I', raw_length)[0]
-    message = sys.stdin.buffer.read(message_length)
-    return json.loads(message.decode('utf-8'))
+    return native_codec.read_message(stream)
 
-def send_native_message(obj):
+def send_native_message(obj, stream=None):
     """Send a message to Chrome native messaging (raw binary)."""
-    response_bytes = json.dumps(obj).encode('utf-8')
-    sys.stdout.buffer.write(struct.pack('=I', len(response_bytes)))
-    sys.stdout.buffer.write(response_bytes)
-    sys.stdout.buffer.flush()
-
-def log_debug(message):
-    with open("debug.log", "a", encoding="utf-8") as f:
-        f.write(f"DEBUG: {message}\n")
+    native_codec.write_message(obj, stream)
+
+def log_debug(message, *args):
+    """Log a debug message; args are only formatted when DEBUG is enabled."""
+    get_logger().debug(message, *args)
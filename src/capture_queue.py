@@ -0,0 +1,73 @@
+# capture_queue.py
+# Background flushing of captured rows into the ODS spreadsheet.
+#
+# main.py only appends each capture to the durable journal (see Functions)
+# and answers Chrome right away; FlushWorker folds the journal into the
+# workbook in batches, either once enough rows are waiting or once the oldest
+# of them has waited FLUSH_INTERVAL. The wait is measured from the time in
+# the journal's header line, not from the start of the process: a one-shot
+# sendNativeMessage host lives for milliseconds and leaves a single capture
+# in the (fsynced) journal, and the first host that runs or exits after the
+# interval has passed, or `main.py --compact`, folds it in.
+
+import threading
+
+from Functions import JOURNAL_COMPACT_ROWS, compact_ods_journal, count_journal_rows, journal_age
+from host_logging import get_logger
+
+logger = get_logger()
+
+FLUSH_INTERVAL = 30.0  # seconds
+
+class FlushWorker(threading.Thread):
+    """Thread that compacts the capture journal by size or after a delay."""
+
+    def __init__(self, batch_rows=JOURNAL_COMPACT_ROWS, interval=FLUSH_INTERVAL):
+        super().__init__(name="ods-flush", daemon=True)
+        self.batch_rows = batch_rows
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopping = False
+
+    def notify(self):
+        """Tell the worker that a row was queued."""
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopping:
+                break
+            if self.due():
+                self.flush()
+
+    def due(self):
+        """Whether batch_rows rows are waiting, or some are and the oldest has waited the interval."""
+        pending = count_journal_rows()
+        if pending >= self.batch_rows:
+            return True
+        if not pending:
+            return False
+        age = journal_age()
+        return age is not None and age >= self.interval
+
+    def flush(self):
+        """Write all queued rows now; errors leave the rows in the journal."""
+        try:
+            written = compact_ods_journal()
+            if written:
+                logger.info("Flushed %d rows to ODS", written)
+        except Exception as e:
+            written = 0
+            logger.warning("Flushing to ODS failed, rows stay queued: %s", e)
+        return written
+
+    def stop(self, flush=True):
+        """Stop the thread and, by default, flush the queued rows if they are due."""
+        self._stopping = True
+        self._wake.set()
+        if self.is_alive():
+            self.join()
+        if flush and self.due():
+            self.flush()
@@ -0,0 +1,83 @@
+# host_logging.py
+# Logging for the native messaging host.
+#
+# Records go through a QueueHandler to a background QueueListener thread that
+# writes a size-rotated debug.log in the user's BrowserToCalc folder
+# (%LOCALAPPDATA%\BrowserToCalc on Windows, ~/BrowserToCalc elsewhere), outside
+# the checkout and independent of the working directory Chrome starts the
+# host in; BROWSERTOCALC_LOG_PATH points it elsewhere. The level comes from
+# BROWSERTOCALC_LOG_LEVEL (default INFO, also used for unknown names); with
+# DEBUG off, logger.debug() calls return before their arguments are formatted.
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+def default_log_path(environ=os.environ):
+    """Returns: $BROWSERTOCALC_LOG_PATH, or debug.log in the user's BrowserToCalc folder"""
+    return environ.get("BROWSERTOCALC_LOG_PATH") or os.path.join(
+        environ.get("LOCALAPPDATA") or os.path.expanduser("~"), "BrowserToCalc", "debug.log")
+
+LOG_PATH = default_log_path()
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+LOGGER_NAME = "browsertocalc"
+
+_listener = None
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the writer thread.
+    Log arguments are formatted later, so they must not be mutated afterwards.
+    """
+
+    def prepare(self, record):
+        return record
+
+def setup_logging(level=None, path=LOG_PATH):
+    """
+    Attach the queue-backed file handler once per process.
+    Returns: the host logger
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        return logger
+    level = level or os.environ.get("BROWSERTOCALC_LOG_LEVEL", "INFO")
+    try:
+        logger.setLevel(level.upper() if isinstance(level, str) else level)
+        unknown_level = None
+    except (TypeError, ValueError):
+        # A typo in the level must not keep the host from answering
+        logger.setLevel(logging.INFO)
+        unknown_level = level
+    logger.propagate = False
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True)
+    file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(process)d: %(message)s"))
+
+    records = queue.SimpleQueue()
+    logger.addHandler(_DeferredQueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, file_handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    if unknown_level is not None:
+        logger.warning("Unknown log level %r, using INFO", unknown_level)
+    return logger
+
+def get_logger():
+    """Return the host logger, setting it up on first use."""
+    if _listener is None:
+        return setup_logging()
+    return logging.getLogger(LOGGER_NAME)
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
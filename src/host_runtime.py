@@ -0,0 +1,176 @@
+# host_runtime.py
+# asyncio runtime for the native messaging host.
+#
+# Threads:
+#   main thread      Qt; runs GUI jobs (the modal input dialog) one at a time
+#   host-runtime     asyncio loop; reads frames, dispatches, sends responses
+#   host-reader      blocking reads of framed messages from stdin
+#   host-io          ODS journal and JSON/SQLite writes (one thread, so the
+#                    SQLite connections stay on the thread that opened them)
+#   host-cpu         JSON-LD extraction
+#
+# Every message is handled in its own task, so a capture waiting in the
+# dialog or a slow save does not hold back other tabs. Responses echo the
+# message's "requestId" so the extension can match them up.
+#
+# With --profile-startup (timing.enable()) the phase breakdown, including
+# "respond", is printed once a response is sent and no other request is
+# still being handled, then timing starts over for the next burst.
+
+import asyncio
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import timing
+from Functions import read_native_message, send_native_message
+from host_logging import get_logger
+from timing import phase
+
+logger = get_logger()
+
+_BAD_FRAME = object()
+
+class HostRuntime:
+    """Runs an async dispatch coroutine for every incoming message."""
+
+    def __init__(self, dispatch):
+        """
+        dispatch is `async def dispatch(runtime, msg)` returning the response
+        dict, or None when the message needs no answer (e.g. a partial chunk).
+        """
+        self.dispatch = dispatch
+        self.loop = asyncio.new_event_loop()
+        self.io_pool = ThreadPoolExecutor(1, thread_name_prefix="host-io")
+        self.cpu_pool = ThreadPoolExecutor(2, thread_name_prefix="host-cpu")
+        self._reader = ThreadPoolExecutor(1, thread_name_prefix="host-reader")
+        self._gui_jobs = queue.Queue()
+        self._in_flight = 0
+        self.stdin = sys.stdin.buffer
+        self.stdout = sys.stdout.buffer
+
+    # --- executors -------------------------------------------------------
+
+    async def in_gui(self, func, *args):
+        """Run func on the main (Qt) thread and await its result."""
+        future = self.loop.create_future()
+
+        def job():
+            try:
+                result = func(*args)
+            except BaseException as e:
+                self.loop.call_soon_threadsafe(future.set_exception, e)
+            else:
+                self.loop.call_soon_threadsafe(future.set_result, result)
+
+        self._gui_jobs.put(job)
+        return await future
+
+    async def in_io(self, func, *args):
+        """Run a blocking write on the I/O thread."""
+        return await self.loop.run_in_executor(self.io_pool, func, *args)
+
+    async def in_cpu(self, func, *args):
+        """Run CPU-bound work (extraction) off the event loop."""
+        return await self.loop.run_in_executor(self.cpu_pool, func, *args)
+
+    # --- message handling ------------------------------------------------
+
+    def send(self, response):
+        """Write one response frame; only called from the event loop thread."""
+        send_native_message(response, self.stdout)
+
+    def read(self):
+        """
+        Read the next message (blocking). An unreadable frame is answered
+        with an error frame and returned as a marker that _serve skips.
+        Returns: the message, or None at end of input
+        """
+        try:
+            return read_native_message(self.stdin)
+        except ValueError as e:
+            # Unparsable or oversized frame: report it and keep reading
+            self.send({"error": f"Failed to read message: {str(e)}"})
+            return _BAD_FRAME
+
+    async def _answer(self, msg):
+        try:
+            await self._respond(msg)
+        finally:
+            self._in_flight -= 1
+            if timing.active() and not self._in_flight:
+                timing.active().report()
+                timing.enable()
+
+    async def _respond(self, msg):
+        request_id = msg.get("requestId") if isinstance(msg, dict) else None
+        try:
+            response = await self.dispatch(self, msg)
+        except Exception as e:
+            logger.exception("Error while handling message: %s", e)
+            response = {"error": f"Script error: {str(e)}"}
+        if response is None:
+            return
+        if request_id is not None:
+            response["requestId"] = request_id
+        try:
+            with phase("respond"):
+                self.send(response)
+        except (OSError, TypeError, ValueError) as e:
+            # e.g. a response over Chrome's 1 MiB limit or with a value JSON
+            # cannot hold: answer with the error
+            logger.warning("Could not send response: %s", e)
+            error = {"error": f"Failed to send message: {str(e)}"}
+            if request_id is not None:
+                error["requestId"] = request_id
+            try:
+                self.send(error)
+            except OSError as e:
+                logger.warning("Could not send error response: %s", e)
+
+    async def _serve(self, first_msg):
+        tasks = set()
+        msg = first_msg
+        while msg is not None:
+            if msg is not _BAD_FRAME:
+                self._in_flight += 1
+                task = self.loop.create_task(self._answer(msg))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            msg = await self.loop.run_in_executor(self._reader, self.read)
+        logger.debug("stdin closed, waiting for %d open requests", len(tasks))
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _run_loop(self, first_msg):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._serve(first_msg))
+        finally:
+            self.io_pool.shutdown(wait=True)
+            self.cpu_pool.shutdown(wait=True)
+            self._reader.shutdown(wait=False)
+            self.loop.close()
+            self._gui_jobs.put(None)
+
+    def run(self, first_msg):
+        """
+        Serve messages until stdin closes; must be called on the main thread.
+        first_msg is what read() returned for the first frame.
+        While serving, sys.stdout points at stderr so stray prints cannot
+        corrupt the native messaging channel.
+        """
+        real_stdout = sys.stdout
+        sys.stdout = sys.stderr
+        thread = threading.Thread(target=self._run_loop, args=(first_msg,), name="host-runtime")
+        thread.start()
+        try:
+            while True:
+                job = self._gui_jobs.get()
+                if job is None:
+                    break
+                job()
+        finally:
+            thread.join()
+            sys.stdout = real_stdout
@@ -1,49 +1,435 @@
 # main.py
 # Native messaging host and PyQt6 dialog for writing to ODS spreadsheet
+#
+# PyQt6 (form_widget) and pyexcel (inside Functions) are imported on first
+# use so that messages which never show a dialog do not pay for them.
+# Start with --profile-startup (or BROWSERTOCALC_PROFILE=1, e.g. from the
+# .bat wrapper) to get an import and phase time breakdown on stderr, and
+# with --record FILE (or BROWSERTOCALC_RECORD=FILE) to copy every incoming
+# frame to FILE for automation/replay_load.py.
+#
+# This is the single native messaging host. Messages are served
+# concurrently by host_runtime.HostRuntime and routed by their "type":
+#   save-row         capture from the extension (dialog + spreadsheet row);
+#                    with "episodes" (and optionally "checked") the row is
+#                    written without a dialog unless "interactive" is true;
+#                    "onDuplicate": "skip" drops captures already in the sheet;
+#                    imageSrc is stored as a local thumbnail (thumbnail_cache.py)
+#                    unless "localImage" is false
+#   save-rows        many captures in "rows", each like a save-row message
+#   extract-netflix  Netflix page in htmlContent (see extract_netflix_json.py);
+#                    "allEntities" streams every JSON-LD entity as "entity" frames
+#   chunk            part of a Netflix page streamed in several messages
+#   query            rows from the SQLite mirror of the sheet (ods_mirror.py)
+#   stats            per-handler call counts and per-phase latency percentiles
+# Responses echo the message's requestId.
 
-from Functions import append_row_to_ods, read_native_message, send_native_message, log_debug
-from form_widget import inputbox
+import time
+_t_start = time.perf_counter()
+
+import asyncio
 import os
-import datetime
 import sys
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import QTimer
+import threading
+import metrics
+import native_codec
+import timing
+from timing import phase
+from Functions import append_rows_to_journal, compact_ods_journal, format_row
+from capture_queue import FlushWorker
+from host_logging import get_logger
+from router import MessageRouter
+
+# extract_netflix_json.py lives in the project folder above src/
+sys.path.insert(1, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # --- Config ---
 ODS_PATH = "C:\\Users\\olivi\\Documents\\MeineAblage.ods"
 SHEET_NAME = "Sheet1"
+THUMBNAIL_WAIT = 2.0  # seconds to wait for a thumbnail once the row is ready
 
-# --- Main Execution ---
-if __name__ == "__main__":
-    log_debug("Script starting...")
-    msg = read_native_message()
-    log_debug(f"Received message: {msg}")
+logger = get_logger()
+router = MessageRouter()
+flush_worker = None
+
+def ensure_app():
+    """Create the QApplication on first use and keep it for the whole process."""
+    if os.environ.get("BROWSERTOCALC_AUTO_ANSWER") is not None:
+        # Auto-answered dialogs (load tests) need no display
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    with phase("import PyQt6"):
+        from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication(sys.argv)
+
+def capture_fields(msg):
+    """
+    Read text, url and image source from a capture message.
+    msg is the decoded Chrome message, or None when started by hand.
+    Returns: (text, url, image_src)
+    """
+    logger.debug("Received message: %s", msg)
     if msg and 'text' in msg:
         text = msg['text'] if msg['text'] else "Fill"
         url = msg.get('url', '')
         image_src = msg.get('imageSrc', '')  # Extract the image source
-        log_debug(f"Using text from Chrome: {text}")
-        log_debug(f"Image source: {image_src}")
+        logger.debug("Using text from Chrome: %s", text)
+        logger.debug("Image source: %s", image_src)
     else:
-        log_debug("No Chrome message, showing inputbox for first column")
+        logger.debug("No Chrome message, showing inputbox for first column")
         text = "Fill"
         url = msg.get('url', '') if msg else ''
         image_src = ""  # No image source for manual input
-    log_debug("Showing inputbox for second column")
+    return text, url, image_src
+
+def ask_capture(text):
+    """
+    Show the input dialog (Qt main thread only).
+    Returns: (second value, checkbox state, edited text)
+    """
+    ensure_app()
+    with phase("import form_widget"):
+        from form_widget import inputbox
+    logger.debug("Showing inputbox for second column")
     zweiter_text, zweiter_checked, new_edit_value = inputbox("Folgen", "", default_long_text=text)
     zweiter_wert = zweiter_text if zweiter_text else ""
-    log_debug(f"Second value: {zweiter_wert}, Checkbox: {zweiter_checked}, New edit: {new_edit_value}")
+    logger.debug("Second value: %s, Checkbox: %s, New edit: %s", zweiter_wert, zweiter_checked, new_edit_value)
+    return zweiter_wert, zweiter_checked, new_edit_value
+
+def parse_checked(value):
+    """True for the checkbox values true, 1, "1" and "true" (any case); everything else is unchecked."""
+    if isinstance(value, str):
+        value = value.strip().lower()
+    return value in (True, 1, "1", "true")
+
+def answer_from_message(msg):
+    """
+    The dialog's answer taken from the message, when it carries all of it.
+    Returns: (second value, checkbox state, text) or None if the dialog is needed
+    """
+    if msg.get("interactive") or msg.get("episodes") is None or not msg.get("text"):
+        return None
+    return str(msg["episodes"]).strip(), parse_checked(msg.get("checked")), str(msg["text"]).strip()
+
+def build_row(text, url, image_src, answer):
+    """Combine the message fields and the dialog answer into a sheet row."""
+    import datetime
+    zweiter_wert, zweiter_checked, new_edit_value = answer
     date_str = datetime.datetime.now().strftime('%d.%m.%Y')
-    log_debug(f"Saving to ODS: text={text}, second={zweiter_wert}, date={date_str}, url={url}, checkbox={zweiter_checked}, image_src={image_src}")
-    append_row_to_ods(new_edit_value, zweiter_wert, date_str, url, zweiter_checked, image_src)
-    log_debug("Successfully saved to ODS")
-    if msg:
-        log_debug("Sending response to Chrome")
-        send_native_message({"result": "OK"})
-        log_debug("Response sent successfully")
+    logger.debug("Saving to ODS: text=%s, second=%s, date=%s, url=%s, checkbox=%s, image_src=%s",
+                 text, zweiter_wert, date_str, url, zweiter_checked, image_src)
+    return format_row(new_edit_value, zweiter_wert, date_str, url, zweiter_checked, image_src)
+
+_watchlist_index = []
+_ods_mirror = []
+_thumbnails = []
+_thumbnails_lock = threading.Lock()
+
+def watchlist_index():
+    """The duplicate index, created on first use (I/O thread only)."""
+    if not _watchlist_index:
+        from watchlist_index import WatchlistIndex
+        _watchlist_index.append(WatchlistIndex())
+    return _watchlist_index[0]
+
+def ods_mirror():
+    """The SQLite mirror of the sheet, reconciled when first used (I/O thread only)."""
+    if not _ods_mirror:
+        from ods_mirror import OdsMirror
+        _ods_mirror.append(OdsMirror())
+    return _ods_mirror[0]
+
+def thumbnails():
+    """The local thumbnail cache, created on first use (thread-safe)."""
+    with _thumbnails_lock:
+        if not _thumbnails:
+            from thumbnail_cache import ThumbnailCache
+            _thumbnails.append(ThumbnailCache())
+        return _thumbnails[0]
+
+def prefetch_thumbnail(image_src, enabled=True):
+    """Start downloading a capture's image (enabled is the message's "localImage")."""
+    if image_src and enabled:
+        return thumbnails().prefetch(image_src)
+    return None
+
+async def local_thumbnail(future, default):
+    """Wait briefly for a prefetched thumbnail; fall back to default (the remote URL)."""
+    return (await local_thumbnails([future], [default]))[0]
+
+async def local_thumbnails(futures, defaults):
+    """Wait up to THUMBNAIL_WAIT in total for several thumbnails; defaults where not ready."""
+    waiting = {asyncio.wrap_future(f): i for i, f in enumerate(futures) if f is not None}
+    results = list(defaults)
+    if not waiting:
+        return results
+    done, pending = await asyncio.wait(waiting, timeout=THUMBNAIL_WAIT)
+    if pending:
+        logger.info("%d thumbnail(s) not ready after %.1fs, keeping the URL", len(pending), THUMBNAIL_WAIT)
+    for future in done:
+        if not future.exception() and future.result():
+            results[waiting[future]] = future.result()
+    return results
+
+def save_captured_rows(rows):
+    """
+    Pin the local thumbnails the rows link (so eviction leaves them alone),
+    journal the rows, then record them in the duplicate index and the mirror.
+    Index and mirror are brought in sync first: a rebuild after the journal
+    write would already contain the rows, and adding them again duplicates them.
+    """
+    if _thumbnails:
+        for row in rows:
+            if row[5]:
+                _thumbnails[0].pin(row[5])
+    watchlist_index().ensure_loaded()
+    ods_mirror().reconcile()
+    append_rows_to_journal(rows)
+    for row in rows:
+        watchlist_index().add(row[3], row[0])
+        ods_mirror().add(row)
+
+def save_captured_row(row):
+    """Journal one row and record it in the duplicate index and the mirror."""
+    save_captured_rows([row])
+
+def find_duplicates(entries):
+    """
+    Look up every capture of a bulk message in the index and in the batch itself.
+    Returns: one {"row", "match"} / {"batchIndex", "match"} / None per entry
+    """
+    from watchlist_index import normalize_title, normalize_url
+    index = watchlist_index()
+    seen = {}
+    found = []
+    for i, entry in enumerate(entries):
+        text, url, _ = capture_fields(entry)
+        duplicate = index.lookup(url, text)
+        keys = [("url", normalize_url(url)), ("title", normalize_title(text))]
+        if duplicate is None:
+            for match, key in keys:
+                if key and (match, key) in seen:
+                    duplicate = {"batchIndex": seen[(match, key)], "match": match}
+                    break
+        for match, key in keys:
+            if key:
+                seen.setdefault((match, key), i)
+        found.append(duplicate)
+    return found
+
+def handle_message(msg):
+    """
+    Show the input dialog for one captured selection and queue the row.
+    The row is only journaled here; FlushWorker writes it to the workbook.
+    """
+    text, url, image_src = capture_fields(msg)
+    row = build_row(text, url, image_src, ask_capture(text))
+    with phase("save"):
+        save_captured_row(row)
+    logger.debug("Queued row for ODS")
+
+# --- Async handlers ---
+
+@router.register("save-row")
+async def dispatch_capture(runtime, msg):
+    """Duplicate lookup and journal write on the I/O thread, dialog on the Qt thread."""
+    text, url, image_src = capture_fields(msg)
+    # Download the thumbnail while the user fills in the dialog
+    thumbnail = prefetch_thumbnail(image_src, msg.get("localImage", True))
+    with phase("duplicate lookup"):
+        duplicate = await runtime.in_io(lambda: watchlist_index().lookup(url, text))
+    if duplicate and msg.get("onDuplicate") == "skip":
+        logger.info("Skipped capture already in row %d (%s)", duplicate["row"], duplicate["match"])
+        return {"result": "SKIPPED", "duplicate": duplicate}
+    answer = answer_from_message(msg)
+    if answer is None:
+        with metrics.timed("dialog wait"):
+            answer = await runtime.in_gui(ask_capture, text)
+    with phase("thumbnail"):
+        image_src = await local_thumbnail(thumbnail, image_src)
+    row = build_row(text, url, image_src, answer)
+    with phase("save"):
+        await runtime.in_io(save_captured_row, row)
+    logger.debug("Queued row for ODS")
+    if flush_worker:
+        flush_worker.notify()
+    response = {"result": "OK"}
+    if duplicate:
+        response["duplicate"] = duplicate
+    return response
+
+@router.register("save-rows")
+async def dispatch_bulk_capture(runtime, msg):
+    """
+    Save many captures with one journal write. Entries carrying "episodes"
+    skip the dialog; the others are asked for one after another.
+    """
+    entries = msg.get("rows")
+    if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+        return {"error": "save-rows needs a list of row objects in \"rows\""}
+    skip_duplicates = msg.get("onDuplicate") == "skip"
+    fields = [capture_fields(entry) for entry in entries]
+    thumbnails_ahead = [prefetch_thumbnail(image_src, entry.get("localImage", msg.get("localImage", True)))
+                        for entry, (_, _, image_src) in zip(entries, fields)]
+    with phase("duplicate lookup"):
+        found = await runtime.in_io(find_duplicates, entries)
+
+    keep, duplicates, skipped = [], [], []
+    for i, (entry, duplicate) in enumerate(zip(entries, found)):
+        if duplicate:
+            duplicates.append(dict(duplicate, index=i))
+            if skip_duplicates or entry.get("onDuplicate") == "skip":
+                skipped.append(i)
+                continue
+        answer = answer_from_message(entry)
+        if answer is None:
+            with metrics.timed("dialog wait"):
+                answer = await runtime.in_gui(ask_capture, fields[i][0])
+        keep.append((i, answer))
+
+    with phase("thumbnail"):
+        images = await local_thumbnails([thumbnails_ahead[i] for i, _ in keep],
+                                        [fields[i][2] for i, _ in keep])
+    rows = [build_row(fields[i][0], fields[i][1], image_src, answer)
+            for (i, answer), image_src in zip(keep, images)]
+    if rows:
+        with phase("save"):
+            await runtime.in_io(save_captured_rows, rows)
+        if flush_worker:
+            flush_worker.notify()
+    logger.info("Bulk capture: %d saved, %d skipped", len(rows), len(skipped))
+    return {"result": "OK", "saved": len(rows), "skipped": skipped, "duplicates": duplicates}
+
+_netflix_transfers = {}
+_netflix_cache = []
+
+def _finish_netflix(options, raw_json, image_path=None):
+    """
+    Format/cache/save on the I/O thread, which owns the cache connection.
+    A local thumbnail is pinned, since the saved title links it.
+    """
+    import extract_netflix_json
+    if not _netflix_cache:
+        _netflix_cache.append(extract_netflix_json.open_cache())
+    if image_path:
+        thumbnails().pin(image_path)
+    return extract_netflix_json.finish_extraction(options, raw_json, _netflix_cache[0], image_path)
+
+# Per transferId, a future set once the transfer's latest chunk is scanned
+_chunk_tails = {}
+
+async def _scan_chunk(runtime, msg):
+    """
+    Scan one chunk on the CPU pool. Chunks of one transfer must be added in
+    the order they arrived, so each waits for the previous chunk of its
+    transfer; other transfers and messages are not held up.
+    """
+    import extract_netflix_json
+    transfer_id = msg.get("transferId")
+    previous = _chunk_tails.get(transfer_id)
+    done = runtime.loop.create_future()
+    _chunk_tails[transfer_id] = done
+    try:
+        if previous is not None:
+            await previous
+        with metrics.timed("chunk scan"):
+            return await runtime.in_cpu(extract_netflix_json.extract_from_message, msg, _netflix_transfers)
+    finally:
+        done.set_result(None)
+        if _chunk_tails.get(transfer_id) is done:
+            del _chunk_tails[transfer_id]
+
+@router.register("extract-netflix", "chunk")
+async def dispatch_netflix(runtime, msg):
+    """Extraction on the CPU pool (chunks are scanned in order as they arrive), saving on the I/O thread."""
+    import extract_netflix_json
+    if msg.get("type") == "chunk":
+        raw_json, options, response = await _scan_chunk(runtime, msg)
     else:
+        with metrics.timed("extraction"):
+            raw_json, options, response = await runtime.in_cpu(
+                extract_netflix_json.extract_from_message, msg, _netflix_transfers)
+    if raw_json is None:
+        return response
+    if options.get("allEntities"):
+        # One "entity" frame per JSON-LD entity, then the final response
+        request_id = msg.get("requestId")
+        def send(frame):
+            if request_id is not None:
+                frame["requestId"] = request_id
+            runtime.loop.call_soon_threadsafe(runtime.send, frame)
+        with metrics.timed("extraction"):
+            return await runtime.in_cpu(extract_netflix_json.stream_entities, raw_json, options, send)
+    image_url = raw_json.get("image")
+    thumbnail = thumbnails().prefetch(image_url) if image_url and isinstance(image_url, str) else None
+    # Waited for before saving, so the saved and cached title holds the path
+    image_path = await local_thumbnail(thumbnail, None) if thumbnail else None
+    return await runtime.in_io(_finish_netflix, options, raw_json, image_path)
+
+@router.register("query")
+async def dispatch_query(runtime, msg):
+    """Rows from the sheet mirror: filters "checked", "month" (yyyy-mm), "search", "limit"."""
+    rows = await runtime.in_io(lambda: ods_mirror().query(
+        msg.get("checked"), msg.get("month"), msg.get("search"), msg.get("limit")))
+    return {"result": "OK", "rows": rows}
+
+@router.register("stats")
+async def dispatch_stats(runtime, msg):
+    """
+    Report the per-handler counters of this host process and the phase
+    latencies (p50/p95/p99) of all runs recorded in host_metrics.json.
+    "reset": true clears the recorded phases first.
+    """
+    if msg.get("reset"):
+        await runtime.in_io(metrics.get_metrics().reset)
+    phases, since = await runtime.in_io(metrics.get_metrics().snapshot)
+    return {"handlers": router.stats(), "phases": phases, "since": since}
+
+async def dispatch(runtime, msg):
+    """Route one message through the router (HostRuntime reports the profile once it is answered)."""
+    return await router.dispatch(runtime, msg)
+
+# --- Main Execution ---
+if __name__ == "__main__":
+    if "--profile-startup" in sys.argv or os.environ.get("BROWSERTOCALC_PROFILE"):
+        timer = timing.enable()
+        timer.started = _t_start
+        timer.phases.append(("import host modules", time.perf_counter() - _t_start))
+    if len(sys.argv) > 1 and sys.argv[1] == "--compact":
+        # Fold the capture journal into the spreadsheet and exit
+        written = compact_ods_journal()
+        print(f"{written} Zeilen übernommen")
+        sys.exit(0)
+    if "--record" in sys.argv[1:-1]:
+        # Copy every incoming frame to a file for automation/replay_load.py
+        native_codec.start_recording(sys.argv[sys.argv.index("--record") + 1])
+    else:
+        native_codec.start_recording()
+    logger.debug("Script starting...")
+    flush_worker = FlushWorker()
+    flush_worker.start()
+    from host_runtime import HostRuntime
+    runtime = HostRuntime(dispatch)
+    with phase("read message"):
+        # Through the runtime, so a bad first frame gets an error frame too
+        msg = runtime.read()
+    if msg is None:
+        # Started by hand without Chrome: single manual capture
+        handle_message(None)
         print("Gespeichert!")
-    log_debug("Script completed successfully")
-    app = QApplication.instance()
-    if app:
-        app.quit()
\ No newline at end of file
+        if timing.active():
+            timing.active().report()
+    else:
+        # Serve until Chrome closes stdin: after one message for
+        # sendNativeMessage, at the end of the session for connectNative
+        runtime.run(msg)
+    # Chrome already has its answer; write the queued rows if they are due
+    flush_worker.stop()
+    native_codec.stop_recording()
+    if _thumbnails:
+        _thumbnails[0].close()
+    metrics.get_metrics().save()
+    logger.debug("Script completed successfully")
+    if "PyQt6.QtWidgets" in sys.modules:
+        app = sys.modules["PyQt6.QtWidgets"].QApplication.instance()
+        if app:
+            app.quit()
@@ -0,0 +1,202 @@
+# metrics.py
+# Per-phase latency counters and histograms for the native messaging hosts.
+#
+# Phases recorded (milliseconds):
+#   read          frame body read after its header arrived (native_codec)
+#   parse         JSON decode of a frame (native_codec)
+#   respond       encode + write of a response frame (native_codec)
+#   dialog wait   input dialog open until answered (main)
+#   extraction    JSON-LD extraction from a page (main)
+#   chunk scan    one chunk of a streamed page scanned for JSON-LD (main)
+#   ODS write     journal append of a captured row (Functions)
+#   ODS compact   journal folded into the workbook (Functions)
+#   JSON save     extracted title written to files or the store (extract_netflix_json)
+#
+# Histograms use fixed log-spaced buckets (about 19% wide), so they merge by
+# adding counts and percentiles are accurate to one bucket. save() adds this
+# run's counts to host_metrics.json in the project folder, which is how the
+# numbers survive across host processes; snapshot() reports both.
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+METRICS_PATH = os.environ.get("BROWSERTOCALC_METRICS_PATH") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "host_metrics.json")
+
+# Samples kept before record() bins them itself
+DRAIN_AT = 4096
+
+# Upper bucket bounds from 10 us to about 17 minutes, four per doubling
+BOUNDS = [0.01 * 2 ** (i / 4) for i in range(107)]
+
+class Histogram:
+    """Count, sum, max and bucket counts of one phase's latencies."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BOUNDS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.buckets[bisect.bisect_left(BOUNDS, ms)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+
+    def percentile(self, q):
+        """The q-th percentile, interpolated inside its bucket (capped at the max)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                lower = BOUNDS[i - 1] if i else 0.0
+                upper = BOUNDS[i] if i < len(BOUNDS) else self.max_ms
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max_ms)
+            seen += n
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+        }
+
+    def to_dict(self):
+        # Only the non-empty buckets are stored
+        return {"count": self.count, "total_ms": self.total_ms, "max_ms": self.max_ms,
+                "buckets": {str(i): n for i, n in enumerate(self.buckets) if n}}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.count = data.get("count", 0)
+        histogram.total_ms = data.get("total_ms", 0.0)
+        histogram.max_ms = data.get("max_ms", 0.0)
+        for i, n in data.get("buckets", {}).items():
+            if int(i) < len(histogram.buckets):
+                histogram.buckets[int(i)] = n
+        return histogram
+
+class Metrics:
+    """Phase histograms of this process plus the ones saved by earlier runs."""
+
+    def __init__(self, path=METRICS_PATH):
+        self.path = path
+        self.phases = {}
+        self._lock = threading.Lock()
+        # record() runs for every frame: it only appends (atomic, no lock)
+        # and the samples are binned when they are read or pile up
+        self._samples = deque()
+
+    def record(self, phase, ms):
+        self._samples.append((phase, ms))
+        if len(self._samples) > DRAIN_AT:
+            self._drain()
+
+    def _drain(self):
+        """Move the recorded samples into the histograms."""
+        with self._lock:
+            samples = self._samples
+            while True:
+                try:
+                    phase, ms = samples.popleft()
+                except IndexError:
+                    break
+                histogram = self.phases.get(phase)
+                if histogram is None:
+                    histogram = self.phases[phase] = Histogram()
+                histogram.add(ms)
+
+    @contextmanager
+    def timed(self, phase):
+        """Record how long the enclosed block took."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, (time.perf_counter() - start) * 1000)
+
+    def _load(self):
+        """Return (saved histograms, first save time) from the metrics file."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}, None
+        phases = {name: Histogram.from_dict(h) for name, h in data.get("phases", {}).items()}
+        return phases, data.get("since")
+
+    def snapshot(self):
+        """
+        Summaries over all saved runs and this one.
+        Returns: ({phase: {"count", "avg_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}}, since)
+        """
+        phases, since = self._load()
+        self._drain()
+        with self._lock:
+            for name, histogram in self.phases.items():
+                phases.setdefault(name, Histogram()).merge(histogram)
+        return {name: h.summary() for name, h in sorted(phases.items())}, since
+
+    def save(self):
+        """Add this process's counts to the metrics file and start counting afresh."""
+        self._drain()
+        with self._lock:
+            current, self.phases = self.phases, {}
+        if not current:
+            return
+        phases, since = self._load()
+        for name, histogram in current.items():
+            phases.setdefault(name, Histogram()).merge(histogram)
+        data = {"since": since or time.strftime("%Y-%m-%d %H:%M:%S"),
+                "phases": {name: h.to_dict() for name, h in phases.items()}}
+        tmp_path = self.path + ".%d.tmp" % os.getpid()
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Keep the counts for the next attempt
+            with self._lock:
+                for name, histogram in current.items():
+                    self.phases.setdefault(name, Histogram()).merge(histogram)
+
+    def reset(self):
+        """Forget this run's counts and delete the metrics file."""
+        self._drain()
+        with self._lock:
+            self.phases = {}
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+_metrics = Metrics()
+
+def get_metrics():
+    """Return the process-wide Metrics."""
+    return _metrics
+
+# Module-level shortcuts to the process-wide instance
+record = _metrics.record
+timed = _metrics.timed
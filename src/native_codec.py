@@ -0,0 +1,185 @@
+# native_codec.py
+# Framing codec for Chrome native messaging, shared by every host.
+#
+# A frame is a 4-byte native-endian length followed by that many bytes of
+# UTF-8 JSON. Reads loop until the whole frame has arrived (a pipe read may
+# return short), frame sizes are checked against Chrome's limits, and the
+# header and body are written in one call. orjson is used when installed,
+# the json module otherwise.
+
+import atexit
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Chrome sends at most 64 MiB to a host and accepts at most 1 MiB back
+MAX_INCOMING = 64 * 1024 * 1024
+MAX_OUTGOING = 1024 * 1024
+# Bodies from this size on are written with os.writev instead of being
+# joined with the header (not available on Windows)
+WRITEV_THRESHOLD = 64 * 1024
+
+_header = struct.Struct('=I')
+_write_lock = threading.Lock()
+
+# Incoming frames are copied here (wire format) while recording is on
+RECORD_ENV = "BROWSERTOCALC_RECORD"
+_recording = None
+_recording_lock = threading.Lock()
+
+class FramingError(ValueError):
+    """A frame was truncated, oversized or not valid JSON."""
+
+def json_decode(body):
+    return json.loads(body)
+
+def json_encode(obj):
+    # ASCII escaping is the fast path of the C encoder
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+def orjson_encode(obj):
+    try:
+        return orjson.dumps(obj)
+    except orjson.JSONEncodeError:
+        # Integers over 64 bits, non-str keys etc., which json still encodes
+        return json_encode(obj)
+
+if orjson is not None:
+    decode = orjson.loads
+    encode = orjson_encode
+else:
+    decode = json_decode
+    encode = json_encode
+
+def read_exact(stream, size):
+    """Read exactly size bytes; returns fewer only at end of input."""
+    data = stream.read(size) or b''
+    if len(data) == size or not data:
+        return data
+    # Short read (e.g. unbuffered pipe): keep reading until the frame is complete
+    parts = [data]
+    received = len(data)
+    while received < size:
+        chunk = stream.read(size - received)
+        if not chunk:
+            break
+        parts.append(chunk)
+        received += len(chunk)
+    return b''.join(parts)
+
+def read_frame(stream=None, max_size=MAX_INCOMING):
+    """
+    Read one frame body.
+    Returns None on a clean end of input; raises FramingError otherwise.
+    """
+    stream = stream or sys.stdin.buffer
+    header = read_exact(stream, 4)
+    if not header:
+        return None
+    if len(header) < 4:
+        raise FramingError("Truncated frame header")
+    start = time.perf_counter()
+    (length,) = _header.unpack(header)
+    if length > max_size:
+        # Skip the body so the next frame can still be read
+        remaining = length
+        while remaining:
+            skipped = len(stream.read(min(remaining, 1024 * 1024)) or b'')
+            if not skipped:
+                break
+            remaining -= skipped
+        raise FramingError(f"Frame of {length} bytes exceeds the {max_size} byte limit")
+    body = read_exact(stream, length)
+    if len(body) < length:
+        raise FramingError(f"Truncated frame: expected {length} bytes, got {len(body)}")
+    # Timed from the header on: waiting for the next message is not reading
+    metrics.record("read", (time.perf_counter() - start) * 1000)
+    if _recording is not None:
+        with _recording_lock:
+            if _recording is not None:
+                _recording.write(header + body)
+                _recording.flush()
+    return body
+
+def start_recording(path=None):
+    """
+    Append every frame read from now on to path (default: $BROWSERTOCALC_RECORD)
+    so that automation/replay_load.py can play it back. The file is also
+    closed at interpreter exit if the host does not call stop_recording().
+    Returns: True if recording started
+    """
+    global _recording
+    path = path or os.environ.get(RECORD_ENV)
+    if not path:
+        return False
+    stop_recording()
+    with _recording_lock:
+        _recording = open(path, "ab")
+    atexit.register(stop_recording)
+    return True
+
+def stop_recording():
+    """Close the recording file (no-op if not recording)."""
+    global _recording
+    with _recording_lock:
+        if _recording is not None:
+            _recording.close()
+            _recording = None
+
+def read_message(stream=None, max_size=MAX_INCOMING):
+    """Read and decode one message; None at end of input."""
+    body = read_frame(stream, max_size)
+    if body is None:
+        return None
+    start = time.perf_counter()
+    try:
+        message = decode(body)
+    except ValueError as e:
+        raise FramingError(f"Invalid JSON in frame: {e}") from None
+    metrics.record("parse", (time.perf_counter() - start) * 1000)
+    return message
+
+def _write_all(fd, header, body):
+    """Write header and body with one writev call (repeated only if partial)."""
+    written = os.writev(fd, [header, body])
+    if written < len(header) + len(body):
+        rest = memoryview(header + body)[written:]
+        while rest:
+            rest = rest[os.write(fd, rest):]
+
+def write_message(obj, stream=None, max_size=MAX_OUTGOING):
+    """Encode obj and write it as one frame (thread-safe)."""
+    start = time.perf_counter()
+    _write_message(obj, stream or sys.stdout.buffer, max_size)
+    metrics.record("respond", (time.perf_counter() - start) * 1000)
+
+def _write_message(obj, stream, max_size):
+    body = encode(obj)
+    if len(body) > max_size:
+        raise FramingError(f"Response of {len(body)} bytes exceeds the {max_size} byte limit")
+    header = _header.pack(len(body))
+    with _write_lock:
+        if len(body) < WRITEV_THRESHOLD or not hasattr(os, 'writev'):
+            # Joining a small body costs less than the extra calls
+            stream.write(header + body)
+            stream.flush()
+            return
+        try:
+            fileno = stream.fileno()
+        except (AttributeError, OSError, ValueError):
+            stream.write(header + body)
+            stream.flush()
+            return
+        # Anything still buffered must go out before the frame
+        stream.flush()
+        _write_all(fileno, header, body)
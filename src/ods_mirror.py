@@ -0,0 +1,209 @@
+# ods_mirror.py
+# SQLite mirror of the watchlist sheet for queries that should not parse the
+# zipped workbook (checked titles, captures of a month, text search).
+#
+# The mirror lives next to the workbook (MeineAblage.ods.sqlite) and gets
+# every captured row as it is journaled. It remembers the workbook mtime it
+# is in sync with; when the workbook was changed outside the host the mirror
+# is rebuilt from the sheet plus the journal before it is next used.
+#
+# Usage:
+#     python ods_mirror.py --checked
+#     python ods_mirror.py --month 2024-05
+#     python ods_mirror.py --search dark
+
+import argparse
+import datetime
+import itertools
+import os
+import sqlite3
+import sys
+import threading
+
+import Functions
+from host_logging import get_logger
+
+logger = get_logger()
+
+MIRROR_SUFFIX = ".sqlite"
+COLUMNS = ("text", "second_value", "date", "url", "checkbox", "image_src")
+
+def iso_date(date_str):
+    """Turn the sheet's dd.mm.yyyy date into yyyy-mm-dd (None if it is not one)."""
+    try:
+        return datetime.datetime.strptime(str(date_str).strip(), "%d.%m.%Y").date().isoformat()
+    except ValueError:
+        return None
+
+class OdsMirror:
+    """The six sheet columns in SQLite, one row per sheet row."""
+
+    def __init__(self, path=None):
+        self.path = path or Functions.ODS_PATH + MIRROR_SUFFIX
+        # Compaction reports the new mtime from the flush thread
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                text TEXT,
+                second_value TEXT,
+                date TEXT,
+                url TEXT,
+                checkbox INTEGER NOT NULL DEFAULT 0,
+                image_src TEXT,
+                added TEXT
+            );
+            CREATE INDEX IF NOT EXISTS rows_added ON rows (added);
+            CREATE INDEX IF NOT EXISTS rows_checkbox ON rows (checkbox);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value);
+        """)
+        Functions.COMPACT_HOOKS.append(self._compacted)
+
+    @staticmethod
+    def _ods_mtime():
+        try:
+            return os.path.getmtime(Functions.ODS_PATH)
+        except OSError:
+            return None
+
+    def _set_mtime(self, mtime):
+        self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('ods_mtime', ?)", (mtime,))
+
+    def synced(self):
+        """Returns: (workbook mtime,) of the last sync, or None if never synced"""
+        with self._lock:
+            return self.db.execute("SELECT value FROM meta WHERE name = 'ods_mtime'").fetchone()
+
+    @staticmethod
+    def _values(row):
+        row = (list(row) + [""] * len(COLUMNS))[:len(COLUMNS)]
+        checkbox = 1 if str(row[4]).strip() in ("1", "True", "true") else 0
+        return (str(row[0]), str(row[1]), str(row[2]), str(row[3]), checkbox, str(row[5]),
+                iso_date(row[2]))
+
+    def reconcile(self):
+        """
+        Rebuild from the workbook if it changed since the last sync.
+        Returns: True if the mirror was rebuilt
+        """
+        synced = self.synced()
+        if synced is not None and synced[0] == self._ods_mtime():
+            return False
+        self.rebuild()
+        return True
+
+    def rebuild(self):
+        """Replace the mirror with the sheet rows plus the journaled rows."""
+        mtime = self._ods_mtime()
+        rows = itertools.chain(Functions.iter_ods_rows(), Functions.pending_rows())
+        with self._lock:
+            self.db.execute("DELETE FROM rows")
+            # The sheet is streamed straight into the table
+            self.db.executemany(
+                "INSERT INTO rows (text, second_value, date, url, checkbox, image_src, added) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (self._values(row) for row in rows))
+            self._set_mtime(mtime)
+            self.db.commit()
+        logger.info("Rebuilt ODS mirror with %d rows", self.count())
+
+    def add(self, row):
+        """
+        Mirror one captured row (already journaled).
+        Returns: its row number in the sheet
+        """
+        if self.reconcile():
+            # The rebuild read the row from the journal
+            return self.count()
+        with self._lock:
+            cursor = self.db.execute(
+                "INSERT INTO rows (text, second_value, date, url, checkbox, image_src, added) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", self._values(row))
+            self.db.commit()
+            return cursor.lastrowid
+
+    def _compacted(self, mtime):
+        """The host itself rewrote the workbook: the rows are already mirrored."""
+        with self._lock:
+            self._set_mtime(mtime)
+            self.db.commit()
+
+    def _select(self, where="", params=(), limit=None):
+        self.reconcile()
+        sql = "SELECT row, " + ", ".join(COLUMNS) + " FROM rows"
+        if where:
+            sql += " WHERE " + where
+        sql += " ORDER BY row"
+        if limit:
+            sql += " LIMIT %d" % int(limit)
+        with self._lock:
+            result = self.db.execute(sql, params).fetchall()
+        return [dict(zip(("row",) + COLUMNS, values)) for values in result]
+
+    def count(self):
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def checked(self, state=True, limit=None):
+        """Rows whose checkbox column is (or is not) ticked."""
+        return self._select("checkbox = ?", (1 if state else 0,), limit)
+
+    def added_between(self, start, end, limit=None):
+        """Rows captured from start up to and including end (dates or yyyy-mm-dd)."""
+        return self._select("added BETWEEN ? AND ?", (str(start), str(end)), limit)
+
+    def added_in_month(self, year, month, limit=None):
+        """Rows captured in the given month."""
+        return self._select("added LIKE ?", ("%04d-%02d-%%" % (year, month),), limit)
+
+    def search(self, term, limit=None):
+        """Rows whose text contains term (case insensitive for ASCII)."""
+        return self._select("text LIKE ?", ("%" + term + "%",), limit)
+
+    def query(self, checked=None, month=None, search=None, limit=None):
+        """
+        Combine the filters above; month is "yyyy-mm".
+        Returns: list of {"row", "text", "second_value", "date", "url", "checkbox", "image_src"}
+        """
+        where, params = [], []
+        if checked is not None:
+            where.append("checkbox = ?")
+            params.append(1 if checked else 0)
+        if month:
+            where.append("added LIKE ?")
+            params.append(month + "-%")
+        if search:
+            where.append("text LIKE ?")
+            params.append("%" + search + "%")
+        return self._select(" AND ".join(where), params, limit)
+
+    def close(self):
+        if self._compacted in Functions.COMPACT_HOOKS:
+            Functions.COMPACT_HOOKS.remove(self._compacted)
+        self.db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the SQLite mirror of the watchlist")
+    parser.add_argument("--checked", action="store_true", help="Only ticked rows")
+    parser.add_argument("--unchecked", action="store_true", help="Only rows that are not ticked")
+    parser.add_argument("--month", help="Captured in this month (yyyy-mm)")
+    parser.add_argument("--search", help="Text contains this")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild from the workbook first")
+    args = parser.parse_args()
+
+    mirror = OdsMirror()
+    if args.rebuild:
+        mirror.rebuild()
+    checked = True if args.checked else False if args.unchecked else None
+    rows = mirror.query(checked, args.month, args.search, args.limit)
+    for row in rows:
+        print(f"{row['row']:>6}  {row['date']:<10}  {'x' if row['checkbox'] else ' '}  "
+              f"{row['text']}  {row['second_value']}  {row['url']}")
+    print(f"{len(rows)} von {mirror.count()} Zeilen")
+    mirror.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
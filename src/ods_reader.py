@@ -0,0 +1,242 @@
+# ods_reader.py
+# Streaming reader for the rows of one sheet of an ODS workbook.
+#
+# pyexcel_ods3.get_data builds the whole content.xml as an lxml tree and then
+# nested lists before the first row can be used. This reader feeds content.xml
+# from inside the zip to expat in small blocks and turns the parser callbacks
+# straight into row tuples, so no element tree is built and memory stays flat
+# however long the sheet is. Stopping early (break out of the loop) stops
+# reading the file.
+#
+# Cell values follow get_data: whole floats become int, booleans bool, dates
+# date/datetime, everything else the cell text. Repeated rows and cells are
+# expanded; trailing empty cells and trailing empty rows are dropped.
+
+import datetime
+import re
+import zipfile
+from xml.parsers import expat
+
+TABLE_NS = "urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+TEXT_NS = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+OFFICE_NS = "urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+
+# Bytes of content.xml handed to the parser at a time
+BLOCK_SIZE = 64 * 1024
+
+# expat reports namespaced names as "<uri> <local name>"
+_TABLE = TABLE_NS + " table"
+_ROW = TABLE_NS + " table-row"
+_CELL = TABLE_NS + " table-cell"
+_COVERED_CELL = TABLE_NS + " covered-table-cell"
+_NAME = TABLE_NS + " name"
+_ROWS_REPEATED = TABLE_NS + " number-rows-repeated"
+_COLUMNS_REPEATED = TABLE_NS + " number-columns-repeated"
+_VALUE_TYPE = OFFICE_NS + " value-type"
+_VALUE = OFFICE_NS + " value"
+_DATE_VALUE = OFFICE_NS + " date-value"
+_TIME_VALUE = OFFICE_NS + " time-value"
+_BOOLEAN_VALUE = OFFICE_NS + " boolean-value"
+_CURRENCY = OFFICE_NS + " currency"
+_P = TEXT_NS + " p"
+_S = TEXT_NS + " s"
+_TAB = TEXT_NS + " tab"
+_LINE_BREAK = TEXT_NS + " line-break"
+_C = TEXT_NS + " c"
+
+_DURATION = re.compile(r"PT(\d+)H(\d+)M(\d+)S")
+
+def _number(value):
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+def _date(value):
+    try:
+        if len(value) == 10:
+            return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+        return datetime.datetime.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")
+    except ValueError:
+        return value
+
+def _time(value):
+    match = _DURATION.match(value)
+    if not match:
+        return value
+    hours, minutes, seconds = (int(g) for g in match.groups())
+    if hours < 24:
+        return datetime.time(hours, minutes, seconds)
+    return datetime.timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+def cell_value(attrs, paragraphs):
+    """Python value of a table cell from its attributes and text paragraphs."""
+    value_type = attrs.get(_VALUE_TYPE)
+    if value_type == "float":
+        return _number(attrs[_VALUE])
+    if value_type == "percentage":
+        return float(attrs[_VALUE])
+    if value_type == "currency":
+        return "%s %s" % (_number(attrs[_VALUE]), attrs.get(_CURRENCY, ""))
+    if value_type == "boolean":
+        return attrs.get(_BOOLEAN_VALUE) == "true"
+    if value_type == "date" and _DATE_VALUE in attrs:
+        return _date(attrs[_DATE_VALUE])
+    if value_type == "time" and _TIME_VALUE in attrs:
+        return _time(attrs[_TIME_VALUE])
+    return "\n".join(paragraphs)
+
+class _SheetParser:
+    """expat callbacks that collect the finished rows of one sheet in self.rows."""
+
+    def __init__(self, sheet_name, columns):
+        self.sheet_name = sheet_name
+        self.columns = list(columns) if columns is not None else None
+        self.wanted = set(self.columns) if columns is not None else None
+        self.last_wanted = max(self.wanted) if self.wanted else None
+        self.rows = []
+        self.done = False
+        self.in_sheet = False
+        self.empty_rows = 0
+        # Current row
+        self.values = None
+        self.row_repeat = 1
+        self.column = 0
+        self.empty_cells = 0
+        # Current cell: attributes (None if its value is not needed), depth of
+        # elements open inside it, its paragraphs and the one being read
+        self.cell = None
+        self.cell_repeat = 1
+        self.depth = 0
+        self.paragraphs = None
+        self.parts = None
+
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.text
+        self.parser = parser
+
+    def feed(self, data, final=False):
+        self.parser.Parse(data, final)
+
+    def _needed(self, column, repeat):
+        if self.wanted is None:
+            return True
+        if repeat == 1:
+            return column in self.wanted
+        if column > self.last_wanted:
+            return False
+        return any(c in self.wanted for c in range(column, column + repeat))
+
+    def start(self, name, attrs):
+        if not self.in_sheet:
+            if name == _TABLE and not self.done:
+                self.in_sheet = self.sheet_name is None or attrs.get(_NAME) == self.sheet_name
+            return
+        if self.cell is not None:
+            self.depth += 1
+            if self.parts is not None:
+                # Inside a paragraph: spans add their text, these add whitespace
+                if name == _S:
+                    self.parts.append(" " * int(attrs.get(_C, "1")))
+                elif name == _TAB:
+                    self.parts.append("\t")
+                elif name == _LINE_BREAK:
+                    self.parts.append("\n")
+            elif name == _P and self.depth == 1 and self.paragraphs is not None:
+                # Paragraphs of annotations (comments) sit deeper and are skipped
+                self.parts = []
+            return
+        if name == _CELL or name == _COVERED_CELL:
+            self.cell_repeat = int(attrs.get(_COLUMNS_REPEATED, "1"))
+            if name == _CELL and self._needed(self.column, self.cell_repeat):
+                self.cell = attrs
+                self.paragraphs = []
+            else:
+                self.cell = {}
+                self.paragraphs = None
+            self.depth = 0
+        elif name == _ROW:
+            self.values = []
+            self.row_repeat = int(attrs.get(_ROWS_REPEATED, "1"))
+            self.column = 0
+            self.empty_cells = 0
+
+    def text(self, data):
+        if self.parts is not None:
+            self.parts.append(data)
+
+    def end(self, name):
+        if not self.in_sheet:
+            return
+        if self.cell is not None:
+            if self.depth:
+                self.depth -= 1
+                if name == _P and self.depth == 0 and self.parts is not None:
+                    self.paragraphs.append("".join(self.parts))
+                    self.parts = None
+                return
+            self._end_cell()
+        elif name == _ROW:
+            self._end_row()
+        elif name == _TABLE:
+            self.in_sheet = False
+            self.done = True
+
+    def _end_cell(self):
+        repeat = self.cell_repeat
+        value = cell_value(self.cell, self.paragraphs) if self.paragraphs is not None else ""
+        self.cell = None
+        self.column += repeat
+        if value == "":
+            # Counted until something follows, so the padding cells up to the
+            # sheet's width are never expanded
+            self.empty_cells += repeat
+            return
+        if self.empty_cells:
+            self.values.extend([""] * self.empty_cells)
+            self.empty_cells = 0
+        self.values.extend([value] * repeat)
+
+    def _end_row(self):
+        values = self.values
+        if not values:
+            self.empty_rows += self.row_repeat
+            return
+        if self.columns is not None:
+            row = tuple(values[c] if c < len(values) else "" for c in self.columns)
+            empty = ("",) * len(self.columns)
+        else:
+            row = tuple(values)
+            empty = ()
+        if self.empty_rows:
+            # Empty rows between data rows are kept, trailing ones are not
+            self.rows.extend([empty] * self.empty_rows)
+            self.empty_rows = 0
+        self.rows.extend([row] * self.row_repeat)
+
+def iter_rows(path, sheet_name=None, columns=None):
+    """
+    Lazily yield the rows of one sheet.
+    sheet_name defaults to the first sheet; columns is a sequence of
+    0-based column numbers to project each row onto (missing cells are "").
+    Yields: tuple per row
+    """
+    sheet = _SheetParser(sheet_name, columns)
+    with zipfile.ZipFile(path) as archive, archive.open("content.xml") as content:
+        while not sheet.done:
+            block = content.read(BLOCK_SIZE)
+            sheet.feed(block, final=not block)
+            rows, sheet.rows = sheet.rows, []
+            yield from rows
+            if not block:
+                break
+
+def read_rows(path, sheet_name=None, columns=None, limit=None):
+    """Return the first limit rows (all rows if limit is None) as a list of tuples."""
+    rows = []
+    for row in iter_rows(path, sheet_name, columns):
+        if limit is not None and len(rows) >= limit:
+            break
+        rows.append(row)
+    return rows
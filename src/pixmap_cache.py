@@ -0,0 +1,56 @@
+# pixmap_cache.py
+# Process-wide cache of the checkbox images used by ToggleImageWidget.
+# Each PNG is decoded once, and each (state, size, device pixel ratio) is
+# scaled once, so creating, focusing and toggling widgets does no file I/O
+# or image scaling. Needs a QApplication before the first call.
+
+import os
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QPixmap
+
+_project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The folder is "Assets" in the repo; Windows paths are case-insensitive
+ASSETS_DIR = next((os.path.join(_project_dir, name) for name in ('assets', 'Assets')
+                   if os.path.isdir(os.path.join(_project_dir, name))),
+                  os.path.join(_project_dir, 'assets'))
+
+# (checked, focused) -> file name
+TOGGLE_IMAGES = {
+    (False, False): 'checkbox_unchecked.png',
+    (False, True): 'checkbox_unchecked_hover.png',
+    (True, False): 'checkbox_checked.png',
+    (True, True): 'checkbox_checked_hover.png',
+}
+
+_sources = {}
+_scaled = {}
+
+def _source_pixmap(name):
+    pixmap = _sources.get(name)
+    if pixmap is None:
+        pixmap = _sources[name] = QPixmap(os.path.join(ASSETS_DIR, name))
+    return pixmap
+
+def toggle_pixmap(checked, focused, size=42, device_pixel_ratio=1.0):
+    """
+    Return the pre-scaled pixmap for a toggle state.
+    The result is shared between widgets; a null pixmap means the PNG is missing.
+    """
+    key = (bool(checked), bool(focused), size, device_pixel_ratio)
+    pixmap = _scaled.get(key)
+    if pixmap is None:
+        source = _source_pixmap(TOGGLE_IMAGES[key[:2]])
+        if source.isNull():
+            pixmap = source
+        else:
+            edge = round(size * device_pixel_ratio)
+            pixmap = source.scaled(edge, edge, Qt.AspectRatioMode.KeepAspectRatio,
+                                   Qt.TransformationMode.SmoothTransformation)
+            pixmap.setDevicePixelRatio(device_pixel_ratio)
+        _scaled[key] = pixmap
+    return pixmap
+
+def clear():
+    """Drop all cached pixmaps (e.g. after the assets changed)."""
+    _sources.clear()
+    _scaled.clear()
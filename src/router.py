@@ -0,0 +1,73 @@
+# router.py
+# Dispatches native messages to handlers by their "type" field.
+#
+# Handlers are `async def handler(runtime, msg)` coroutines returning the
+# response dict (or None for no answer). Register new message types with
+#
+#     @router.register("my-type")
+#     async def handle_my_type(runtime, msg): ...
+#
+# Messages from older extension versions carry no "type"; they are mapped
+# to "extract-netflix" when they contain htmlContent and to "save-row"
+# otherwise.
+
+import time
+
+from host_logging import get_logger
+
+logger = get_logger()
+
+class MessageRouter:
+    """Registry of message handlers with per-handler latency counters."""
+
+    def __init__(self):
+        self.handlers = {}
+        self.counters = {}
+
+    def register(self, message_type, *aliases):
+        """Decorator registering a handler for one or more message types."""
+        def decorator(handler):
+            for name in (message_type,) + aliases:
+                self.handlers[name] = handler
+            return handler
+        return decorator
+
+    @staticmethod
+    def message_type(msg):
+        """Return the message's type, inferring it for untyped legacy messages."""
+        message_type = msg.get("type")
+        if message_type:
+            return message_type
+        return "extract-netflix" if "htmlContent" in msg else "save-row"
+
+    async def dispatch(self, runtime, msg):
+        """Run the handler for msg and record how long it took."""
+        message_type = self.message_type(msg)
+        handler = self.handlers.get(message_type)
+        if handler is None:
+            return {"error": f"Unknown message type: {message_type}"}
+        counter = self.counters.setdefault(message_type, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        start = time.perf_counter()
+        try:
+            return await handler(runtime, msg)
+        except Exception:
+            counter["errors"] += 1
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            counter["count"] += 1
+            counter["total_ms"] += elapsed
+            counter["max_ms"] = max(counter["max_ms"], elapsed)
+            logger.debug("%s handled in %.1f ms", message_type, elapsed)
+
+    def stats(self):
+        """Return {type: {"count", "errors", "avg_ms", "max_ms"}} for this process."""
+        return {
+            name: {
+                "count": c["count"],
+                "errors": c["errors"],
+                "avg_ms": c["total_ms"] / c["count"] if c["count"] else 0.0,
+                "max_ms": c["max_ms"],
+            }
+            for name, c in self.counters.items()
+        }
@@ -0,0 +1,266 @@
+# thumbnail_cache.py
+# Local cache of downscaled thumbnails for captured image URLs, so that the
+# spreadsheet links a file instead of hot-linking the remote image.
+#
+# Downloads run on a small thread pool; every worker keeps one HTTP
+# connection per host alive between requests. Thumbnails are stored under
+# the SHA-256 of their bytes (MeineAblage.ods.thumbs/ab/abcdef....jpg), so
+# the same picture behind several URLs is stored once and a thumbnail that
+# was evicted comes back at the same path when it is fetched again. An
+# SQLite index maps URLs to digests and evicts the least recently used
+# thumbnails once the cache grows beyond max_bytes.
+#
+# A thumbnail whose path was written into a sheet row is pinned (pin()) and
+# never evicted, since the row links the file and nothing would fetch it
+# again. Only thumbnails no row uses (e.g. dialogs that were cancelled) make
+# room; pinned ones may push the cache beyond max_bytes.
+
+import hashlib
+import http.client
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import Functions
+from host_logging import get_logger
+
+logger = get_logger()
+
+CACHE_SUFFIX = ".thumbs"
+THUMB_SIZE = 320          # longest side in pixels
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+WORKERS = 4
+TIMEOUT = 10.0
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+MAX_REDIRECTS = 3
+
+def downscale(data, size=THUMB_SIZE):
+    """
+    Scale image bytes so that the longest side is at most size pixels.
+    Returns: (bytes, extension) - the original bytes if Qt cannot decode them
+    """
+    try:
+        from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, Qt
+        from PyQt6.QtGui import QImage
+    except ImportError:
+        return data, ".img"
+    image = QImage()
+    if not image.loadFromData(data):
+        return data, ".img"
+    if max(image.width(), image.height()) > size:
+        image = image.scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                             Qt.TransformationMode.SmoothTransformation)
+    elif data[:3] == b"\xff\xd8\xff":
+        # Already a small JPEG
+        return data, ".jpg"
+    buffer = QByteArray()
+    device = QBuffer(buffer)
+    device.open(QIODevice.OpenModeFlag.WriteOnly)
+    if image.hasAlphaChannel():
+        image.save(device, "PNG")
+        return bytes(buffer.data()), ".png"
+    image.save(device, "JPG", 85)
+    return bytes(buffer.data()), ".jpg"
+
+class ThumbnailCache:
+    """Content-addressed thumbnail store with a bounded download pool."""
+
+    def __init__(self, directory=None, max_bytes=MAX_CACHE_BYTES, workers=WORKERS,
+                 size=THUMB_SIZE, timeout=TIMEOUT):
+        self.directory = directory or Functions.ODS_PATH + CACHE_SUFFIX
+        self.max_bytes = max_bytes
+        self.size = size
+        self.timeout = timeout
+        os.makedirs(self.directory, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), check_same_thread=False)
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                pinned INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+        """)
+        columns = [c[1] for c in self.db.execute("PRAGMA table_info(blobs)")]
+        if "pinned" not in columns:
+            # Index from before pinning: any of its thumbnails may be in a row
+            self.db.execute("ALTER TABLE blobs ADD COLUMN pinned INTEGER NOT NULL DEFAULT 1")
+            self.db.commit()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbs")
+
+    # --- Lookup ---
+
+    def cached(self, url):
+        """Return the local path of url's thumbnail, or None if it is not cached."""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT blobs.digest, blobs.path FROM urls JOIN blobs USING (digest) WHERE url = ?",
+                (url,)).fetchone()
+            if row is None or not os.path.exists(row[1]):
+                return None
+            self.db.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), row[0]))
+            self.db.commit()
+            return row[1]
+
+    def pin(self, path):
+        """
+        Keep the thumbnail at path for good because a sheet row links it.
+        Returns: True if path is a thumbnail of this cache
+        """
+        with self._lock:
+            pinned = self.db.execute("UPDATE blobs SET pinned = 1 WHERE path = ?", (path,)).rowcount
+            self.db.commit()
+        return pinned > 0
+
+    def prefetch(self, url):
+        """
+        Start fetching url in the background (no-op for non-HTTP values).
+        Returns: Future resolving to the local path or None, or None if nothing to fetch
+        """
+        if not url or urlsplit(url).scheme not in ("http", "https"):
+            return None
+        with self._lock:
+            future = self._pending.get(url)
+            if future is None:
+                future = self._pool.submit(self._fetch, url)
+                self._pending[url] = future
+                future.add_done_callback(lambda _: self._forget(url))
+        return future
+
+    def get(self, url, timeout=None):
+        """Fetch url if needed and return the local path (None on failure or timeout)."""
+        future = self.prefetch(url)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout)
+        except Exception:
+            return None
+
+    def _forget(self, url):
+        with self._lock:
+            self._pending.pop(url, None)
+
+    # --- Download ---
+
+    def _connection(self, scheme, netloc):
+        """The worker thread's keep-alive connection to netloc."""
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        key = (scheme, netloc)
+        if key not in connections:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connections[key] = cls(netloc, timeout=self.timeout)
+        return connections[key]
+
+    def _request(self, url):
+        """
+        GET url over a reused connection, retrying once if the server dropped it.
+        The connection is only kept for the next request when the response was
+        read to its end; otherwise (oversized body, any error) it is closed, so
+        leftover bytes are never read as the next response.
+        """
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        for attempt in (1, 2):
+            conn = self._connection(parts.scheme, parts.netloc)
+            try:
+                conn.request("GET", target, headers={"User-Agent": "Browsertocalc"})
+                response = conn.getresponse()
+                body = response.read(MAX_IMAGE_BYTES + 1)
+            except (http.client.RemoteDisconnected, ConnectionError, http.client.CannotSendRequest):
+                # A kept-alive connection the server has closed in the meantime
+                conn.close()
+                if attempt == 2:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            if not response.isclosed():
+                conn.close()
+            return response, body
+
+    def _fetch(self, url):
+        """Worker: download, downscale and store one image. Returns its local path."""
+        path = self.cached(url)
+        if path:
+            return path
+        try:
+            location = url
+            for _ in range(MAX_REDIRECTS + 1):
+                response, body = self._request(location)
+                if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+                    location = urljoin(location, response.getheader("Location"))
+                    continue
+                break
+            if response.status != 200:
+                raise OSError(f"HTTP {response.status}")
+            if len(body) > MAX_IMAGE_BYTES:
+                raise OSError("image too large")
+            data, extension = downscale(body, self.size)
+            return self._store(url, data, extension)
+        except Exception as e:
+            logger.warning("Thumbnail for %s failed: %s", url, e)
+            return None
+
+    def _store(self, url, data, extension):
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.directory, digest[:2], digest + extension)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".%d.tmp" % threading.get_ident()
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            # An upsert, so a pinned thumbnail stays pinned when another URL has the same bytes
+            self.db.execute("INSERT INTO blobs (digest, path, size, last_used) VALUES (?, ?, ?, ?) "
+                            "ON CONFLICT (digest) DO UPDATE SET last_used = excluded.last_used",
+                            (digest, path, len(data), time.time()))
+            self.db.execute("INSERT OR REPLACE INTO urls (url, digest) VALUES (?, ?)", (url, digest))
+            self._evict()
+            self.db.commit()
+        return path
+
+    def _evict(self):
+        """Delete least recently used unpinned thumbnails until the cache fits max_bytes (lock held)."""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, path, size in self.db.execute(
+                "SELECT digest, path, size FROM blobs WHERE NOT pinned ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self.db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self.db.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+            total -= size
+
+    def stats(self):
+        """Returns: {"thumbnails", "pinned", "bytes", "urls"}"""
+        with self._lock:
+            count, pinned, size = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pinned), 0), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            urls = self.db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        return {"thumbnails": count, "pinned": pinned, "bytes": size, "urls": urls}
+
+    def close(self, wait=True):
+        self._pool.shutdown(wait=wait)
+        self.db.close()
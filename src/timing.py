@@ -0,0 +1,53 @@
+# timing.py
+# Lightweight phase timing for the native messaging host.
+# Disabled by default; phase() is a no-op until enable() is called.
+
+import sys
+import time
+from contextlib import contextmanager
+
+class PhaseTimer:
+    """Collects (phase name, seconds) pairs in the order they finished."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self, stream=None):
+        """Print a breakdown to stderr (stdout belongs to native messaging)."""
+        stream = stream or sys.stderr
+        total = time.perf_counter() - self.started
+        stream.write("--- startup profile ---\n")
+        for name, seconds in self.phases:
+            stream.write(f"{name:<28} {seconds * 1000:9.1f} ms\n")
+        stream.write(f"{'total':<28} {total * 1000:9.1f} ms\n")
+        stream.flush()
+
+_active = None
+
+def enable():
+    """Start collecting phases for this process and return the timer."""
+    global _active
+    _active = PhaseTimer()
+    return _active
+
+def active():
+    """Return the active PhaseTimer or None when profiling is off."""
+    return _active
+
+@contextmanager
+def phase(name):
+    """Time the enclosed block if profiling is enabled."""
+    if _active is None:
+        yield
+        return
+    with _active.phase(name):
+        yield
@@ -0,0 +1,161 @@
+# watchlist_index.py
+# In-memory index of the watchlist for duplicate detection at capture time.
+#
+# Rows are keyed by normalized URL and normalized title. The index is kept in
+# an append-only sidecar next to the workbook (MeineAblage.ods.index):
+#   {"mtime": 1712345678.9}         workbook mtime the index is in sync with
+#   ["<url key>", "<title key>"]     one captured row
+# Loading the sidecar is a single pass; new captures append one line. The
+# index is only rebuilt from the workbook when its mtime no longer matches,
+# i.e. after the spreadsheet was edited outside the host.
+
+import itertools
+import json
+import os
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import Functions
+from host_logging import get_logger
+
+logger = get_logger()
+
+INDEX_SUFFIX = ".index"
+URL_COLUMN = 3
+TITLE_COLUMN = 0
+
+# Query parameters that only track where a click came from
+_TRACKING_PARAMS = re.compile(r'^(utm_.*|trackid|tctx|fbclid|gclid|ref|s)$', re.IGNORECASE)
+
+def normalize_url(url):
+    """Lowercase host, drop scheme, www., fragment, tracking parameters and trailing slash."""
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not _TRACKING_PARAMS.match(k))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("", host, path, urlencode(query), "")).lstrip("/")
+
+def normalize_title(title):
+    """Casefold and collapse whitespace."""
+    return " ".join(str(title or "").split()).casefold()
+
+class WatchlistIndex:
+    """Row numbers of the watchlist by normalized URL and title."""
+
+    def __init__(self):
+        self.by_url = {}
+        self.by_title = {}
+        self.rows = 0
+        self.synced_mtime = None
+        self._lock = threading.RLock()
+        self._loaded = False
+        Functions.COMPACT_HOOKS.append(self._compacted)
+
+    @staticmethod
+    def path():
+        return Functions.ODS_PATH + INDEX_SUFFIX
+
+    @staticmethod
+    def _ods_mtime():
+        try:
+            return os.path.getmtime(Functions.ODS_PATH)
+        except OSError:
+            return None
+
+    def _add(self, url_key, title_key):
+        self.rows += 1
+        if url_key:
+            self.by_url.setdefault(url_key, self.rows)
+        if title_key:
+            self.by_title.setdefault(title_key, self.rows)
+
+    def _load_sidecar(self):
+        """Read the sidecar; returns False if it is missing or out of date."""
+        if not os.path.exists(self.path()):
+            return False
+        self.by_url, self.by_title, self.rows = {}, {}, 0
+        with open(self.path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict):
+                    self.synced_mtime = entry.get("mtime")
+                else:
+                    self._add(entry[0], entry[1])
+        return self.synced_mtime == self._ods_mtime()
+
+    def rebuild(self):
+        """Rebuild from the workbook plus journaled rows and rewrite the sidecar."""
+        self.by_url, self.by_title, self.rows = {}, {}, 0
+        self.synced_mtime = self._ods_mtime()
+        # Only the columns up to the URL are read from the sheet (not the images)
+        rows = itertools.chain(Functions.iter_ods_rows(columns=range(URL_COLUMN + 1)),
+                               Functions.pending_rows())
+        tmp_path = self.path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"mtime": self.synced_mtime}) + "\n")
+            for row in rows:
+                url_key = normalize_url(row[URL_COLUMN] if len(row) > URL_COLUMN else "")
+                title_key = normalize_title(row[TITLE_COLUMN] if row else "")
+                self._add(url_key, title_key)
+                f.write(json.dumps([url_key, title_key], ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path())
+        logger.info("Rebuilt watchlist index with %d rows", self.rows)
+
+    def ensure_loaded(self):
+        """
+        Load once; rebuild if the workbook changed behind the host's back.
+        Returns: True if the index was rebuilt
+        """
+        with self._lock:
+            if self._loaded and self.synced_mtime == self._ods_mtime():
+                return False
+            rebuilt = not self._load_sidecar()
+            if rebuilt:
+                self.rebuild()
+            self._loaded = True
+            return rebuilt
+
+    def lookup(self, url="", title=""):
+        """
+        Find an existing row for a capture.
+        Returns: {"row": n, "match": "url" | "title"} or None
+        """
+        self.ensure_loaded()
+        with self._lock:
+            url_key = normalize_url(url)
+            if url_key and url_key in self.by_url:
+                return {"row": self.by_url[url_key], "match": "url"}
+            title_key = normalize_title(title)
+            if title_key and title_key in self.by_title:
+                return {"row": self.by_title[title_key], "match": "title"}
+        return None
+
+    def add(self, url="", title=""):
+        """Record a captured row (already journaled) in memory and in the sidecar."""
+        if self.ensure_loaded():
+            # The rebuild read the row from the journal
+            return
+        with self._lock:
+            url_key, title_key = normalize_url(url), normalize_title(title)
+            self._add(url_key, title_key)
+            with open(self.path(), "a", encoding="utf-8") as f:
+                f.write(json.dumps([url_key, title_key], ensure_ascii=False) + "\n")
+
+    def _compacted(self, mtime):
+        """The host itself rewrote the workbook: the index stays valid."""
+        with self._lock:
+            if not self._loaded:
+                return
+            self.synced_mtime = mtime
+            with open(self.path(), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"mtime": mtime}) + "\n")
@@ -0,0 +1,31 @@
+# conftest.py
+# Shared setup for the host tests: src/ and the project folder on the path,
+# metrics, the log, the workbook and the Netflix output pointed at a temporary folder.
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+# Must be set before metrics / Functions are imported
+_scratch = tempfile.mkdtemp(prefix="browsertocalc-test-")
+os.environ.setdefault("BROWSERTOCALC_METRICS_PATH", os.path.join(_scratch, "metrics.json"))
+os.environ.setdefault("BROWSERTOCALC_LOG_PATH", os.path.join(_scratch, "debug.log"))
+os.environ.setdefault("BROWSERTOCALC_ODS_PATH", os.path.join(_scratch, "unused.ods"))
+os.environ.setdefault("BROWSERTOCALC_OUTPUT_DIR", os.path.join(_scratch, "netflix"))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    """Point Functions at an empty workbook path in tmp_path."""
+    import Functions
+    path = str(tmp_path / "watchlist.ods")
+    monkeypatch.setattr(Functions, "ODS_PATH", path)
+    monkeypatch.setattr(Functions, "COMPACT_HOOKS", [])
+    return path
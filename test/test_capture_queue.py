@@ -0,0 +1,82 @@
+# When FlushWorker folds the journal into the workbook.
+
+import os
+import time
+
+import Functions
+from capture_queue import FlushWorker
+
+
+def queue_rows(count):
+    Functions.append_rows_to_journal([Functions.format_row(f"Title {i}", "1", "01.01.2024", f"u{i}")
+                                      for i in range(count)])
+
+
+def test_stop_leaves_rows_that_are_not_due(workbook):
+    queue_rows(1)
+    worker = FlushWorker(batch_rows=50, interval=30.0)
+    worker.start()
+    worker.stop()
+    assert not os.path.exists(workbook)
+    assert len(Functions.read_journal_rows()) == 1
+
+
+def test_stop_flushes_a_full_batch(workbook):
+    queue_rows(3)
+    worker = FlushWorker(batch_rows=3, interval=30.0)
+    worker.stop()
+    assert len(Functions.read_ods_rows()) == 3
+    assert Functions.read_journal_rows() == []
+
+
+def test_stop_flushes_once_the_interval_passed(workbook):
+    queue_rows(1)
+    worker = FlushWorker(batch_rows=50, interval=0.0)
+    worker.stop()
+    assert len(Functions.read_ods_rows()) == 1
+
+
+def age_journal(seconds):
+    """Make the journal look as if its first row was captured seconds ago."""
+    with open(Functions.journal_path(), encoding="utf-8") as f:
+        lines = f.readlines()
+    lines[0] = '{"%s": %r}\n' % (Functions.JOURNAL_HEADER, time.time() - seconds)
+    with open(Functions.journal_path(), "w", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def test_rows_left_by_an_earlier_host_are_flushed_once_old_enough(workbook):
+    # A one-shot host journaled the row a minute ago; this host just started
+    queue_rows(1)
+    age_journal(60)
+    FlushWorker(batch_rows=50, interval=30.0).stop()
+    assert len(Functions.read_ods_rows()) == 1
+    assert Functions.read_journal_rows() == []
+
+
+def test_interval_counts_from_the_first_row_not_the_process(workbook):
+    worker = FlushWorker(batch_rows=50, interval=0.2)
+    time.sleep(0.3)
+    queue_rows(1)
+    assert not worker.due()
+    age_journal(1)
+    assert worker.due()
+
+
+def test_stop_without_flush(workbook):
+    queue_rows(3)
+    FlushWorker(batch_rows=1).stop(flush=False)
+    assert len(Functions.read_journal_rows()) == 3
+
+
+def test_worker_flushes_full_batch_when_notified(workbook):
+    worker = FlushWorker(batch_rows=2, interval=30.0)
+    worker.start()
+    queue_rows(2)
+    worker.notify()
+    for _ in range(100):
+        if not Functions.read_journal_rows():
+            break
+        time.sleep(0.02)
+    worker.stop(flush=False)
+    assert len(Functions.read_ods_rows()) == 2
@@ -0,0 +1,80 @@
+# Chunked page transfers: reassembly, bad chunks and abandoned transfers.
+
+import time
+
+import pytest
+
+import extract_netflix_json as extract
+
+PAGE = ('<html><script type="application/ld+json">'
+        '{"@type":"Movie","name":"Dark"}</script></html>')
+
+
+def chunk(transfer_id, index, data, total=2, **options):
+    return dict({"type": "chunk", "transferId": transfer_id, "index": index, "total": total,
+                 "data": data}, **options)
+
+
+def test_transfer_completes_and_is_removed():
+    transfers = {}
+    half = len(PAGE) // 2
+    assert extract.add_chunk(transfers, chunk("t", 0, PAGE[:half], saveFiles=False)) is None
+    assembler = extract.add_chunk(transfers, chunk("t", 1, PAGE[half:]))
+    assert assembler.finish() == {"@type": "Movie", "name": "Dark"}
+    assert assembler.message["saveFiles"] is False
+    assert transfers == {}
+
+
+def test_all_entities_transfer_keeps_the_page():
+    transfers = {}
+    extract.add_chunk(transfers, chunk("t", 0, PAGE[:10], allEntities=True))
+    assert extract.add_chunk(transfers, chunk("t", 1, PAGE[10:])).page() == PAGE
+
+
+@pytest.mark.parametrize("bad", [
+    chunk("t", 2, "x"),             # out of order
+    chunk("t", 1, 12345),           # data is not text
+    chunk("t", 1, None),
+    chunk("t", [1], "x"),           # index is not a number
+    chunk("t", 1, "x", total="many"),
+])
+def test_bad_chunk_drops_its_transfer(bad):
+    transfers = {}
+    extract.add_chunk(transfers, chunk("t", 0, "<html>"))
+    with pytest.raises(ValueError):
+        extract.add_chunk(transfers, bad)
+    assert transfers == {}
+
+
+def test_bad_chunk_is_answered_with_an_error():
+    raw_json, _, response = extract.extract_from_message(chunk("t", 0, {"not": "text"}), {})
+    assert raw_json is None
+    assert response["error"].startswith("Invalid chunk")
+
+
+def test_idle_transfers_expire():
+    transfers = {}
+    extract.add_chunk(transfers, chunk("old", 0, "<html>"))
+    transfers["old"].last_active -= extract.TRANSFER_TTL + 1
+    extract.add_chunk(transfers, chunk("new", 0, "<html>"))
+    assert list(transfers) == ["new"]
+
+
+def test_open_transfers_are_capped():
+    transfers = {}
+    now = time.monotonic()
+    for i in range(extract.MAX_OPEN_TRANSFERS + 3):
+        extract.add_chunk(transfers, chunk(f"t{i}", 0, "<html>"))
+        transfers[f"t{i}"].last_active = now + i
+    assert len(transfers) == extract.MAX_OPEN_TRANSFERS
+    assert "t0" not in transfers and f"t{extract.MAX_OPEN_TRANSFERS + 2}" in transfers
+
+
+def test_cap_keeps_the_transfer_being_continued():
+    transfers = {}
+    for i in range(extract.MAX_OPEN_TRANSFERS):
+        extract.add_chunk(transfers, chunk(f"t{i}", 0, "<html>", total=3))
+    transfers["t0"].last_active -= 60
+    # The oldest transfer gets its next chunk: nothing new is opened, nothing dropped
+    assert extract.add_chunk(transfers, chunk("t0", 1, "<body>", total=3)) is None
+    assert len(transfers) == extract.MAX_OPEN_TRANSFERS
@@ -0,0 +1,83 @@
+# Every JSON-LD entity of series and collection pages, streamed one frame at a time.
+
+import json
+
+import extract_netflix_json as extract
+
+SERIES = {
+    "@context": "http://schema.org", "@type": "TVSeries", "name": "Dark",
+    "containsSeason": [
+        {"@type": "TVSeason", "name": "Staffel 1", "episode": [
+            {"@type": "TVEpisode", "name": "Geheimnisse"},
+            {"@type": "TVEpisode", "name": "Lügen"}]},
+        {"@type": "TVSeason", "name": "Staffel 2"}],
+}
+COLLECTION = {
+    "@context": "http://schema.org", "@type": "ItemList", "name": "Top 10",
+    "itemListElement": [
+        {"@type": "ListItem", "position": 1, "item": {"@type": "Movie", "name": "Rebel Moon"}},
+        {"@type": "ListItem", "position": 2, "name": "Link", "url": "/browse"}],
+}
+
+
+def page(*blocks):
+    return "".join('<script type="application/ld+json">%s</script>' % json.dumps(b)
+                   for b in blocks)
+
+
+def names(entities):
+    return [e["name"] for e in entities]
+
+
+def test_series_parents_before_children():
+    assert names(extract.iter_entities(SERIES)) == [
+        "Dark", "Staffel 1", "Geheimnisse", "Lügen", "Staffel 2"]
+
+
+def test_list_items_yield_their_item():
+    # A ListItem without an item object is an entity itself
+    assert names(extract.iter_entities(COLLECTION)) == ["Top 10", "Rebel Moon", "Link"]
+
+
+def test_graph_and_top_level_arrays():
+    graph = {"@graph": [{"@type": "Movie", "name": "A"}, {"name": "untyped"}]}
+    assert names(extract.iter_entities([graph, {"@type": "Movie", "name": "B"}])) == ["A", "B"]
+
+
+def test_page_entities_in_document_order():
+    content = page(SERIES, COLLECTION)
+    entities = list(extract.iter_netflix_entities(content))
+    assert names(entities) == [
+        "Dark", "Staffel 1", "Geheimnisse", "Lügen", "Staffel 2", "Top 10", "Rebel Moon", "Link"]
+
+
+def test_page_is_scanned_lazily():
+    # The broken second block is only reached if the consumer reads that far
+    content = page(SERIES) + '<script type="application/ld+json">{broken</script>'
+    assert next(extract.iter_netflix_entities(content))["name"] == "Dark"
+
+
+def test_stream_entities_sends_one_frame_each():
+    frames = []
+    response = extract.stream_entities(extract.iter_entities(SERIES), {"maxEntities": 3},
+                                       frames.append)
+    assert response == {"success": True, "entities": 3}
+    assert [f["index"] for f in frames] == [0, 1, 2]
+    assert [f["data"]["title"] for f in frames] == ["Dark", "Staffel 1", "Geheimnisse"]
+    assert all(f["type"] == "entity" and "raw" not in f for f in frames)
+
+
+def test_stream_entities_include_raw_and_nothing_found():
+    frames = []
+    extract.stream_entities(iter([{"@type": "Movie", "name": "A"}]), {"includeRaw": True},
+                            frames.append)
+    assert frames[0]["raw"] == {"@type": "Movie", "name": "A"}
+    assert extract.stream_entities(iter([]), {}, frames.append) == {
+        "error": "Failed to extract JSON data from HTML"}
+
+
+def test_all_entities_message_returns_an_iterator():
+    raw, message, response = extract.extract_from_message(
+        {"htmlContent": page(SERIES), "allEntities": True}, {})
+    assert response is None and message["allEntities"]
+    assert len(names(raw)) == 5
@@ -0,0 +1,97 @@
+# finish_extraction: cache hits and the storage backends.
+
+import os
+from pathlib import Path
+
+import pytest
+
+import extract_netflix_json as extract
+import netflix_cache
+import netflix_store
+from netflix_cache import ExtractionCache
+from netflix_store import TitleStore
+
+RAW = {"@context": "http://schema.org", "@type": "TVSeries", "name": "Dark",
+       "url": "https://www.netflix.com/title/80100172", "genre": ["Krimiserien", "TV-Dramen"],
+       "actors": [{"@type": "Person", "name": "Louis Hofmann"}]}
+
+
+@pytest.fixture
+def output(tmp_path, monkeypatch):
+    monkeypatch.setattr(extract, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(extract, "_title_store", None)
+    yield tmp_path
+    if extract._title_store is not None:
+        extract._title_store.close()
+
+
+def stored_titles(path):
+    store = TitleStore(path / "netflix_titles.sqlite")
+    try:
+        return [t["netflix_id"] for t in store.by_genre("Krimiserien")]
+    finally:
+        store.close()
+
+
+def test_store_request_saves_genre_list(output):
+    response = extract.finish_extraction({"storage": "store"}, RAW)
+    assert "fileError" not in response["data"]
+    assert stored_titles(output) == ["80100172"]
+
+
+def test_cache_hit_still_saves_to_the_requested_store(output):
+    cache = ExtractionCache(output / "cache.sqlite")
+    first = extract.finish_extraction({"storage": "files"}, RAW, cache)
+    assert first["cache"]["hit"] is False and "savedFiles" in first["data"]
+
+    second = extract.finish_extraction({"storage": "store"}, RAW, cache)
+    assert second["cache"]["hit"] is False
+    assert stored_titles(output) == ["80100172"]
+
+    third = extract.finish_extraction({"storage": "store"}, RAW, cache)
+    assert third["cache"]["hit"] is True
+    cache.close()
+
+
+def test_cache_hit_for_the_same_backend(output):
+    cache = ExtractionCache(output / "cache.sqlite")
+    extract.finish_extraction({}, RAW, cache)
+    assert extract.finish_extraction({}, RAW, cache)["cache"]["hit"] is True
+    assert extract.finish_extraction({"saveFiles": False}, RAW, cache)["cache"]["hit"] is True
+    cache.close()
+
+
+def test_local_image_is_saved_and_cached_with_the_title(output):
+    import json
+    cache = ExtractionCache(output / "cache.sqlite")
+    response = extract.finish_extraction({}, RAW, cache, "thumbs/ab/ab.jpg")
+    with open(response["data"]["savedFiles"]["formatted"], encoding="utf-8") as f:
+        assert json.load(f)["image_path"] == "thumbs/ab/ab.jpg"
+    hit = extract.finish_extraction({}, RAW, cache, "thumbs/ab/ab.jpg")
+    assert hit["cache"]["hit"] is True and hit["data"]["image_path"] == "thumbs/ab/ab.jpg"
+    # A different local file is saved again instead of answering the old path
+    moved = extract.finish_extraction({}, RAW, cache, "thumbs/cd/cd.jpg")
+    assert moved["cache"]["hit"] is False and moved["data"]["image_path"] == "thumbs/cd/cd.jpg"
+    cache.close()
+
+
+def test_batch_ods_with_list_and_object_fields(tmp_path):
+    from pyexcel_ods3 import get_data
+    raw = dict(RAW, image=[{"@type": "ImageObject", "url": "a.jpg"}], contentRating=None)
+    results = [{"source": "a.html", "data": extract.format_netflix_data(raw)},
+               {"source": "b.html", "error": "No JSON-LD structured data found"}]
+    output = tmp_path / "batch.ods"
+    extract._write_batch_ods(results, output)
+    header, row = get_data(str(output))["Netflix"]
+    values = dict(zip(header, row))
+    assert values["genre"] == "Krimiserien, TV-Dramen"
+    assert values["image_url"] == '{"@type": "ImageObject", "url": "a.jpg"}'
+    assert values["cast"] == "Louis Hofmann"
+    assert values["source"] == "a.html"
+
+
+def test_output_dir_override_moves_files_cache_and_store():
+    folder = Path(os.environ["BROWSERTOCALC_OUTPUT_DIR"])
+    assert extract.OUTPUT_DIR == folder
+    assert netflix_cache.DEFAULT_CACHE_PATH.parent == folder
+    assert netflix_store.DEFAULT_STORE_PATH.parent == folder
@@ -0,0 +1,45 @@
+# The host log lives outside the checkout.
+
+import logging
+import os
+
+import host_logging
+from conftest import ROOT
+
+
+def test_default_log_path_is_in_the_user_folder():
+    windows = host_logging.default_log_path({"LOCALAPPDATA": os.path.join("C:", "Local")})
+    assert windows == os.path.join("C:", "Local", "BrowserToCalc", "debug.log")
+    elsewhere = host_logging.default_log_path({})
+    assert elsewhere == os.path.join(os.path.expanduser("~"), "BrowserToCalc", "debug.log")
+    assert not os.path.abspath(elsewhere).startswith(ROOT + os.sep)
+
+
+def test_log_path_override():
+    assert host_logging.default_log_path({"BROWSERTOCALC_LOG_PATH": "x.log", "LOCALAPPDATA": "C:"}) == "x.log"
+
+
+def test_records_reach_the_file(tmp_path):
+    host_logging.shutdown_logging()
+    path = tmp_path / "logs" / "debug.log"
+    try:
+        logger = host_logging.setup_logging(level="INFO", path=str(path))
+        logger.info("captured %s", "Dark")
+        logger.debug("not written")
+    finally:
+        host_logging.shutdown_logging()
+        logging.getLogger(host_logging.LOGGER_NAME).handlers.clear()
+    text = path.read_text(encoding="utf-8")
+    assert "captured Dark" in text and "not written" not in text
+
+
+def test_unknown_level_falls_back_to_info(tmp_path):
+    host_logging.shutdown_logging()
+    path = tmp_path / "debug.log"
+    try:
+        logger = host_logging.setup_logging(level="VERBOSE", path=str(path))
+        assert logger.level == logging.INFO
+    finally:
+        host_logging.shutdown_logging()
+        logging.getLogger(host_logging.LOGGER_NAME).handlers.clear()
+    assert "Unknown log level 'VERBOSE'" in path.read_text(encoding="utf-8")
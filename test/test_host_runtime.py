@@ -0,0 +1,110 @@
+# HostRuntime: request ids, oversized responses, unreadable frames and the profile report.
+
+import asyncio
+import io
+
+import native_codec
+import timing
+from host_runtime import HostRuntime
+
+
+def frames(*messages):
+    stream = io.BytesIO()
+    for message in messages:
+        native_codec.write_message(message, stream, max_size=native_codec.MAX_INCOMING)
+    return stream.getvalue()
+
+
+def responses(stream):
+    stream.seek(0)
+    found = []
+    while True:
+        message = native_codec.read_message(stream)
+        if message is None:
+            return found
+        found.append(message)
+
+
+def runtime_for(dispatch, stdin=b""):
+    runtime = HostRuntime(dispatch)
+    runtime.stdin = io.BytesIO(stdin)
+    runtime.stdout = io.BytesIO()
+    return runtime
+
+
+async def echo(runtime, msg):
+    if msg.get("type") == "big":
+        return {"data": "x" * (native_codec.MAX_OUTGOING + 1)}
+    if msg.get("type") == "huge-int":
+        return {"raw": {"n": 2 ** 70}}
+    if msg.get("type") == "unencodable":
+        return {"data": {1, 2}}
+    if msg.get("type") == "fail":
+        raise RuntimeError("boom")
+    return {"echo": msg.get("n")}
+
+
+def test_serves_until_stdin_closes():
+    runtime = runtime_for(echo, frames({"n": 2, "requestId": "b"}, {"n": 3}))
+    runtime.run({"n": 1, "requestId": "a"})
+    assert sorted(responses(runtime.stdout), key=lambda r: r["echo"]) == [
+        {"echo": 1, "requestId": "a"}, {"echo": 2, "requestId": "b"}, {"echo": 3}]
+
+
+def test_oversized_response_is_answered_with_an_error():
+    runtime = runtime_for(echo)
+    runtime.run({"type": "big", "requestId": "r1"})
+    [response] = responses(runtime.stdout)
+    assert response["requestId"] == "r1"
+    assert "exceeds" in response["error"]
+
+
+def test_values_beyond_orjson_are_encoded():
+    runtime = runtime_for(echo)
+    runtime.run({"type": "huge-int", "requestId": "r3"})
+    assert responses(runtime.stdout) == [{"raw": {"n": 2 ** 70}, "requestId": "r3"}]
+
+
+def test_unencodable_response_is_answered_with_an_error():
+    runtime = runtime_for(echo)
+    runtime.run({"type": "unencodable", "requestId": "r4"})
+    [response] = responses(runtime.stdout)
+    assert response["requestId"] == "r4"
+    assert response["error"].startswith("Failed to send message")
+
+
+def test_handler_error_is_answered():
+    runtime = runtime_for(echo)
+    runtime.run({"type": "fail", "requestId": "r2"})
+    assert responses(runtime.stdout) == [{"error": "Script error: boom", "requestId": "r2"}]
+
+
+def test_bad_first_frame_gets_an_error_and_serving_goes_on():
+    runtime = runtime_for(echo, b"\x04\x00\x00\x00{no}" + frames({"n": 5}))
+    first = runtime.read()
+    assert first is not None
+    runtime.run(first)
+    error, answer = responses(runtime.stdout)
+    assert error["error"].startswith("Failed to read message")
+    assert answer == {"echo": 5}
+
+
+def test_end_of_input_on_first_read():
+    assert runtime_for(echo).read() is None
+
+
+def test_profile_is_reported_once_no_request_is_in_flight(monkeypatch, capsys):
+    async def slow_first(runtime, msg):
+        if msg.get("n") == 1:
+            await asyncio.sleep(0.2)
+        return {"echo": msg.get("n")}
+
+    monkeypatch.setattr(timing, "_active", None)
+    timing.enable()
+    runtime = runtime_for(slow_first, frames({"n": 2}))
+    runtime.run({"n": 1})
+    assert len(responses(runtime.stdout)) == 2
+    report = capsys.readouterr().err
+    # The quick second answer did not report while the first was still open
+    assert report.count("--- startup profile ---") == 1
+    assert report.count("respond") == 2
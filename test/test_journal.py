@@ -0,0 +1,248 @@
+# Journal appends and compaction of captured rows into the workbook.
+
+import os
+
+import pytest
+
+import Functions
+
+
+def row(i):
+    return Functions.format_row(f"Title {i}", str(i), "01.01.2024", f"https://www.netflix.com/title/{i}",
+                                i % 2 == 0, f"thumbs/{i}.jpg")
+
+
+def test_append_counts_waiting_rows(workbook):
+    assert Functions.append_row_to_journal(row(1)) == 1
+    assert Functions.append_rows_to_journal([row(2), row(3)]) == 3
+    assert Functions.read_journal_rows() == [row(1), row(2), row(3)]
+
+
+def test_count_follows_appends_torn_lines_and_compaction(workbook):
+    assert Functions.count_journal_rows() == 0
+    Functions.append_rows_to_journal([row(1), row(2)])
+    with open(Functions.journal_path(), "a", encoding="utf-8") as f:
+        f.write('["Title 3", "3", "01.0')
+    assert Functions.count_journal_rows() == 2
+    Functions.compact_ods_journal()
+    assert Functions.count_journal_rows() == 0
+    assert Functions.append_row_to_journal(row(4)) == 1
+    assert Functions.count_journal_rows() == len(Functions.read_journal_rows())
+
+
+def test_count_only_parses_new_lines(workbook, monkeypatch):
+    Functions.append_rows_to_journal([row(i) for i in range(20)])
+    parsed = []
+    loads = Functions.json.loads
+    monkeypatch.setattr(Functions.json, "loads", lambda line: parsed.append(line) or loads(line))
+    assert Functions.append_row_to_journal(row(20)) == 21
+    assert len(parsed) == 1
+
+
+def test_journal_age_counts_from_the_first_row(workbook, monkeypatch):
+    assert Functions.journal_age() is None
+    monkeypatch.setattr(Functions.time, "time", lambda: 1000.0)
+    Functions.append_row_to_journal(row(1))
+    monkeypatch.setattr(Functions.time, "time", lambda: 1040.0)
+    Functions.append_row_to_journal(row(2))
+    monkeypatch.setattr(Functions.time, "time", lambda: 1100.0)
+    assert Functions.journal_age() == 100.0
+    assert Functions.read_journal_rows() == [row(1), row(2)]
+
+
+def test_journal_without_header_is_read(workbook):
+    # Written before journals had a header line
+    with open(Functions.journal_path(), "w", encoding="utf-8") as f:
+        f.write('["Old", "1", "01.01.2024", "u", "0", ""]\n')
+    assert Functions.read_journal_rows() == [["Old", "1", "01.01.2024", "u", "0", ""]]
+    assert Functions.journal_age() >= 0
+    Functions.append_row_to_journal(row(1))
+    assert len(Functions.read_journal_rows()) == 2
+
+
+def test_torn_last_line_is_skipped(workbook):
+    Functions.append_rows_to_journal([row(1), row(2)])
+    with open(Functions.journal_path(), "a", encoding="utf-8") as f:
+        f.write('["Title 3", "3", "01.0')
+    assert Functions.read_journal_rows() == [row(1), row(2)]
+
+
+def test_compaction_moves_rows_into_workbook(workbook):
+    Functions.append_rows_to_journal([row(1), row(2)])
+    assert Functions.compact_ods_journal() == 2
+    assert not os.path.exists(Functions.journal_path())
+    assert [list(r) for r in Functions.read_ods_rows()] == [row(1), row(2)]
+
+    Functions.append_row_to_journal(row(3))
+    assert Functions.compact_ods_journal() == 1
+    assert [list(r) for r in Functions.read_ods_rows()] == [row(1), row(2), row(3)]
+
+
+def test_compaction_without_journal_writes_nothing(workbook):
+    assert Functions.compact_ods_journal() == 0
+    assert not os.path.exists(workbook)
+
+
+def test_pending_rows_include_flushing_journal(workbook):
+    with open(Functions.journal_path() + Functions.FLUSHING_SUFFIX, "w", encoding="utf-8") as f:
+        f.write('["Title 1", "1", "01.01.2024", "u1", "0", ""]\n')
+    Functions.append_row_to_journal(row(2))
+    assert [r[0] for r in Functions.pending_rows()] == ["Title 1", "Title 2"]
+
+
+def test_leftover_flushing_journal_is_recovered(workbook):
+    Functions.append_row_to_journal(row(1))
+    # A host crashed after renaming the journal, before the workbook was written
+    os.replace(Functions.journal_path(), Functions.journal_path() + Functions.FLUSHING_SUFFIX)
+    Functions.append_row_to_journal(row(2))
+    assert Functions.compact_ods_journal() == 2
+    assert [list(r) for r in Functions.read_ods_rows()] == [row(1), row(2)]
+    assert not os.path.exists(Functions.journal_path() + Functions.FLUSHING_SUFFIX)
+
+
+def test_live_lock_blocks_second_compaction(workbook):
+    Functions.append_row_to_journal(row(1))
+    open(workbook + Functions.LOCK_SUFFIX, "w").close()
+    assert Functions.compact_ods_journal() == 0
+    assert Functions.read_journal_rows() == [row(1)]
+
+
+def test_same_row_captured_twice_is_kept_twice(workbook):
+    Functions.append_row_to_journal(row(1))
+    assert Functions.compact_ods_journal() == 1
+    Functions.append_row_to_journal(row(1))
+    assert Functions.compact_ods_journal() == 1
+    assert [list(r) for r in Functions.read_ods_rows()] == [row(1), row(1)]
+
+
+class Crash(Exception):
+    pass
+
+
+def crash_on(monkeypatch, name, path):
+    """Make os.<name> raise Crash once when it is called for path."""
+    real = getattr(os, name)
+
+    def fail(src, *args, **kwargs):
+        target = args[0] if args else src
+        if target == path:
+            monkeypatch.setattr(Functions.os, name, real)
+            raise Crash(name)
+        return real(src, *args, **kwargs)
+    monkeypatch.setattr(Functions.os, name, fail)
+
+
+def test_crash_after_swap_does_not_add_rows_twice(workbook, monkeypatch):
+    Functions.append_row_to_journal(row(1))
+    Functions.compact_ods_journal()
+    Functions.append_rows_to_journal([row(1), row(2)])
+    flushing = Functions.journal_path() + Functions.FLUSHING_SUFFIX
+    crash_on(monkeypatch, "remove", flushing)
+    with pytest.raises(Crash):
+        Functions.compact_ods_journal()
+    assert os.path.exists(flushing)
+
+    Functions.append_row_to_journal(row(3))
+    assert Functions.compact_ods_journal() == 1
+    assert [list(r) for r in Functions.read_ods_rows()] == [row(1), row(1), row(2), row(3)]
+    assert not os.path.exists(flushing)
+    assert not os.path.exists(flushing + Functions.COMMIT_SUFFIX)
+
+
+def test_crash_before_swap_folds_rows_again(workbook, monkeypatch):
+    Functions.append_row_to_journal(row(1))
+    crash_on(monkeypatch, "replace", workbook)
+    with pytest.raises(Crash):
+        Functions.compact_ods_journal()
+
+    assert Functions.compact_ods_journal() == 1
+    assert [list(r) for r in Functions.read_ods_rows()] == [row(1)]
+
+
+def test_recovery_after_workbook_was_saved_again(workbook, monkeypatch):
+    from pyexcel_ods3 import get_data, save_data
+    Functions.append_rows_to_journal([row(1), row(2)])
+    flushing = Functions.journal_path() + Functions.FLUSHING_SUFFIX
+    crash_on(monkeypatch, "remove", flushing)
+    with pytest.raises(Crash):
+        Functions.compact_ods_journal()
+    # Opened and saved in LibreOffice before the host ran again
+    save_data(workbook, get_data(workbook))
+
+    assert Functions.compact_ods_journal() == 0
+    assert [list(r) for r in Functions.read_ods_rows()] == [row(1), row(2)]
+
+
+def test_format_row_turns_cells_into_strings():
+    assert Functions.format_row("Dark", 3, "01.01.2024", None, True, None) == \
+        ["Dark", "3", "01.01.2024", "", "1", ""]
+
+
+def test_unwritable_rows_are_rejected_not_blocking(workbook):
+    Functions.append_rows_to_journal([row(1), ["Bad", {"url": None}], row(2), "not a row"])
+    assert Functions.compact_ods_journal() == 2
+    assert [list(r) for r in Functions.read_ods_rows()] == [row(1), row(2)]
+    assert Functions.read_journal_rows(workbook + Functions.REJECT_SUFFIX) == [["Bad", {"url": None}], "not a row"]
+    assert not os.path.exists(Functions.journal_path() + Functions.FLUSHING_SUFFIX)
+
+    Functions.append_row_to_journal(row(3))
+    assert Functions.compact_ods_journal() == 1
+
+
+def test_none_cells_from_old_journals_are_written_empty(workbook):
+    Functions.append_row_to_journal(["Dark", "1", "01.01.2024", None, "0", "img.jpg"])
+    assert Functions.compact_ods_journal() == 1
+    assert [list(r) for r in Functions.read_ods_rows()] == [["Dark", "1", "01.01.2024", "", "0", "img.jpg"]]
+
+
+def test_failed_save_keeps_rows_and_removes_temp_file(workbook, monkeypatch):
+    import pyexcel_ods3
+    Functions.append_row_to_journal(row(1))
+
+    def broken(path, data):
+        open(path, "w").close()
+        raise OSError("disk full")
+    with monkeypatch.context() as patch:
+        patch.setattr(pyexcel_ods3, "save_data", broken)
+        with pytest.raises(OSError):
+            Functions.compact_ods_journal()
+    assert not os.path.exists(os.path.splitext(workbook)[0] + ".tmp.ods")
+    assert Functions.pending_rows() == [row(1)]
+
+    assert Functions.compact_ods_journal() == 1
+
+
+def test_lock_stays_fresh_during_a_slow_compaction(workbook, monkeypatch):
+    import threading
+    import time
+    import pyexcel_ods3
+    monkeypatch.setattr(Functions, "LOCK_REFRESH_SECONDS", 0.02)
+    monkeypatch.setattr(Functions, "STALE_LOCK_SECONDS", 0.1)
+    real_save = pyexcel_ods3.save_data
+    saving = threading.Event()
+
+    def slow_save(path, data):
+        saving.set()
+        time.sleep(0.4)
+        real_save(path, data)
+    monkeypatch.setattr(pyexcel_ods3, "save_data", slow_save)
+
+    Functions.append_row_to_journal(row(1))
+    first = threading.Thread(target=Functions.compact_ods_journal)
+    first.start()
+    saving.wait(5)
+    time.sleep(0.25)
+    # Longer than STALE_LOCK_SECONDS into the rewrite: the lock is still live
+    assert not Functions._acquire_compact_lock()
+    first.join()
+    assert not os.path.exists(workbook + Functions.LOCK_SUFFIX)
+    assert len(Functions.read_ods_rows()) == 1
+
+
+def test_stale_lock_of_crashed_host_is_taken_over(workbook, monkeypatch):
+    Functions.append_row_to_journal(row(1))
+    lock = workbook + Functions.LOCK_SUFFIX
+    open(lock, "w").close()
+    old = os.path.getmtime(lock) - Functions.STALE_LOCK_SECONDS - 1
+    os.utime(lock, (old, old))
+    assert Functions.compact_ods_journal() == 1
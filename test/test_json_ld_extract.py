@@ -0,0 +1,40 @@
+# First-object and all-object extraction of JSON-LD from page content.
+
+import extract_netflix_json as extract
+
+ACTORS = ('{"@type":"Movie","name":"Dark","actors":[{"@type":"Person","name":"Louis Hofmann"},'
+          '{"@type":"Person","name":"Lisa Vicari"}],"description":"Ein {Rätsel} in Winden"}')
+
+
+def page(*blocks, tail="</body></html>"):
+    scripts = "".join('<script type="application/ld+json">%s</script>' % b for b in blocks)
+    return "<html><body>" + scripts + tail
+
+
+def test_nested_objects_and_braces_in_strings():
+    data = extract.extract_netflix_json_from_content(page(ACTORS))
+    assert [a["name"] for a in data["actors"]] == ["Louis Hofmann", "Lisa Vicari"]
+    assert data["description"] == "Ein {Rätsel} in Winden"
+
+
+def test_first_object_ignores_the_rest_of_the_page():
+    # A broken later block is never decoded when only the first is needed
+    content = page('{"@type":"Movie","name":"Dark"}', "{broken")
+    assert extract.extract_netflix_json_from_content(content) == {"@type": "Movie", "name": "Dark"}
+
+
+def test_all_objects_in_document_order():
+    content = page('{"@type":"Movie","name":"Dark"}', '{"@type":"TVSeries","name":"1899"}')
+    objects = extract.extract_netflix_json_from_content(content, all_objects=True)
+    assert [o["name"] for o in objects] == ["Dark", "1899"]
+
+
+def test_whitespace_around_the_object():
+    content = page('\n   {"@type": "Movie", "name": "Dark"}\n  ')
+    assert extract.extract_netflix_json_from_content(content)["name"] == "Dark"
+
+
+def test_no_structured_data(capsys):
+    assert extract.extract_netflix_json_from_content("<html><p>{}</p></html>") is None
+    assert extract.extract_netflix_json_from_content(page(), all_objects=True) == []
+    assert "No JSON-LD" in capsys.readouterr().out
@@ -0,0 +1,89 @@
+# The JSON-LD script scan gives the same objects for a page in memory, a
+# memory-mapped saved page and a page streamed in chunks of any size.
+
+import pytest
+
+import extract_netflix_json as extract
+
+MOVIE = '{"@context":"http://schema.org","@type":"Movie","name":"Dark"}'
+SERIES = '{"@context":"http://schema.org","@type":"TVSeries","name":"1899"}'
+
+PAGES = {
+    "script": '<html><script type="application/ld+json">%s</script></html>' % MOVIE,
+    "type mentioned in other code": (
+        '<script type="text/javascript">var a="application/ld+json";</script>'
+        '<script type="application/ld+json">%s</script>' % MOVIE),
+    "type in another tag": (
+        '<link rel="x" type="application/ld+json" href="/a.json">'
+        '<script type="application/ld+json">%s</script>' % MOVIE),
+    "upper case tag, attributes after the type": (
+        '<SCRIPT type="application/ld+json" nonce="abc">\n  %s\n</SCRIPT>' % MOVIE),
+    "invalid first block": (
+        '<script type="application/ld+json">{broken</script>'
+        '<script type="application/ld+json">%s</script>' % MOVIE),
+    "two blocks": (
+        '<script type="application/ld+json">%s</script><p>ü</p>'
+        '<script type="application/ld+json">%s</script>' % (MOVIE, SERIES)),
+    "anchor only": '<div data-state=\'%s\'></div><div>%s</div>' % (MOVIE, SERIES),
+    "nothing": '<html><script>var a = 1;</script></html>',
+}
+
+EXPECTED = {
+    "two blocks": ["Dark", "1899"],
+    "anchor only": ["Dark", "1899"],
+    "nothing": [],
+}
+
+
+def names(objects):
+    return [o["name"] for o in objects]
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_in_memory_and_mmap_agree(name, tmp_path):
+    page = PAGES[name]
+    path = tmp_path / "page.html"
+    path.write_text(page, encoding="utf-8")
+    expected = EXPECTED.get(name, ["Dark"])
+    assert names(extract.iter_netflix_json_from_content(page)) == expected
+    assert names(extract.iter_netflix_json_from_file(str(path))) == expected
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 16, 100000])
+@pytest.mark.parametrize("name", PAGES)
+def test_chunked_page_finds_the_first_object(name, size):
+    page = PAGES[name]
+    parts = [page[i:i + size] for i in range(0, len(page), size)]
+    assembler = extract.ChunkAssembler(len(parts))
+    for index, part in enumerate(parts):
+        assembler.add(index, part)
+    expected = EXPECTED.get(name, ["Dark"])
+    if name not in ("anchor only", "nothing"):
+        # Found while streaming, without the full scan in finish()
+        assert assembler.result is not None
+    first = assembler.finish()
+    assert (first["name"] if first else None) == (expected[0] if expected else None)
+
+
+def test_saved_page_with_padding_and_non_ascii(tmp_path):
+    path = tmp_path / "page.html"
+    padding = "<p>Grüße aus Winden</p>" * 20000
+    path.write_text(padding + PAGES["script"], encoding="utf-8")
+    assert extract.extract_netflix_json(str(path))["name"] == "Dark"
+
+
+def test_anchor_object_larger_than_the_window(tmp_path):
+    # The anchor window doubles until the whole object is decoded
+    big = '{"@context":"http://schema.org","@type":"Movie","name":"Dark","description":"%s"}' % (
+        "x" * (extract.ANCHOR_WINDOW * 3))
+    path = tmp_path / "page.html"
+    path.write_text("<div data-state='%s'></div>" % big, encoding="utf-8")
+    assert len(extract.extract_netflix_json(str(path))["description"]) == extract.ANCHOR_WINDOW * 3
+
+
+def test_empty_and_missing_files(tmp_path, capsys):
+    empty = tmp_path / "empty.html"
+    empty.write_bytes(b"")
+    assert extract.extract_netflix_json(str(empty)) is None
+    assert extract.extract_netflix_json(str(tmp_path / "missing.html")) is None
+    assert "Error reading file" in capsys.readouterr().out
@@ -0,0 +1,150 @@
+# Dialog answers taken from save-row messages, bulk saves and chunked pages.
+
+import io
+import threading
+import time
+
+import pytest
+
+import Functions
+import extract_netflix_json
+import main
+from host_runtime import HostRuntime
+from test_host_runtime import frames, responses
+
+
+@pytest.mark.parametrize("value", [True, 1, "1", "true", "TRUE", " True "])
+def test_checked_values(value):
+    assert main.answer_from_message({"episodes": "3", "text": "Dark", "checked": value})[1] is True
+
+
+@pytest.mark.parametrize("value", [False, 0, "0", "false", "no", "", None, 2, [1]])
+def test_unchecked_values(value):
+    assert main.answer_from_message({"episodes": "3", "text": "Dark", "checked": value})[1] is False
+
+
+def test_missing_checked_is_unchecked():
+    assert main.answer_from_message({"episodes": 3, "text": " Dark "}) == ("3", False, "Dark")
+
+
+def test_dialog_needed():
+    assert main.answer_from_message({"text": "Dark"}) is None
+    assert main.answer_from_message({"episodes": "3", "text": "Dark", "interactive": True}) is None
+
+
+@pytest.fixture
+def fresh_host(workbook, monkeypatch):
+    """main with no index or mirror opened yet, on the temporary workbook."""
+    monkeypatch.setattr(main, "_watchlist_index", [])
+    monkeypatch.setattr(main, "_ods_mirror", [])
+    monkeypatch.setattr(main, "_thumbnails", [])
+    yield workbook
+    if main._ods_mirror:
+        main._ods_mirror[0].close()
+
+
+def rows(count):
+    return [main.format_row(f"T{i}", "1", "01.01.2024", f"https://example.com/{i}") for i in range(count)]
+
+
+def test_bulk_save_records_every_row_once(fresh_host):
+    main.save_captured_rows(rows(3))
+    assert [r["text"] for r in main.ods_mirror().query()] == ["T0", "T1", "T2"]
+    assert main.watchlist_index().rows == 3
+    with open(fresh_host + ".index", encoding="utf-8") as f:
+        assert len(f.readlines()) == 1 + 3
+
+
+def test_bulk_save_after_the_workbook_changed(fresh_host):
+    main.save_captured_rows(rows(2))
+    # Edited outside the host: the next save rebuilds first, then adds
+    main.watchlist_index().synced_mtime = -1
+    main.ods_mirror()._set_mtime(-1)
+    main.save_captured_rows(rows(5)[2:])
+    assert main.ods_mirror().count() == 5
+    assert main.watchlist_index().rows == 5
+
+
+
+def capture(title, url, **fields):
+    return dict({"text": title, "url": f"https://www.netflix.com/title/{url}", "episodes": "1"}, **fields)
+
+
+def run_host(msg):
+    runtime = HostRuntime(main.dispatch)
+    runtime.stdin = io.BytesIO()
+    runtime.stdout = io.BytesIO()
+    runtime.run(dict(msg, requestId="r"))
+    return responses(runtime.stdout)[0]
+
+
+def test_save_rows_reports_saved_skipped_and_duplicates(fresh_host, monkeypatch):
+    main.save_captured_rows([main.format_row("Dark", "3", "01.01.2024", "https://www.netflix.com/title/1")])
+    asked = []
+    monkeypatch.setattr(main, "ask_capture", lambda text: asked.append(text) or ("2", True, text))
+    response = run_host({"type": "save-rows", "rows": [
+        capture("Dark", 1, onDuplicate="skip"),         # already in the sheet
+        capture("1899", 2, checked="true"),
+        {"text": "Ozark", "url": "https://www.netflix.com/title/3"},   # needs the dialog
+        capture("1899", 4),                              # same title earlier in the batch
+    ]})
+    assert response["result"] == "OK" and response["saved"] == 3
+    assert response["skipped"] == [0]
+    assert response["duplicates"] == [{"row": 1, "match": "url", "index": 0},
+                                      {"batchIndex": 1, "match": "title", "index": 3}]
+    assert asked == ["Ozark"]
+    saved = Functions.read_journal_rows()[1:]
+    assert [(r[0], r[1], r[4]) for r in saved] == [("1899", "1", "1"), ("Ozark", "2", "1"), ("1899", "1", "0")]
+    assert main.ods_mirror().count() == main.watchlist_index().rows == 4
+
+
+def test_save_rows_skip_for_the_whole_message(fresh_host):
+    main.save_captured_rows([main.format_row("Dark", "3", "01.01.2024", "https://www.netflix.com/title/1")])
+    response = run_host({"type": "save-rows", "onDuplicate": "skip",
+                         "rows": [capture("dark", 9), capture("Dark", 1)]})
+    assert response["saved"] == 0 and response["skipped"] == [0, 1]
+    assert Functions.count_journal_rows() == 1
+
+
+@pytest.mark.parametrize("entries", [None, "rows", [capture("Dark", 1), "not an object"]])
+def test_save_rows_needs_a_list_of_objects(fresh_host, entries):
+    assert "error" in run_host({"type": "save-rows", "rows": entries})
+    assert Functions.count_journal_rows() == 0
+
+PAGE = ('<html>' + 'x' * 40 + '<script type="application/ld+json">'
+        '{"@type":"Movie","name":"Dark","url":"https://www.netflix.com/title/1"}</script></html>')
+
+
+def chunks(transfer_id, parts=3):
+    size = -(-len(PAGE) // parts)
+    return [{"type": "chunk", "transferId": transfer_id, "index": i, "total": parts,
+             "data": PAGE[i * size:(i + 1) * size], "saveFiles": False, "useCache": False,
+             "requestId": f"{transfer_id}{i}"} for i in range(parts)]
+
+
+def test_chunks_are_scanned_off_the_loop_in_order(monkeypatch):
+    scanned = []
+    extract = extract_netflix_json.extract_from_message
+
+    def slow_extract(msg, transfers):
+        scanned.append((threading.current_thread().name, msg["transferId"], msg["index"]))
+        # Earlier chunks take longer, so a chunk that did not wait would overtake
+        time.sleep(0.02 * (3 - msg["index"]))
+        return extract(msg, transfers)
+
+    monkeypatch.setattr(extract_netflix_json, "extract_from_message", slow_extract)
+    monkeypatch.setattr(main, "_netflix_transfers", {})
+    monkeypatch.setattr(main, "_finish_netflix",
+                        lambda options, raw_json, image_path=None: {"success": True, "name": raw_json["name"]})
+    first, *rest = [c for pair in zip(chunks("a"), chunks("b")) for c in pair]
+    runtime = HostRuntime(main.dispatch)
+    runtime.stdin = io.BytesIO(frames(*rest))
+    runtime.stdout = io.BytesIO()
+    runtime.run(first)
+
+    assert all(name.startswith("host-cpu") for name, _, _ in scanned)
+    for transfer_id in "ab":
+        assert [i for _, t, i in scanned if t == transfer_id] == [0, 1, 2]
+    answers = {r["requestId"]: r for r in responses(runtime.stdout)}
+    assert answers["a2"]["name"] == answers["b2"]["name"] == "Dark"
+    assert main._chunk_tails == {} and main._netflix_transfers == {}
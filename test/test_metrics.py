@@ -0,0 +1,105 @@
+# Latency histograms: percentiles, merging and persistence across host runs.
+
+import json
+import random
+
+import pytest
+
+import metrics
+from metrics import Histogram, Metrics
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "metrics.json")
+
+
+def within_a_bucket(estimate, exact):
+    return abs(estimate - exact) <= exact * 0.2
+
+
+def test_percentiles_are_accurate_to_one_bucket():
+    rng = random.Random(7)
+    samples = sorted(rng.lognormvariate(1, 1.2) for _ in range(5000))
+    histogram = Histogram()
+    for ms in samples:
+        histogram.add(ms)
+    for q in (50, 95, 99):
+        assert within_a_bucket(histogram.percentile(q), samples[int(q / 100 * len(samples)) - 1])
+    assert histogram.percentile(100) == histogram.max_ms == samples[-1]
+
+
+def test_summary_of_constant_and_empty_histograms():
+    histogram = Histogram()
+    assert histogram.summary()["p99_ms"] == 0.0 and histogram.summary()["avg_ms"] == 0.0
+    for _ in range(10):
+        histogram.add(3.0)
+    summary = histogram.summary()
+    assert summary["count"] == 10 and summary["avg_ms"] == pytest.approx(3.0)
+    # Never above the largest sample, even though the bucket reaches higher
+    assert within_a_bucket(summary["p50_ms"], 3.0) and summary["p99_ms"] <= 3.0
+
+
+def test_merge_equals_adding_all_samples():
+    a, b, both = Histogram(), Histogram(), Histogram()
+    for i, ms in enumerate([0.2, 1.5, 8.0, 40.0, 0.004, 2000000.0]):
+        (a if i % 2 else b).add(ms)
+        both.add(ms)
+    a.merge(b)
+    assert a.to_dict() == both.to_dict()
+    assert Histogram.from_dict(json.loads(json.dumps(a.to_dict()))).summary() == both.summary()
+
+
+def test_save_adds_to_earlier_runs(path):
+    first = Metrics(path)
+    for ms in (1.0, 2.0, 3.0):
+        first.record("parse", ms)
+    first.save()
+    since = json.load(open(path, encoding="utf-8"))["since"]
+
+    second = Metrics(path)
+    second.record("parse", 4.0)
+    second.record("read", 0.5)
+    phases, reported_since = second.snapshot()
+    assert phases["parse"]["count"] == 4 and phases["read"]["count"] == 1
+    assert phases["parse"]["max_ms"] == 4.0
+    second.save()
+    # Saved counts are not added twice
+    second.save()
+    assert Metrics(path).snapshot() == ({
+        "parse": phases["parse"], "read": phases["read"]}, since)
+    assert reported_since == since
+
+
+def test_samples_are_binned_once_enough_pile_up(path, monkeypatch):
+    monkeypatch.setattr(metrics, "DRAIN_AT", 10)
+    recorder = Metrics(path)
+    for _ in range(11):
+        recorder.record("respond", 1.0)
+    assert recorder.phases["respond"].count == 11 and not recorder._samples
+
+
+def test_timed_records_the_block(path):
+    recorder = Metrics(path)
+    with pytest.raises(KeyError):
+        with recorder.timed("extraction"):
+            raise KeyError
+    assert recorder.snapshot()[0]["extraction"]["count"] == 1
+
+
+def test_unreadable_file_and_reset(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    recorder = Metrics(path)
+    recorder.record("parse", 1.0)
+    assert recorder.snapshot() == ({"parse": recorder.phases["parse"].summary()}, None)
+    recorder.save()
+    recorder.reset()
+    assert recorder.snapshot() == ({}, None)
+
+
+def test_failed_save_keeps_the_counts(tmp_path):
+    recorder = Metrics(str(tmp_path / "missing" / "metrics.json"))
+    recorder.record("parse", 1.0)
+    recorder.save()
+    assert recorder.phases["parse"].count == 1
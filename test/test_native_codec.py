@@ -0,0 +1,76 @@
+# Framing and size limits of the native messaging codec.
+
+import io
+import struct
+
+import pytest
+
+import native_codec
+
+
+def frame(body):
+    return struct.pack("=I", len(body)) + body
+
+
+def test_round_trip():
+    stream = io.BytesIO()
+    native_codec.write_message({"type": "save-row", "text": "Dark ü"}, stream)
+    native_codec.write_message({"n": 2}, stream)
+    stream.seek(0)
+    assert native_codec.read_message(stream) == {"type": "save-row", "text": "Dark ü"}
+    assert native_codec.read_message(stream) == {"n": 2}
+    assert native_codec.read_message(stream) is None
+
+
+def test_oversized_incoming_frame_is_skipped():
+    stream = io.BytesIO(frame(b'"' + b"x" * 100 + b'"') + frame(b'{"ok":1}'))
+    with pytest.raises(native_codec.FramingError):
+        native_codec.read_message(stream, max_size=50)
+    # The next frame is still readable
+    assert native_codec.read_message(stream, max_size=50) == {"ok": 1}
+
+
+def test_oversized_response_is_refused():
+    stream = io.BytesIO()
+    with pytest.raises(native_codec.FramingError):
+        native_codec.write_message({"data": "x" * 100}, stream, max_size=50)
+    assert stream.getvalue() == b""
+
+
+def test_response_at_the_limit_is_written():
+    body = native_codec.encode({"d": "x" * 10})
+    stream = io.BytesIO()
+    native_codec.write_message({"d": "x" * 10}, stream, max_size=len(body))
+    assert stream.getvalue() == frame(body)
+
+
+def test_truncated_frames():
+    with pytest.raises(native_codec.FramingError):
+        native_codec.read_message(io.BytesIO(b"\x05\x00"))
+    with pytest.raises(native_codec.FramingError):
+        native_codec.read_message(io.BytesIO(frame(b'{"a": 1}')[:-2]))
+
+
+def test_invalid_json():
+    with pytest.raises(native_codec.FramingError):
+        native_codec.read_message(io.BytesIO(frame(b"{nope")))
+
+
+def test_recording_copies_frames_until_stopped(tmp_path):
+    path = str(tmp_path / "frames.bin")
+    first, second = frame(b'{"n":1}'), frame(b'{"n":2}')
+    assert native_codec.start_recording(path)
+    try:
+        assert native_codec.read_message(io.BytesIO(first)) == {"n": 1}
+    finally:
+        native_codec.stop_recording()
+    assert native_codec._recording is None
+    native_codec.read_message(io.BytesIO(second))
+    with open(path, "rb") as f:
+        assert f.read() == first
+    # Stopping twice (host shutdown, then atexit) is harmless
+    native_codec.stop_recording()
+
+
+def test_encode_falls_back_for_values_orjson_refuses():
+    assert native_codec.json_decode(native_codec.encode({"n": 2 ** 70, 1: "a"})) == {"n": 2 ** 70, "1": "a"}
@@ -0,0 +1,92 @@
+# Round trips through the title store and the extraction cache.
+
+import time
+
+from netflix_cache import ExtractionCache, payload_hash
+from netflix_store import TitleStore
+
+
+def title(netflix_id, **fields):
+    data = {"title": f"Title {netflix_id}", "type": "TVSeries", "netflix_id": netflix_id,
+            "url": f"https://www.netflix.com/title/{netflix_id}", "genre": "Krimiserien",
+            "cast": ["Louis Hofmann", "Lisa Vicari"], "directors": [], "creators": []}
+    data.update(fields)
+    return data
+
+
+def test_store_round_trip(tmp_path):
+    store = TitleStore(tmp_path / "titles.sqlite")
+    raw = {"@type": "TVSeries", "name": "Dark"}
+    assert store.add(title("1"), raw) == "1"
+    store.add(title("2", genre="Dramen", cast=["Louis Hofmann"]))
+    assert store.get("1") == title("1")
+    assert store.get("1", raw=True) == raw
+    assert store.get("3") is None
+    assert [t["netflix_id"] for t in store.by_genre("krimiserien")] == ["1"]
+    assert [t["netflix_id"] for t in store.by_cast("louis hofmann")] == ["1", "2"]
+    store.close()
+
+
+def test_store_replaces_title_and_cast(tmp_path):
+    store = TitleStore(tmp_path / "titles.sqlite")
+    store.add(title("1"))
+    store.add(title("1", cast=["Oliver Masucci"]))
+    assert store.by_cast("Louis Hofmann") == []
+    assert [t["netflix_id"] for t in store.by_cast("Oliver Masucci")] == ["1"]
+    store.close()
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite")
+    raw = {"name": "Dark", "url": "https://www.netflix.com/title/1"}
+    digest = payload_hash(raw)
+    assert payload_hash({"url": raw["url"], "name": "Dark"}) == digest
+    assert cache.get("1", digest) is None
+    cache.put("1", digest, title("1"))
+    assert cache.get("1", digest) == title("1")
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+    cache.close()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache.sqlite", max_entries=2)
+    for i in range(3):
+        cache.put(str(i), "h", title(str(i)))
+        time.sleep(0.01)
+    assert cache.get("0", "h") is None
+    assert cache.get("2", "h") == title("2")
+    assert cache.stats()["entries"] == 2
+    cache.close()
+
+
+def page(netflix_id, genre):
+    import json
+    data = {"@context": "http://schema.org", "@type": "TVSeries", "name": f"Title {netflix_id}",
+            "url": f"https://www.netflix.com/title/{netflix_id}", "genre": genre,
+            "actors": [{"@type": "Person", "name": "Louis Hofmann"}]}
+    return f'<html><script type="application/ld+json">{json.dumps(data)}</script></html>'
+
+
+def test_store_takes_genre_lists(tmp_path):
+    store = TitleStore(tmp_path / "titles.sqlite")
+    store.add(title("1", genre=["Krimiserien", "TV-Dramen"]))
+    store.add(title("2", genre="TV-Dramen"))
+    assert store.get("1")["genre"] == ["Krimiserien", "TV-Dramen"]
+    assert [t["netflix_id"] for t in store.by_genre("tv-dramen")] == ["1", "2"]
+    assert [t["netflix_id"] for t in store.by_genre("Krimiserien")] == ["1"]
+    assert store.by_genre("Krimi") == []
+    store.close()
+
+
+def test_batch_into_store_with_genre_lists(tmp_path):
+    from extract_netflix_json import run_batch
+    pages = tmp_path / "pages"
+    pages.mkdir()
+    (pages / "a.html").write_text(page("1", ["Krimiserien", "TV-Dramen"]), encoding="utf-8")
+    (pages / "b.html").write_text(page("2", "Krimiserien"), encoding="utf-8")
+    output = tmp_path / "batch.sqlite"
+    stats = run_batch([str(pages)], str(output), jobs=1)
+    assert stats["failed"] == 0
+    store = TitleStore(output)
+    assert [t["netflix_id"] for t in store.by_genre("Krimiserien")] == ["1", "2"]
+    store.close()
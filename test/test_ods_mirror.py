@@ -0,0 +1,83 @@
+# Queries against the SQLite mirror of the watchlist and keeping it in sync.
+
+from collections import OrderedDict
+
+import pytest
+from pyexcel_ods3 import save_data
+
+import Functions
+from ods_mirror import OdsMirror, iso_date
+
+ROWS = [
+    Functions.format_row("Dark", "3", "14.05.2024", "https://www.netflix.com/title/1", True),
+    Functions.format_row("1899", "1", "30.05.2024", "https://www.netflix.com/title/2", False),
+    Functions.format_row("Dark Matter", "1", "02.06.2024", "https://tv.apple.com/x", True),
+]
+
+
+@pytest.fixture
+def mirror(workbook):
+    mirror = OdsMirror()
+    yield mirror
+    mirror.close()
+
+
+def texts(rows):
+    return [r["text"] for r in rows]
+
+
+def test_iso_date():
+    assert iso_date("14.05.2024") == "2024-05-14"
+    assert iso_date("2024-05-14") is None and iso_date("") is None
+
+
+def test_queries_over_journaled_rows(mirror):
+    Functions.append_rows_to_journal(ROWS)
+    assert texts(mirror.checked()) == ["Dark", "Dark Matter"]
+    assert texts(mirror.checked(False)) == ["1899"]
+    assert texts(mirror.added_in_month(2024, 5)) == ["Dark", "1899"]
+    assert texts(mirror.added_between("2024-05-20", "2024-06-02")) == ["1899", "Dark Matter"]
+    assert texts(mirror.search("dark")) == ["Dark", "Dark Matter"]
+    assert texts(mirror.query(checked=True, month="2024-06", search="Dark")) == ["Dark Matter"]
+    assert texts(mirror.query(limit=1)) == ["Dark"]
+
+
+def test_rows_keep_their_sheet_number(mirror):
+    Functions.append_rows_to_journal(ROWS[:1])
+    assert mirror.reconcile() is True
+    Functions.append_row_to_journal(ROWS[1])
+    assert mirror.add(ROWS[1]) == 2
+    row = mirror.search("1899")[0]
+    assert row["row"] == 2 and row["checkbox"] == 0 and row["date"] == "30.05.2024"
+
+
+def test_host_compaction_does_not_rebuild(mirror, monkeypatch):
+    Functions.append_rows_to_journal(ROWS)
+    mirror.reconcile()
+    Functions.compact_ods_journal()
+    monkeypatch.setattr(mirror, "rebuild", lambda: pytest.fail("rebuilt after own compaction"))
+    assert mirror.reconcile() is False
+    assert mirror.count() == 3
+
+
+def test_outside_edit_rebuilds_from_the_workbook(mirror, workbook):
+    Functions.append_rows_to_journal(ROWS)
+    mirror.reconcile()
+    edited = Functions.format_row("Ozark", "1", "01.07.2024", "https://www.netflix.com/title/3")
+    save_data(workbook, OrderedDict([(Functions.SHEET_NAME, [edited])]))
+    # Sheet rows first, then the journaled rows that are not in the workbook yet
+    assert texts(mirror.checked(False)) == ["Ozark", "1899"]
+    assert mirror.count() == 4
+
+
+def test_mirror_survives_a_restart(workbook):
+    Functions.append_rows_to_journal(ROWS)
+    first = OdsMirror()
+    first.reconcile()
+    first.close()
+    second = OdsMirror()
+    try:
+        assert second.reconcile() is False
+        assert second.count() == 3
+    finally:
+        second.close()
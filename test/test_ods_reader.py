@@ -0,0 +1,101 @@
+# The streaming sheet reader gives the same rows as pyexcel's get_data.
+
+import datetime
+import zipfile
+from collections import OrderedDict
+
+import pytest
+from pyexcel_ods3 import get_data, save_data
+
+import ods_reader
+
+ROWS = [
+    ["Titel", "Anzahl", "Datum", "Haken"],
+    ["Dark", 3, datetime.date(2024, 5, 14), True],
+    ["Zwei  Leerzeichen\nZeile zwei", 2.5, datetime.datetime(2024, 5, 14, 20, 15), False],
+    [],
+    [],
+    ["", "", "nach Lücke", ""],
+    ["Ende", 1, "", "x"],
+]
+
+# What Calc writes: repeated rows and cells, padding up to the sheet size,
+# text:s / text:tab / spans inside a paragraph and a comment on a cell
+CALC_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+ xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"
+ xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">
+<office:body><office:spreadsheet>
+<table:table table:name="Sheet1">
+<table:table-column table:number-columns-repeated="1024"/>
+<table:table-row table:number-rows-repeated="2">
+ <table:table-cell office:value-type="string"><text:p>Gleich</text:p></table:table-cell>
+ <table:table-cell table:number-columns-repeated="2" office:value-type="float" office:value="7"><text:p>7</text:p></table:table-cell>
+ <table:table-cell table:number-columns-repeated="1021"/>
+</table:table-row>
+<table:table-row>
+ <table:table-cell office:value-type="string"><office:annotation><text:p>Kommentar</text:p></office:annotation><text:p>A<text:s text:c="3"/>B<text:tab/>C</text:p></table:table-cell>
+ <table:table-cell/>
+ <table:table-cell office:value-type="string"><text:p><text:span>fett</text:span> und normal</text:p></table:table-cell>
+</table:table-row>
+<table:table-row table:number-rows-repeated="1048570"><table:table-cell table:number-columns-repeated="1024"/></table:table-row>
+</table:table>
+</office:spreadsheet></office:body></office:document-content>"""
+
+MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">
+ <manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.spreadsheet"/>
+ <manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>
+</manifest:manifest>"""
+
+
+def expected(path, sheet):
+    """get_data's rows as tuples; the reader drops trailing empty rows."""
+    rows = [tuple(row) for row in get_data(path)[sheet]]
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+@pytest.fixture
+def saved(tmp_path):
+    path = str(tmp_path / "saved.ods")
+    save_data(path, OrderedDict([("Other", [["a", 1]]), ("Sheet1", ROWS)]))
+    return path
+
+
+@pytest.fixture
+def calc(tmp_path):
+    path = str(tmp_path / "calc.ods")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("mimetype", "application/vnd.oasis.opendocument.spreadsheet",
+                         compress_type=zipfile.ZIP_STORED)
+        archive.writestr("content.xml", CALC_CONTENT)
+        archive.writestr("META-INF/manifest.xml", MANIFEST)
+    return path
+
+
+@pytest.mark.parametrize("block_size", [7, 256, ods_reader.BLOCK_SIZE])
+def test_rows_match_get_data(saved, calc, monkeypatch, block_size):
+    monkeypatch.setattr(ods_reader, "BLOCK_SIZE", block_size)
+    assert list(ods_reader.iter_rows(saved, "Sheet1")) == expected(saved, "Sheet1")
+    assert list(ods_reader.iter_rows(calc, "Sheet1")) == expected(calc, "Sheet1")
+
+
+def test_first_sheet_by_default(saved):
+    assert list(ods_reader.iter_rows(saved)) == expected(saved, "Other")
+
+
+def test_projected_columns_match_get_data(saved):
+    projected = [(row[3] if len(row) > 3 else "", row[0] if row else "")
+                 for row in expected(saved, "Sheet1")]
+    assert list(ods_reader.iter_rows(saved, "Sheet1", columns=[3, 0])) == projected
+
+
+def test_read_rows_stops_at_the_limit(calc, monkeypatch):
+    monkeypatch.setattr(ods_reader, "BLOCK_SIZE", 64)
+    assert ods_reader.read_rows(calc, "Sheet1", limit=2) == [("Gleich", 7, 7)] * 2
+
+
+def test_missing_sheet_has_no_rows(saved):
+    assert list(ods_reader.iter_rows(saved, "Nope")) == []
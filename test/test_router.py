@@ -0,0 +1,54 @@
+# Message routing by "type" and the per-handler counters.
+
+import asyncio
+
+import pytest
+
+from router import MessageRouter
+
+
+@pytest.fixture
+def router():
+    router = MessageRouter()
+
+    @router.register("save-row")
+    async def save(runtime, msg):
+        return {"handled": "save-row"}
+
+    @router.register("extract-netflix", "chunk")
+    async def extract(runtime, msg):
+        return {"handled": "extract-netflix"}
+
+    @router.register("fail")
+    async def fail(runtime, msg):
+        raise RuntimeError("boom")
+
+    return router
+
+
+def dispatch(router, msg):
+    return asyncio.run(router.dispatch(None, msg))
+
+
+def test_dispatch_by_type_and_alias(router):
+    assert dispatch(router, {"type": "save-row"}) == {"handled": "save-row"}
+    assert dispatch(router, {"type": "chunk"}) == {"handled": "extract-netflix"}
+
+
+def test_untyped_legacy_messages(router):
+    assert dispatch(router, {"htmlContent": "<html>"}) == {"handled": "extract-netflix"}
+    assert dispatch(router, {"text": "Dark"}) == {"handled": "save-row"}
+
+
+def test_unknown_type(router):
+    assert dispatch(router, {"type": "nope"}) == {"error": "Unknown message type: nope"}
+
+
+def test_counters(router):
+    dispatch(router, {"type": "save-row"})
+    dispatch(router, {"type": "save-row"})
+    with pytest.raises(RuntimeError):
+        dispatch(router, {"type": "fail"})
+    stats = router.stats()
+    assert stats["save-row"]["count"] == 2 and stats["save-row"]["errors"] == 0
+    assert stats["fail"] == dict(stats["fail"], count=1, errors=1)
@@ -0,0 +1,135 @@
+# Eviction and pinning of the thumbnail cache (blobs stored without a download)
+# and downloads over kept-alive connections from a local server.
+
+import os
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import thumbnail_cache
+from thumbnail_cache import ThumbnailCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "thumbs"), max_bytes=250, workers=1)
+    yield cache
+    cache.close()
+
+
+def store(cache, i):
+    return cache._store(f"http://example.com/{i}.jpg", bytes([i]) * 100, ".jpg")
+
+
+def test_eviction_drops_least_recently_used(cache):
+    first, second = store(cache, 1), store(cache, 2)
+    third = store(cache, 3)
+    assert not os.path.exists(first)
+    assert os.path.exists(second) and os.path.exists(third)
+    assert cache.cached("http://example.com/1.jpg") is None
+
+
+def test_pinned_thumbnails_are_never_evicted(cache):
+    first = store(cache, 1)
+    assert cache.pin(first)
+    for i in range(2, 6):
+        store(cache, i)
+    assert os.path.exists(first)
+    assert cache.cached("http://example.com/1.jpg") == first
+    assert cache.stats()["pinned"] == 1
+
+
+def test_pin_survives_the_same_bytes_from_another_url(cache):
+    first = store(cache, 1)
+    cache.pin(first)
+    assert cache._store("http://mirror.example.com/1.jpg", bytes([1]) * 100, ".jpg") == first
+    for i in range(2, 6):
+        store(cache, i)
+    assert os.path.exists(first)
+
+
+def test_pin_ignores_paths_outside_the_cache(cache):
+    assert not cache.pin("https://example.com/remote.jpg")
+
+
+def test_thumbnails_of_an_old_index_are_kept(tmp_path):
+    directory = tmp_path / "thumbs"
+    directory.mkdir()
+    db = sqlite3.connect(str(directory / "index.sqlite"))
+    db.execute("CREATE TABLE blobs (digest TEXT PRIMARY KEY, path TEXT NOT NULL, "
+               "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+    db.execute("INSERT INTO blobs VALUES ('old', 'old.jpg', 100, 0)")
+    db.commit()
+    db.close()
+    cache = ThumbnailCache(str(directory), workers=1)
+    try:
+        assert cache.stats()["pinned"] == 1
+    finally:
+        cache.close()
+
+
+def test_saved_rows_pin_their_thumbnail(workbook, cache, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "_thumbnails", [cache])
+    monkeypatch.setattr(main, "_watchlist_index", [])
+    monkeypatch.setattr(main, "_ods_mirror", [])
+    path = store(cache, 1)
+    main.save_captured_rows([main.format_row("Title", "1", "01.01.2024", "u", False, path)])
+    assert cache.stats()["pinned"] == 1
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    """Serves /big (larger than the limit) and /<name> (the name's bytes) with keep-alive."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"x" * 5000 if self.path == "/big" else self.path[1:].encode() * 10
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%d" % httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_oversized_image_does_not_poison_the_connection(cache, server, monkeypatch):
+    monkeypatch.setattr(thumbnail_cache, "MAX_IMAGE_BYTES", 1000)
+    monkeypatch.setattr(thumbnail_cache, "downscale", lambda data, size: (data, ".img"))
+    assert cache.get(server + "/big") is None
+    for name in ("first", "second"):
+        path = cache.get(server + "/" + name, timeout=5)
+        with open(path, "rb") as f:
+            assert f.read() == name.encode() * 10
+
+
+def test_connection_is_reused_after_a_complete_body(cache, server, monkeypatch):
+    monkeypatch.setattr(thumbnail_cache, "downscale", lambda data, size: (data, ".img"))
+    cache.get(server + "/a", timeout=5)
+    response, body = cache._request(server + "/b")
+    assert body == b"b" * 10 and response.isclosed()
+    connection = cache._connection("http", server.split("//")[1])
+    assert connection.sock is not None
+
+
+def test_netflix_title_pins_its_thumbnail(cache, monkeypatch):
+    import main
+    monkeypatch.setattr(main, "_thumbnails", [cache])
+    monkeypatch.setattr(main, "_netflix_cache", [None])
+    path = store(cache, 1)
+    raw = {"@type": "Movie", "name": "Dark", "url": "https://www.netflix.com/title/1"}
+    response = main._finish_netflix({"saveFiles": False}, raw, path)
+    assert response["data"]["image_path"] == path
+    assert cache.stats()["pinned"] == 1
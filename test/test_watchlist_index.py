@@ -0,0 +1,93 @@
+# Duplicate detection with the watchlist index and its sidecar file.
+
+import os
+from collections import OrderedDict
+
+import pytest
+from pyexcel_ods3 import save_data
+
+import Functions
+from watchlist_index import WatchlistIndex, normalize_title, normalize_url
+
+
+def row(title, url):
+    return Functions.format_row(title, "1", "01.01.2024", url)
+
+
+def write_workbook(path, rows):
+    """Edit the workbook outside the host, as the user would in Calc."""
+    save_data(path, OrderedDict([(Functions.SHEET_NAME, rows)]))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.netflix.com/title/80100172",
+    "http://netflix.com/title/80100172/",
+    "https://WWW.Netflix.com/title/80100172?trackId=123&utm_source=x#player",
+])
+def test_url_variants_normalize_alike(url):
+    assert normalize_url(url) == "netflix.com/title/80100172"
+
+
+def test_url_keeps_query_parameters_that_matter():
+    assert normalize_url("https://youtube.com/watch?v=abc&s=1") == "youtube.com/watch?v=abc"
+    assert normalize_url("https://youtube.com/watch?v=abc") != normalize_url("https://youtube.com/watch?v=xyz")
+    assert normalize_url("  ") == ""
+
+
+def test_title_ignores_case_and_whitespace():
+    assert normalize_title("  Das   Boot\t") == normalize_title("das boot") == "das boot"
+    assert normalize_title(None) == ""
+
+
+def test_lookup_by_url_then_title(workbook):
+    Functions.append_rows_to_journal([row("Dark", "https://www.netflix.com/title/1"),
+                                      row("1899", "https://www.netflix.com/title/2")])
+    index = WatchlistIndex()
+    assert index.lookup(url="https://netflix.com/title/2?trackId=9") == {"row": 2, "match": "url"}
+    assert index.lookup(url="https://netflix.com/title/3", title=" DARK ") == {"row": 1, "match": "title"}
+    assert index.lookup(url="https://netflix.com/title/3", title="Ozark") is None
+
+
+def test_sidecar_is_loaded_without_reading_the_workbook(workbook, monkeypatch):
+    write_workbook(workbook, [row("Dark", "https://www.netflix.com/title/1")])
+    WatchlistIndex().ensure_loaded()
+
+    def unexpected(*args, **kwargs):
+        raise AssertionError("workbook read again")
+    monkeypatch.setattr(Functions, "iter_ods_rows", unexpected)
+    index = WatchlistIndex()
+    assert index.ensure_loaded() is False
+    assert index.lookup(title="dark") == {"row": 1, "match": "title"}
+
+
+def test_added_rows_reach_the_sidecar(workbook):
+    index = WatchlistIndex()
+    index.ensure_loaded()
+    Functions.append_row_to_journal(row("Dark", "https://www.netflix.com/title/1"))
+    index.add("https://www.netflix.com/title/1", "Dark")
+    reloaded = WatchlistIndex()
+    assert reloaded.ensure_loaded() is False
+    assert reloaded.lookup(url="https://netflix.com/title/1") == {"row": 1, "match": "url"}
+
+
+def test_outside_edit_triggers_a_rebuild(workbook):
+    write_workbook(workbook, [row("Dark", "https://www.netflix.com/title/1")])
+    index = WatchlistIndex()
+    index.ensure_loaded()
+    write_workbook(workbook, [row("1899", "https://www.netflix.com/title/2")])
+    assert index.ensure_loaded() is True
+    assert index.lookup(title="Dark") is None
+    assert index.lookup(title="1899") == {"row": 1, "match": "title"}
+
+
+def test_compaction_by_the_host_keeps_the_index(workbook):
+    index = WatchlistIndex()
+    index.ensure_loaded()
+    Functions.append_row_to_journal(row("Dark", "https://www.netflix.com/title/1"))
+    index.add("https://www.netflix.com/title/1", "Dark")
+    Functions.compact_ods_journal()
+    assert index.ensure_loaded() is False
+    assert WatchlistIndex().ensure_loaded() is False
+    assert index.lookup(title="Dark") == {"row": 1, "match": "title"}